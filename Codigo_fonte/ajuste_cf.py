@@ -0,0 +1,219 @@
+import os
+import json
+import math
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+from surprise import Dataset, Reader, SVD, accuracy
+
+# Busca de hiperparâmetros do SVD (surprise) por successive halving, usada por machine.py.
+# O número de épocas é o recurso: na primeira rodada todas as combinações dos demais
+# parâmetros treinam com o menor n_epochs da grade; só a melhor fração (1/ETA) de cada rodada
+# passa para a próxima, com mais épocas, e uma combinação cujo RMSE de validação piorou em
+# relação à rodada anterior para ali (parada antecipada). Com random_state fixo, o SVD do
+# surprise percorre as notas sempre na mesma ordem, então treinar n épocas reproduz as n
+# primeiras épocas de um treino mais longo: as rodadas comparam pontos da mesma curva.
+#
+# As dobras de validação cruzada são montadas uma única vez; com n_processos > 1 os arrays
+# (usuário, filme, nota, dobra) vão para memória compartilhada e cada processo de trabalho
+# monta os trainsets das dobras a partir deles, em vez de receber uma cópia por tarefa.
+# Cada tentativa (combinação x épocas, em todas as dobras) é registrada em LOG_TENTATIVAS_FILE.
+
+ETA = 3      # A cada rodada fica 1/ETA das combinações
+N_DOBRAS = 3
+LOG_TENTATIVAS_FILE = os.path.join("Modelos", "ajuste_cf_tentativas.jsonl")
+
+# Dados do processo atual (no processo principal, em modo serial, ou no de trabalho)
+_DADOS_PROCESSO = None
+_SEGMENTOS_PROCESSO = []
+_CONJUNTOS_PROCESSO = {} # dobra -> (trainset, testset)
+
+def dividir_em_dobras(total, n_dobras=N_DOBRAS, semente=42):
+    """Dobra (0..n_dobras-1) de cada avaliação, sorteada de modo que as dobras tenham o mesmo tamanho."""
+    dobras = np.empty(total, dtype=np.int8)
+    dobras[np.random.default_rng(semente).permutation(total)] = np.arange(total) % n_dobras
+    return dobras
+
+def _definir_dados(dados):
+    global _DADOS_PROCESSO, _CONJUNTOS_PROCESSO
+    _DADOS_PROCESSO = dados
+    _CONJUNTOS_PROCESSO = {}
+
+def _conjuntos_da_dobra(dobra):
+    # Trainset (demais dobras) e testset (a dobra) montados na primeira vez que o processo os usa.
+    if dobra not in _CONJUNTOS_PROCESSO:
+        dados = _DADOS_PROCESSO
+        validacao = dados['dobras'] == dobra
+        treino = pd.DataFrame({
+            'userId': dados['usuarios'][~validacao],
+            'movieId': dados['filmes'][~validacao],
+            'rating': dados['notas'][~validacao],
+        })
+        trainset = Dataset.load_from_df(treino, Reader(rating_scale=dados['escala'])).build_full_trainset()
+        testset = list(zip(dados['usuarios'][validacao].tolist(), dados['filmes'][validacao].tolist(),
+                           dados['notas'][validacao].tolist()))
+        _CONJUNTOS_PROCESSO[dobra] = (trainset, testset)
+    return _CONJUNTOS_PROCESSO[dobra]
+
+def _avaliar_tentativa(parametros):
+    """RMSE de validação de cada dobra para um conjunto de parâmetros do SVD, e o tempo gasto."""
+    inicio = time.perf_counter()
+    rmses = []
+    for dobra in range(_DADOS_PROCESSO['n_dobras']):
+        trainset, testset = _conjuntos_da_dobra(dobra)
+        modelo = SVD(**parametros)
+        modelo.fit(trainset)
+        rmses.append(accuracy.rmse(modelo.test(testset), verbose=False))
+    return rmses, time.perf_counter() - inicio
+
+# --- Memória compartilhada ---
+
+def _publicar_dados(dados):
+    """Copia os arrays dos dados para memória compartilhada. Retorna (segmentos, descritores, extras)."""
+    segmentos, descritores, extras = [], {}, {}
+    try:
+        for chave, valor in dados.items():
+            if not isinstance(valor, np.ndarray):
+                extras[chave] = valor
+                continue
+            segmento = shared_memory.SharedMemory(create=True, size=max(valor.nbytes, 1))
+            segmentos.append(segmento)
+            np.ndarray(valor.shape, dtype=valor.dtype, buffer=segmento.buf)[...] = valor
+            descritores[chave] = (segmento.name, valor.shape, valor.dtype.str)
+    except Exception:
+        _liberar_segmentos(segmentos)
+        raise
+    return segmentos, descritores, extras
+
+def _inicializar_processo(descritores, extras):
+    global _SEGMENTOS_PROCESSO
+    dados = dict(extras)
+    for chave, (nome, forma, dtype) in descritores.items():
+        segmento = shared_memory.SharedMemory(name=nome)
+        _SEGMENTOS_PROCESSO.append(segmento)
+        dados[chave] = np.ndarray(forma, dtype=np.dtype(dtype), buffer=segmento.buf)
+    _definir_dados(dados)
+
+def _liberar_segmentos(segmentos):
+    for segmento in segmentos:
+        segmento.close()
+        segmento.unlink()
+
+# --- Successive halving ---
+
+def buscar_hiperparametros(df_avaliacoes, grade, n_dobras=N_DOBRAS, eta=ETA, orcamento_segundos=None,
+                           max_tentativas=None, n_processos=None, caminho_log=LOG_TENTATIVAS_FILE,
+                           escala=(0.5, 5.0), semente=42):
+    """
+    Procura, na grade (mesmo formato do param_grid do GridSearchCV, com 'n_epochs'), os
+    parâmetros de menor RMSE médio de validação. Para quando todas as rodadas terminam ou
+    quando o orçamento (segundos e/ou número de tentativas) acaba; as tentativas em
+    andamento terminam. n_processos=None usa uma CPU por processo de trabalho; 1 roda aqui.
+    Retorna (melhores_parametros, melhor_rmse, tentativas), ou (None, None, []) se nada rodou.
+    """
+    epocas = sorted(set(grade['n_epochs']))
+    outros = {nome: valores for nome, valores in grade.items() if nome != 'n_epochs'}
+    configuracoes = [dict(zip(outros, valores)) for valores in itertools.product(*outros.values())]
+
+    dados = {
+        'usuarios': df_avaliacoes['userId'].to_numpy(dtype=np.int64),
+        'filmes': df_avaliacoes['movieId'].to_numpy(dtype=np.int64),
+        'notas': df_avaliacoes['rating'].to_numpy(dtype=np.float64),
+        'dobras': dividir_em_dobras(len(df_avaliacoes), n_dobras, semente),
+        'n_dobras': n_dobras,
+        'escala': tuple(escala),
+    }
+    n_processos = os.cpu_count() if n_processos is None else n_processos
+
+    inicio = time.perf_counter()
+    tentativas = []
+    if caminho_log:
+        os.makedirs(os.path.dirname(caminho_log) or ".", exist_ok=True)
+        log = open(caminho_log, 'w', encoding='utf-8')
+    else:
+        log = None
+
+    def orcamento_esgotado():
+        if not tentativas: # Ao menos uma tentativa sempre roda
+            return False
+        return ((orcamento_segundos is not None and time.perf_counter() - inicio >= orcamento_segundos)
+                or (max_tentativas is not None and len(tentativas) >= max_tentativas))
+
+    def registrar(rodada, indice, parametros, rmses, segundos):
+        tentativa = {
+            'tentativa': len(tentativas) + 1,
+            'rodada': rodada,
+            'configuracao': indice,
+            'parametros': parametros,
+            'rmse_dobras': rmses,
+            'rmse': float(np.mean(rmses)),
+            'segundos': segundos,
+            'decorrido_s': time.perf_counter() - inicio,
+        }
+        tentativas.append(tentativa)
+        if log:
+            log.write(json.dumps(tentativa) + "\n")
+            log.flush()
+        print(f"  [rodada {rodada}] {parametros} -> RMSE {tentativa['rmse']:.4f} ({segundos:.1f}s)")
+
+    segmentos, executor = [], None
+    try:
+        if n_processos > 1:
+            segmentos, descritores, extras = _publicar_dados(dados)
+            executor = ProcessPoolExecutor(max_workers=n_processos, initializer=_inicializar_processo,
+                                           initargs=(descritores, extras))
+        else:
+            _definir_dados(dados)
+
+        vivas = list(range(len(configuracoes)))
+        rmse_anterior = {}
+        for rodada, n_epochs in enumerate(epocas):
+            if not vivas or orcamento_esgotado():
+                break
+            print(f"Rodada {rodada}: {len(vivas)} combinações com n_epochs={n_epochs}")
+            pedidos = {indice: {**configuracoes[indice], 'n_epochs': n_epochs} for indice in vivas}
+            rmse_rodada = {}
+
+            if executor is None:
+                for indice, parametros in pedidos.items():
+                    if orcamento_esgotado():
+                        break
+                    rmses, segundos = _avaliar_tentativa(parametros)
+                    registrar(rodada, indice, parametros, rmses, segundos)
+                    rmse_rodada[indice] = tentativas[-1]['rmse']
+            else:
+                futuros = {executor.submit(_avaliar_tentativa, parametros): indice for indice, parametros in pedidos.items()}
+                pendentes = set(futuros)
+                while pendentes:
+                    prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        if futuro.cancelled():
+                            continue
+                        indice = futuros[futuro]
+                        rmses, segundos = futuro.result()
+                        registrar(rodada, indice, pedidos[indice], rmses, segundos)
+                        rmse_rodada[indice] = tentativas[-1]['rmse']
+                    if orcamento_esgotado():
+                        for futuro in pendentes:
+                            futuro.cancel()
+
+            # Parada antecipada: só continuam as que melhoraram; delas, a melhor fração 1/eta
+            melhoraram = [i for i in rmse_rodada if rmse_rodada[i] < rmse_anterior.get(i, np.inf)]
+            melhoraram.sort(key=lambda i: (rmse_rodada[i], i))
+            vivas = melhoraram[:math.ceil(len(rmse_rodada) / eta)]
+            rmse_anterior = rmse_rodada
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        _liberar_segmentos(segmentos)
+        if log:
+            log.close()
+
+    if not tentativas:
+        return None, None, []
+    melhor = min(tentativas, key=lambda t: (t['rmse'], t['tentativa']))
+    print(f"{len(tentativas)} tentativas em {time.perf_counter() - inicio:.1f}s.")
+    return melhor['parametros'], melhor['rmse'], tentativas
@@ -1,59 +1,157 @@
 import pandas as pd
-import pickle
+import numpy as np
 import os
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+from collections import OrderedDict
 from fuzzywuzzy import process
+from Codigo_fonte import recursos
+from Codigo_fonte import pnl_vetorizado
+from Codigo_fonte import indice_titulos
 
-FILMES = os.path.join('Data', 'filmes.csv')
-PNL_MODEL = os.path.join('Modelos', 'pnl_similarity_model.pkl')
+FILMES = recursos.FILMES_CSV
+PNL_MODEL = recursos.PNL_MODEL_FILE
+PRE_SELECAO_MINIMA = 200 # Títulos pré-selecionados pelo índice de trigramas antes do fuzzywuzzy
+MAX_DESCRICOES_CACHE = 1024 # Vetores de descrições em texto livre mantidos em cache (LRU)
+
+_DESCRICOES = OrderedDict() # descrição normalizada -> vetor no espaço do PNL (None: nenhuma palavra conhecida)
+_TRAVA_DESCRICOES = threading.Lock()
 
 def carregar_info_busca_pnl():
-    print("Carregando informações de busca da PNL.")
-    
+    """
+    Retorna (matriz_latente, indices_map, titulos_map), carregando-os no primeiro uso.
+    A matriz vem com as linhas já normalizadas (a similaridade do cosseno não muda) e,
+    quando o artefato .npy existe, mapeada em memória (float32, somente leitura).
+    """
+    pnl = recursos.obter('pnl_vetorizado')
+    if pnl is None:
+        return None, None, recursos.obter('titulos_map')
+    return pnl['vetores'], _indices_map(pnl), recursos.obter('titulos_map')
+
+def _indices_map(pnl):
+    """Series movieId -> linha da matriz, no formato antigo do pickle."""
+    return pd.Series(np.arange(pnl['movie_ids'].size), index=pnl['movie_ids'])
+
+# MATRIZ_LATENTE, INDICES_MAP e TITULOS_MAP são resolvidos sob demanda (PEP 562):
+# importar este módulo não lê o modelo PNL nem o filmes.csv.
+def __getattr__(nome):
+    if nome in ('MATRIZ_LATENTE', 'INDICES_MAP'):
+        pnl = recursos.obter('pnl_vetorizado')
+        if pnl is None:
+            return None
+        return pnl['vetores'] if nome == 'MATRIZ_LATENTE' else _indices_map(pnl)
+    if nome == 'TITULOS_MAP':
+        return recursos.obter('titulos_map')
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+def recomendar_por_similaridade(movieId_base, top_n=10, n_sondas=None):
+    """
+    Retorna os top_n movieIds mais similares (cosseno no espaço latente do PNL) ao filme base.
+    Se movieId_base for uma coleção de ids, calcula todas as sementes em uma só chamada
+    matricial e retorna um dicionário {movieId_base: [movieIds similares]}.
+    'n_sondas' troca recall por latência no índice aproximado (None: indice_ann.N_SONDAS_PADRAO).
+    """
+    pnl = recursos.obter('pnl_vetorizado')
+    em_lote = isinstance(movieId_base, (list, tuple, set, np.ndarray, pd.Series, pd.Index))
+    if pnl is None:
+        print("Erro! Matriz PNL não carregada.")
+        return {} if em_lote else []
+
     try:
-        PNL_DATA = pickle.load(open(PNL_MODEL, 'rb'))
-        matriz_latente = PNL_DATA['latent_matrix']
+        sementes = np.fromiter(movieId_base, dtype=np.int64) if em_lote else np.array([movieId_base], dtype=np.int64)
+        linhas = pnl_vetorizado.linhas_dos_filmes(pnl, sementes)
+        encontrados = linhas >= 0
+        tabela = recursos.obter('tabela_vizinhos_pnl') # Tabela pré-calculada, se o treino a gerou
+        ann = recursos.obter('indice_ann_pnl') # Índice aproximado, gerado pelo treino em catálogos grandes
+        vizinhos, _ = pnl_vetorizado.buscar_vizinhos(pnl, linhas[encontrados], top_n, tabela, ann, n_sondas)
+        filmes_recomendados = pnl['movie_ids'][vizinhos].tolist()
+    except Exception as e:
+        print(f"Erro inesperado: {e}")
+        return {} if em_lote else []
 
-        indices_map = PNL_DATA['movie_indices']
-        filmes_db = pd.read_csv(FILMES)
-    
-        titulos_map = filmes_db.set_index('movieId')['titulo']
+    if not em_lote:
+        if not encontrados[0]:
+            print(f"Não foi encontrado o movieID {movieId_base}")
+            return []
+        return filmes_recomendados[0]
 
-        return matriz_latente, indices_map, titulos_map
-    except FileNotFoundError as e:
-        print(f'Erro no busca_filme.py. Arquivo não encontrado. {e}')
-        return None
+    if not encontrados.all():
+        print(f"Não foram encontrados {int((~encontrados).sum())} dos {sementes.size} movieIDs informados.")
+    resultado = {int(m): [] for m in sementes.tolist()}
+    resultado.update(zip(sementes[encontrados].tolist(), filmes_recomendados))
+    return resultado
 
-MATRIZ_LATENTE, INDICES_MAP, TITULOS_MAP = carregar_info_busca_pnl()
+def vetor_da_descricao(descricao):
+    """
+    Projeta um texto livre no espaço latente do PNL pelo mesmo caminho do treino: a descrição
+    vira a 'feature_pnl' de um filme cuja sinopse é o texto (pnl_modulo.feature_de_descricao,
+    com a limpeza usada no treino) e passa pelo TF-IDF e SVD salvos por pnl_modulo.py.
+    Retorna o vetor normalizado, ou None se nenhuma palavra for conhecida. Os vetores ficam em
+    cache pela descrição normalizada (minúsculas, espaços simples).
+    """
+    chave = " ".join(str(descricao).lower().split())
+    with _TRAVA_DESCRICOES:
+        if chave in _DESCRICOES:
+            _DESCRICOES.move_to_end(chave)
+            return _DESCRICOES[chave]
 
-def recomendar_por_similaridade(movieId_base, top_n=10):
-    if MATRIZ_LATENTE is None:
+    transformadores = recursos.obter('transformadores_pnl')
+    if transformadores is None:
+        raise LookupError("TF-IDF/SVD do PNL indisponíveis. Rode o treinamento completo (python3 Codigo_fonte/pnl_modulo.py).")
+    from Codigo_fonte.pnl_modulo import feature_de_descricao # nltk/sklearn só são importados quando a busca é usada
+
+    texto = feature_de_descricao(chave, transformadores['usar_stemmer'])
+    vetor = transformadores['svd'].transform(transformadores['tfidf'].transform([texto]))[0]
+    norma = np.linalg.norm(vetor)
+    vetor = vetor / norma if norma > 0 else None
+
+    with _TRAVA_DESCRICOES:
+        _DESCRICOES[chave] = vetor
+        while len(_DESCRICOES) > MAX_DESCRICOES_CACHE:
+            _DESCRICOES.popitem(last=False)
+    return vetor
+
+def limpar_cache_descricoes():
+    with _TRAVA_DESCRICOES:
+        _DESCRICOES.clear()
+
+def recomendar_por_descricao(descricao, top_n=10, n_sondas=None):
+    """
+    Retorna os top_n movieIds mais similares a uma descrição em texto livre
+    ("quero um filme de robôs no espaço"), sem precisar de um filme-semente.
+    Usa o índice aproximado do PNL (com n_sondas listas) quando ele existir.
+    """
+    pnl = recursos.obter('pnl_vetorizado')
+    if pnl is None:
         print("Erro! Matriz PNL não carregada.")
         return []
-    
-    try:
-        indice_base = INDICES_MAP[movieId_base]
-        dna_pnl = MATRIZ_LATENTE[indice_base].reshape(1, -1)
-        salvar_dados_recomendacao = cosine_similarity(dna_pnl, MATRIZ_LATENTE)
-        salvar_dados_recomendacao = salvar_dados_recomendacao[0]
-        enumerar_dados = list(enumerate(salvar_dados_recomendacao))
-        ordenar_dados = sorted(enumerar_dados, key=lambda x : x[1], reverse=True)
-        indice_top = [i[0] for i in ordenar_dados[1:top_n + 1]]
-        filmes_recomendados = INDICES_MAP.iloc[indice_top].index.tolist()
-        return filmes_recomendados
-    except KeyError:
-        print(f"Não foi encontrado o movieID {movieId_base}")
+    if recursos.obter('transformadores_pnl') is None:
+        print("Erro! TF-IDF/SVD do PNL não carregados (rode o treinamento completo do pnl_modulo.py).")
         return []
+    try:
+        vetor = vetor_da_descricao(descricao)
+        if vetor is None:
+            print("Nenhuma palavra da descrição é conhecida pelo modelo PNL.")
+            return []
+        linhas, _ = pnl_vetorizado.buscar_por_vetor(pnl, vetor, top_n, recursos.obter('indice_ann_pnl'), n_sondas)
+        return pnl['movie_ids'][linhas].tolist()
     except Exception as e:
         print(f"Erro inesperado: {e}")
         return []
 
 def encontrar_movieid_por_titulo(titulo_query, top_n=1):
+    TITULOS_MAP = recursos.obter('titulos_map')
     if TITULOS_MAP is None:
         print("Erro! O mapa de títulos não foi carregado.")
         return None
     
-    resultados = process.extract(titulo_query, TITULOS_MAP.to_dict(), limit=top_n)
+    # O índice de trigramas pré-seleciona os candidatos; só eles passam pelo fuzzywuzzy
+    indice = recursos.obter('indice_titulos')
+    linhas = indice_titulos.pre_selecionar(indice, titulo_query, max(PRE_SELECAO_MINIMA, 20 * top_n)) if indice else []
+    if len(linhas):
+        escolhas = dict(zip(indice['movie_ids'][linhas].tolist(), [indice['titulos'][l] for l in linhas.tolist()]))
+    else:
+        escolhas = TITULOS_MAP.to_dict() # Nenhum trigrama em comum: compara com o catálogo todo
+    resultados = process.extract(titulo_query, escolhas, limit=top_n)
 
     if not resultados:
         return None
@@ -63,9 +161,22 @@ def encontrar_movieid_por_titulo(titulo_query, top_n=1):
     else:
         return [r[2] for r in resultados]
 
+def autocompletar_titulo(texto, top_n=10):
+    """
+    movieIds dos títulos que começam com o texto digitado (cada palavra é tratada como
+    prefixo), dos mais avaliados para os menos. Não usa o fuzzywuzzy: pode ser chamada a
+    cada tecla digitada. Retorna [] se nada for encontrado.
+    """
+    indice = recursos.obter('indice_prefixos')
+    if indice is None:
+        print("Erro! O índice de títulos não foi carregado.")
+        return []
+    return indice_titulos.autocompletar(indice, texto, top_n)
+
 if __name__ == "__main__":
     print("Testando busca de filmes!")
 
+    MATRIZ_LATENTE, INDICES_MAP, TITULOS_MAP = carregar_info_busca_pnl()
     if MATRIZ_LATENTE is not None:
         query_errada = "Pocahantas"
         id_errado = encontrar_movieId_por_titulo(query_errada)
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Cache LRU/TTL dos rankings gerados por recomendar.gerar_recomendacoes_hibridas.
+# A chave é (user_id, balde do tempo disponível) e o valor é o ranking já ordenado com
+# pelo menos TOP_N_MINIMO filmes, de modo que pedidos com top_n diferentes para o mesmo
+# usuário e tempo são atendidos fatiando o mesmo ranking. Não importa nenhum modelo, para
+# que gerenciar_usuarios e auth_simple possam invalidar entradas sem carregar o recomendar.
+
+MAX_ENTRADAS = 256        # Entradas mantidas antes de descartar a usada há mais tempo
+TTL_SEGUNDOS = 15 * 60    # Validade de cada entrada
+RESOLUCAO_TEMPO_MIN = 1   # Largura do balde de tempo disponível (minutos)
+TOP_N_MINIMO = 50         # Tamanho mínimo do ranking guardado por entrada
+
+_ENTRADAS = OrderedDict() # (user_id, balde) -> {'instante', 'ranking', 'completo'}
+_TRAVA = threading.Lock() # O Streamlit atende cada sessão em uma thread
+_CONTADORES = {'acertos': 0, 'falhas': 0, 'remocoes': 0, 'expiracoes': 0, 'invalidacoes': 0}
+
+def balde_tempo(tempo_disponivel_min):
+    """
+    Arredonda o tempo disponível para baixo até o início do seu balde. Como as durações
+    do catálogo são inteiras, com a resolução de 1 minuto os filmes que cabem no tempo
+    não mudam; para tempos inteiros o valor volta inalterado.
+    """
+    balde = (tempo_disponivel_min // RESOLUCAO_TEMPO_MIN) * RESOLUCAO_TEMPO_MIN
+    return int(balde) if float(balde).is_integer() else balde
+
+def obter(user_id, tempo_disponivel_min, top_n):
+    """
+    Retorna as top_n primeiras linhas do ranking em cache, ou None se não houver entrada
+    válida que cubra esse top_n (ranking guardado menor que top_n e incompleto).
+    """
+    chave = (int(user_id), balde_tempo(tempo_disponivel_min))
+    with _TRAVA:
+        entrada = _ENTRADAS.get(chave)
+        if entrada is not None and time.monotonic() - entrada['instante'] > TTL_SEGUNDOS:
+            del _ENTRADAS[chave]
+            _CONTADORES['expiracoes'] += 1
+            entrada = None
+        if entrada is None or (len(entrada['ranking']) < top_n and not entrada['completo']):
+            _CONTADORES['falhas'] += 1
+            return None
+        _ENTRADAS.move_to_end(chave)
+        _CONTADORES['acertos'] += 1
+        ranking = entrada['ranking']
+    return ranking.head(max(int(top_n), 0)).reset_index(drop=True)
+
+def guardar(user_id, tempo_disponivel_min, ranking, completo):
+    """
+    Guarda o ranking (DataFrame já ordenado). 'completo' indica que ele contém todos
+    os filmes aprovados, e portanto atende qualquer top_n.
+    """
+    chave = (int(user_id), balde_tempo(tempo_disponivel_min))
+    with _TRAVA:
+        _ENTRADAS[chave] = {'instante': time.monotonic(), 'ranking': ranking.copy(), 'completo': bool(completo)}
+        _ENTRADAS.move_to_end(chave)
+        while len(_ENTRADAS) > MAX_ENTRADAS:
+            _ENTRADAS.popitem(last=False)
+            _CONTADORES['remocoes'] += 1
+
+def invalidar_usuario(user_id):
+    """Remove todas as entradas do usuário (chamado quando as avaliações dele mudam)."""
+    user_id = int(user_id)
+    with _TRAVA:
+        chaves = [chave for chave in _ENTRADAS if chave[0] == user_id]
+        for chave in chaves:
+            del _ENTRADAS[chave]
+        _CONTADORES['invalidacoes'] += len(chaves)
+
+def limpar():
+    with _TRAVA:
+        _ENTRADAS.clear()
+
+def estatisticas():
+    """Contadores de acertos, falhas, remoções (LRU), expirações (TTL) e invalidações."""
+    with _TRAVA:
+        return dict(_CONTADORES, entradas=len(_ENTRADAS))
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Catálogo colunar de filmes em memória.
+# Montado uma única vez a partir do filmes.csv, guarda as colunas usadas no ranqueamento
+# em arrays NumPy contíguos (movieId, duração já convertida para int e títulos concatenados
+# com offsets) e um mapa denso movieId -> linha, evitando um FILMES_DF.loc por candidato.
+
+def _limpar_duracoes(coluna):
+    """
+    Converte a coluna 'duracao' para int64 com as mesmas regras do int() usado antes
+    no laço de ranqueamento. Retorna (duracoes, validas); valores inválidos (NaN,
+    texto não numérico) ficam marcados como False em 'validas'.
+    """
+    if pd.api.types.is_numeric_dtype(coluna):
+        valores = coluna.to_numpy(dtype=np.float64, na_value=np.nan)
+        validas = np.isfinite(valores)
+        duracoes = np.zeros(len(valores), dtype=np.int64)
+        duracoes[validas] = np.trunc(valores[validas]).astype(np.int64)
+        return duracoes, validas
+
+    duracoes = np.zeros(len(coluna), dtype=np.int64)
+    validas = np.zeros(len(coluna), dtype=bool)
+    for i, valor in enumerate(coluna.tolist()):
+        try:
+            duracoes[i] = int(valor)
+            validas[i] = True
+        except (ValueError, TypeError, OverflowError):
+            pass
+    return duracoes, validas
+
+def construir_catalogo(filmes_df):
+    """
+    Monta o catálogo colunar a partir do DataFrame de filmes (com 'movieId' como
+    coluna ou como índice). Para movieIds repetidos vale a primeira ocorrência.
+    """
+    if filmes_df.index.name == 'movieId':
+        filmes_df = filmes_df.reset_index()
+
+    movie_ids = filmes_df['movieId'].to_numpy(dtype=np.int64)
+
+    if 'duracao' in filmes_df.columns:
+        duracoes, duracao_valida = _limpar_duracoes(filmes_df['duracao'])
+        tem_duracao = np.ones(len(movie_ids), dtype=bool)
+    else:
+        duracoes = np.zeros(len(movie_ids), dtype=np.int64)
+        duracao_valida = np.zeros(len(movie_ids), dtype=bool)
+        tem_duracao = np.zeros(len(movie_ids), dtype=bool)
+
+    # Títulos concatenados em um único buffer; o título da linha i é buffer[offsets[i]:offsets[i+1]]
+    if 'titulo' in filmes_df.columns:
+        titulos = [t if isinstance(t, str) else f"Filme ID {m}" for t, m in zip(filmes_df['titulo'].tolist(), movie_ids.tolist())]
+    else:
+        titulos = [f"Filme ID {m}" for m in movie_ids.tolist()]
+    offsets = np.zeros(len(titulos) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(t) for t in titulos])
+
+    # Mapa denso movieId -> linha (-1 para ids fora do catálogo)
+    tamanho_mapa = int(movie_ids.max()) + 1 if movie_ids.size else 0
+    linha_por_movieid = np.full(tamanho_mapa, -1, dtype=np.int32)
+    ids_unicos, primeira_linha = np.unique(movie_ids, return_index=True) # Primeira ocorrência de cada id
+    validos = ids_unicos >= 0
+    linha_por_movieid[ids_unicos[validos]] = primeira_linha[validos]
+
+    return {
+        'movie_ids': movie_ids,
+        'duracao': duracoes,
+        'duracao_valida': duracao_valida,
+        'tem_duracao': tem_duracao,
+        'titulos_buffer': "".join(titulos),
+        'titulos_offsets': offsets,
+        'linha_por_movieid': linha_por_movieid,
+    }
+
+def linhas_dos_filmes(catalogo, movie_ids):
+    """Converte movieIds em linhas do catálogo. Ids desconhecidos viram -1."""
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    mapa = catalogo['linha_por_movieid']
+    dentro = (movie_ids >= 0) & (movie_ids < mapa.size)
+    linhas = np.full(movie_ids.shape, -1, dtype=np.int64)
+    linhas[dentro] = mapa[movie_ids[dentro]]
+    return linhas
+
+def titulo_da_linha(catalogo, linha):
+    offsets = catalogo['titulos_offsets']
+    return catalogo['titulos_buffer'][offsets[linha]:offsets[linha + 1]]
+
+def titulos_das_linhas(catalogo, linhas):
+    offsets = catalogo['titulos_offsets'].tolist()
+    buffer = catalogo['titulos_buffer']
+    return [buffer[offsets[i]:offsets[i + 1]] for i in np.asarray(linhas).tolist()]
@@ -0,0 +1,351 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+
+# Motor vetorizado da Filtragem Colaborativa.
+# Extrai os fatores do SVD (surprise) treinado uma única vez e calcula as notas
+# previstas de todos os candidatos de um usuário com um único produto matriz-vetor,
+# reproduzindo o resultado de modelo.predict(uid, iid).est.
+#
+# Usuários novos (ou com avaliações novas) não precisam esperar o próximo treino:
+# dobrar_usuario calcula pu e bu a partir das avaliações com os fatores dos filmes fixos,
+# e as previsões consultam esses fatores (a "sobreposição", ver sobreposicao_cf.py)
+# antes dos do treino.
+
+# Variância do ruído das notas (sigma^2) na dobra de usuários: quanto cada avaliação pesa
+# contra a distribuição de pu/bu dos usuários do treino (ver dobrar_usuario)
+VARIANCIA_RUIDO_DOBRA = 0.5
+
+def _ids_ordenados(raw2inner):
+    """Converte o dicionário raw_id -> inner_id do trainset em dois arrays ordenados pelo raw_id."""
+    raw_ids = np.fromiter(raw2inner.keys(), dtype=np.int64, count=len(raw2inner))
+    inner_ids = np.fromiter(raw2inner.values(), dtype=np.int64, count=len(raw2inner))
+    ordem = np.argsort(raw_ids, kind='stable')
+    return raw_ids[ordem], inner_ids[ordem]
+
+def priori_dos_usuarios(pu, bu, enviesado=True):
+    """
+    Distribuição a priori de dobrar_usuario: média e raiz da covariância (R com R @ R.T = cov)
+    de [pu, bu] (só pu, sem vieses) entre os usuários do treino. A covariância completa,
+    e não só a variância de cada fator, mantém as direções em que os usuários de fato variam.
+    Retorna {'priori_media', 'priori_raiz'}; sem usuários, ambas são zero (pu e bu fixos em 0).
+    """
+    u = np.asarray(pu, dtype=np.float64)
+    if enviesado:
+        u = np.column_stack([u, np.asarray(bu, dtype=np.float64)])
+    if u.shape[0] == 0:
+        return {'priori_media': np.zeros(u.shape[1]), 'priori_raiz': np.zeros((u.shape[1], u.shape[1]))}
+    media = u.mean(axis=0)
+    autovalores, autovetores = np.linalg.eigh(np.cov(u, rowvar=False, bias=True).reshape(u.shape[1], u.shape[1]))
+    return {'priori_media': media, 'priori_raiz': autovetores * np.sqrt(np.clip(autovalores, 0, None))}
+
+def extrair_fatores_cf(modelo_cf):
+    """
+    Extrai pu, qi, bu, bi, a média global e a escala de notas do SVD treinado, além da
+    priori dos usuários (priori_dos_usuarios) usada por dobrar_usuario.
+    Retorna um dicionário com os arrays usados por prever_notas_cf.
+    """
+    trainset = modelo_cf.trainset
+    uids_ordenados, uids_internos = _ids_ordenados(trainset._raw2inner_id_users)
+    iids_ordenados, iids_internos = _ids_ordenados(trainset._raw2inner_id_items)
+    pu, bu = np.asarray(modelo_cf.pu), np.asarray(modelo_cf.bu)
+    enviesado = bool(getattr(modelo_cf, 'biased', True))
+
+    return {
+        'pu': pu,
+        'qi': np.asarray(modelo_cf.qi),
+        'bu': bu,
+        'bi': np.asarray(modelo_cf.bi),
+        'media_global': float(trainset.global_mean),
+        'escala': tuple(float(x) for x in trainset.rating_scale),
+        'enviesado': enviesado,
+        **priori_dos_usuarios(pu, bu, enviesado),
+        'uids_ordenados': uids_ordenados,
+        'uids_internos': uids_internos,
+        'iids_ordenados': iids_ordenados,
+        'iids_internos': iids_internos,
+    }
+
+# Artefato NumPy do modelo CF (gerado por machine.py): um diretório com pu/qi/bu/bi em
+# float32, os ids ordenados e o cabeçalho JSON (parâmetros da previsão, metadados do treino
+# e checksums). É aberto com mmap: quem só recomenda não precisa do surprise nem do trainset
+# na memória, e vários processos compartilham as mesmas páginas.
+# Como no artefato PNL, os .npy nunca são reescritos: cada treino grava '<chave>.<sha>.npy'
+# novos e só então troca o cabeçalho, então quem carrega durante um treino vê o artefato
+# antigo ou o novo inteiro, nunca pu de um treino com qi de outro.
+FORMATO_ARTEFATO = "recomenda_ai.cf"
+VERSAO_ARTEFATO = 1
+CABECALHO_ARTEFATO = "cabecalho.json"
+ARRAYS_ARTEFATO = { # chave do dicionário de fatores -> dtype no disco
+    'pu': np.float32,
+    'qi': np.float32,
+    'bu': np.float32,
+    'bi': np.float32,
+    'uids_ordenados': np.int64,
+    'uids_internos': np.int32,
+    'iids_ordenados': np.int64,
+    'iids_internos': np.int32,
+}
+ARRAYS_PRIORI = { # Opcionais: artefatos anteriores à priori a calculam na carga
+    'priori_media': np.float64,
+    'priori_raiz': np.float64,
+}
+
+def _sha256(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _arquivos_do_cabecalho(caminho_cabecalho):
+    # Nomes dos arquivos de dados referenciados pelo cabeçalho atual (vazio se não houver)
+    try:
+        with open(caminho_cabecalho, encoding='utf-8') as f:
+            return {info['nome'] for info in json.load(f)['arquivos'].values()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
+def salvar_artefato_cf(fatores, diretorio, metadados=None):
+    """
+    Grava os fatores (de extrair_fatores_cf) no diretório do artefato. Cada .npy vai para
+    um arquivo novo, '<chave>.<início do sha256>.npy', e o cabeçalho, com os nomes e os
+    checksums, é trocado por último (os.replace). Arquivos de treinos mais antigos que o
+    anterior são apagados; os do anterior ficam para quem ainda está lendo o cabeçalho antigo.
+    'metadados' (parâmetros, RMSE, ...) vai para o cabeçalho como está.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    caminho_cabecalho = os.path.join(diretorio, CABECALHO_ARTEFATO)
+    anteriores = _arquivos_do_cabecalho(caminho_cabecalho)
+    chaves = {**ARRAYS_ARTEFATO, **ARRAYS_PRIORI}
+    arquivos = {}
+    with tempfile.TemporaryDirectory(dir=diretorio) as temporario:
+        for chave, dtype in chaves.items():
+            caminho = os.path.join(temporario, f"{chave}.npy")
+            np.save(caminho, np.ascontiguousarray(fatores[chave], dtype=dtype))
+            sha256 = _sha256(caminho)
+            nome = f"{chave}.{sha256[:16]}.npy"
+            os.replace(caminho, os.path.join(diretorio, nome))
+            arquivos[chave] = {'nome': nome, 'sha256': sha256}
+
+    cabecalho = {
+        'formato': FORMATO_ARTEFATO,
+        'versao': VERSAO_ARTEFATO,
+        'usuarios': int(fatores['pu'].shape[0]),
+        'filmes': int(fatores['qi'].shape[0]),
+        'fatores': int(fatores['qi'].shape[1]),
+        'media_global': float(fatores['media_global']),
+        'escala': [float(x) for x in fatores['escala']],
+        'enviesado': bool(fatores['enviesado']),
+        'metadados': metadados or {},
+        'arquivos': arquivos,
+    }
+    temporario = caminho_cabecalho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(cabecalho, f, indent=2)
+    os.replace(temporario, caminho_cabecalho)
+
+    # Limpeza: versões (e os nomes sem versão, de artefatos antigos) que nenhum dos dois cabeçalhos usa
+    manter = anteriores | {info['nome'] for info in arquivos.values()}
+    for nome in os.listdir(diretorio):
+        if nome.endswith(".npy") and nome.split(".")[0] in chaves and nome not in manter:
+            os.remove(os.path.join(diretorio, nome))
+
+def carregar_artefato_cf(diretorio, verificar_checksum=False):
+    """
+    Abre o artefato com os arrays mapeados em memória. Retorna o mesmo dicionário de
+    extrair_fatores_cf (mais 'metadados'), ou None (com aviso) se ele não existir, for de
+    outra versão ou estiver inconsistente. Os checksums só são conferidos com
+    verificar_checksum=True (lê os arquivos).
+    """
+    caminho_cabecalho = os.path.join(diretorio, CABECALHO_ARTEFATO)
+    if not os.path.exists(caminho_cabecalho):
+        return None
+    try:
+        with open(caminho_cabecalho, encoding='utf-8') as f:
+            cabecalho = json.load(f)
+        if cabecalho.get('formato') != FORMATO_ARTEFATO or cabecalho.get('versao') != VERSAO_ARTEFATO:
+            print(f"AVISO: Artefato CF '{diretorio}' com formato/versão não suportados. Usando o pickle.")
+            return None
+
+        chaves = list(ARRAYS_ARTEFATO) + [chave for chave in ARRAYS_PRIORI if chave in cabecalho['arquivos']]
+        caminhos = {chave: os.path.join(diretorio, cabecalho['arquivos'][chave]['nome']) for chave in chaves}
+        if verificar_checksum:
+            for chave, caminho in caminhos.items():
+                if _sha256(caminho) != cabecalho['arquivos'][chave]['sha256']:
+                    print(f"AVISO: Checksum de '{caminho}' não confere. Usando o pickle.")
+                    return None
+        arrays = {chave: np.load(caminho, mmap_mode='r') for chave, caminho in caminhos.items()}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"AVISO: Falha ao abrir o artefato CF '{diretorio}' ({e}). Usando o pickle.")
+        return None
+
+    n_usuarios, n_filmes, k = cabecalho['usuarios'], cabecalho['filmes'], cabecalho['fatores']
+    d = k + 1 if cabecalho['enviesado'] else k
+    formas_esperadas = {
+        'pu': (n_usuarios, k), 'bu': (n_usuarios,), 'uids_ordenados': (n_usuarios,), 'uids_internos': (n_usuarios,),
+        'qi': (n_filmes, k), 'bi': (n_filmes,), 'iids_ordenados': (n_filmes,), 'iids_internos': (n_filmes,),
+        'priori_media': (d,), 'priori_raiz': (d, d),
+    }
+    if any(arrays[chave].shape != forma for chave, forma in formas_esperadas.items() if chave in arrays):
+        print(f"AVISO: Artefato CF '{diretorio}' inconsistente com o cabeçalho. Usando o pickle.")
+        return None
+    if 'priori_media' not in arrays or 'priori_raiz' not in arrays:
+        arrays.update(priori_dos_usuarios(arrays['pu'], arrays['bu'], bool(cabecalho['enviesado'])))
+
+    return {
+        **arrays,
+        'media_global': float(cabecalho['media_global']),
+        'escala': tuple(cabecalho['escala']),
+        'enviesado': bool(cabecalho['enviesado']),
+        'metadados': cabecalho.get('metadados', {}),
+    }
+
+def _mapear_ids(ids_ordenados, ids_internos, raw_ids):
+    """Mapeia raw ids para inner ids via busca binária. Ids desconhecidos viram -1."""
+    raw_ids = np.asarray(raw_ids, dtype=np.int64)
+    if ids_ordenados.size == 0:
+        return np.full(raw_ids.shape, -1, dtype=np.int64)
+    pos = np.searchsorted(ids_ordenados, raw_ids)
+    pos_valida = np.minimum(pos, ids_ordenados.size - 1)
+    encontrados = ids_ordenados[pos_valida] == raw_ids
+    return np.where(encontrados, ids_internos[pos_valida], -1)
+
+def indice_interno_usuario(fatores, user_id):
+    """Retorna o inner id do usuário no modelo CF, ou -1 se ele não estiver no treino."""
+    return int(_mapear_ids(fatores['uids_ordenados'], fatores['uids_internos'], [user_id])[0])
+
+def dobrar_usuario(fatores, movie_ids, notas):
+    """
+    Fatores (pu, bu) de um usuário a partir das suas avaliações, com qi, bi e a média
+    global fixos: estimativa MAP de (nota - média - bi) ~ qi . pu + bu, com ruído de
+    variância VARIANCIA_RUIDO_DOBRA e a priori normal dos usuários do treino
+    (priori_dos_usuarios). Com poucas avaliações o resultado fica perto do usuário médio;
+    com muitas, perto dos mínimos quadrados. Filmes fora do modelo são ignorados.
+    Retorna None se nenhum filme for conhecido. Sem vieses (biased=False), bu é 0 e o alvo é a própria nota.
+    """
+    itens = _mapear_ids(fatores['iids_ordenados'], fatores['iids_internos'], movie_ids)
+    conhecido = itens >= 0
+    if not conhecido.any():
+        return None
+    itens = itens[conhecido]
+    notas = np.asarray(notas, dtype=np.float64)[conhecido]
+    n, k = itens.size, fatores['qi'].shape[1]
+    if fatores['enviesado']:
+        x = np.empty((n, k + 1), dtype=np.float64)
+        x[:, :k] = fatores['qi'][itens]
+        x[:, k] = 1.0
+        alvo = notas - fatores['media_global'] - fatores['bi'][itens]
+    else:
+        x = np.asarray(fatores['qi'][itens], dtype=np.float64)
+        alvo = notas
+
+    # Com [pu, bu] = media + raiz @ z, a priori vira z ~ N(0, I) e o problema é uma
+    # regressão ridge em z com regularização VARIANCIA_RUIDO_DOBRA * I
+    media, raiz = fatores['priori_media'], fatores['priori_raiz']
+    alvo = alvo - x @ media
+    x = x @ raiz
+
+    if n < x.shape[1]:
+        # Forma dual (usuário com menos avaliações que fatores, o caso típico de um usuário
+        # novo): sistema n x n em vez de (k+1) x (k+1), com a mesma solução
+        gram = x @ x.T
+        gram[np.diag_indices(n)] += VARIANCIA_RUIDO_DOBRA
+        z = x.T @ np.linalg.solve(gram, alvo)
+    else:
+        a = x.T @ x
+        a[np.diag_indices(x.shape[1])] += VARIANCIA_RUIDO_DOBRA
+        z = np.linalg.solve(a, x.T @ alvo)
+
+    solucao = media + raiz @ z
+    if not fatores['enviesado']:
+        return solucao, 0.0
+    return solucao[:k], float(solucao[k])
+
+def _linhas_na_sobreposicao(sobreposicao, user_ids):
+    """Linha de cada usuário nos arrays da sobreposição, ou -1 se ele não estiver nela."""
+    if sobreposicao is None:
+        return np.full(np.shape(user_ids), -1, dtype=np.int64)
+    ids = sobreposicao['user_ids']
+    return _mapear_ids(ids, np.arange(ids.size), user_ids)
+
+def _sobreposicao_compativel(fatores, sobreposicao):
+    # Fatores dobrados contra outro modelo (outro n_factors) não podem ser usados
+    return sobreposicao is not None and sobreposicao['pu'].shape[1] == fatores['qi'].shape[1]
+
+def prever_notas_cf(fatores, user_id, movie_ids, sobreposicao=None):
+    """
+    Prevê as notas de um usuário para vários filmes de uma só vez.
+    Equivalente a [modelo.predict(user_id, m).est for m in movie_ids], incluindo
+    os fallbacks para usuário/filme desconhecido e o corte na escala de notas.
+    Se o usuário estiver na sobreposição (sobreposicao_cf.instantaneo()), os fatores
+    dobrados dela substituem os do treino.
+    """
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    u = indice_interno_usuario(fatores, user_id)
+    pu, bu = (fatores['pu'][u], fatores['bu'][u]) if u >= 0 else (None, 0.0)
+    if _sobreposicao_compativel(fatores, sobreposicao):
+        linha = int(_linhas_na_sobreposicao(sobreposicao, [user_id])[0])
+        if linha >= 0:
+            pu, bu = sobreposicao['pu'][linha], sobreposicao['bu'][linha]
+    itens = _mapear_ids(fatores['iids_ordenados'], fatores['iids_internos'], movie_ids)
+    item_conhecido = itens >= 0
+    itens_validos = itens[item_conhecido]
+
+    media = fatores['media_global']
+    if fatores['enviesado']:
+        notas = np.full(movie_ids.shape, media, dtype=np.float64)
+        if pu is not None:
+            notas += bu
+        notas[item_conhecido] += fatores['bi'][itens_validos]
+        if pu is not None:
+            notas[item_conhecido] += fatores['qi'][itens_validos] @ pu
+    else:
+        # Sem vieses o surprise não consegue prever pares desconhecidos e usa a média global.
+        notas = np.full(movie_ids.shape, media, dtype=np.float64)
+        if pu is not None:
+            notas[item_conhecido] = fatores['qi'][itens_validos] @ pu
+
+    nota_min, nota_max = fatores['escala']
+    return np.clip(notas, nota_min, nota_max)
+
+def prever_notas_cf_bloco(fatores, user_ids, movie_ids, sobreposicao=None):
+    """
+    Versão em bloco de prever_notas_cf: matriz (len(user_ids) x len(movie_ids)) com as
+    notas previstas de vários usuários de uma vez, via uma única multiplicação de matrizes.
+    """
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    usuarios = _mapear_ids(fatores['uids_ordenados'], fatores['uids_internos'], user_ids)
+    itens = _mapear_ids(fatores['iids_ordenados'], fatores['iids_internos'], movie_ids)
+    item_conhecido = itens >= 0
+    itens_validos = itens[item_conhecido]
+
+    # pu/bu de cada usuário do bloco: os da sobreposição têm prioridade sobre os do treino
+    linhas_sobreposicao = (_linhas_na_sobreposicao(sobreposicao, user_ids)
+                           if _sobreposicao_compativel(fatores, sobreposicao) else np.full(usuarios.shape, -1))
+    na_sobreposicao = linhas_sobreposicao >= 0
+    usuario_conhecido = (usuarios >= 0) | na_sobreposicao
+    pu = np.empty((usuarios.size, fatores['qi'].shape[1]), dtype=np.float64)
+    bu = np.zeros(usuarios.size, dtype=np.float64)
+    do_treino = (usuarios >= 0) & ~na_sobreposicao
+    pu[do_treino] = fatores['pu'][usuarios[do_treino]]
+    bu[do_treino] = fatores['bu'][usuarios[do_treino]]
+    if na_sobreposicao.any():
+        pu[na_sobreposicao] = sobreposicao['pu'][linhas_sobreposicao[na_sobreposicao]]
+        bu[na_sobreposicao] = sobreposicao['bu'][linhas_sobreposicao[na_sobreposicao]]
+
+    media = fatores['media_global']
+    notas = np.full((usuarios.size, movie_ids.size), media, dtype=np.float64)
+    interacao = pu[usuario_conhecido] @ fatores['qi'][itens_validos].T
+    conhecidos = np.ix_(usuario_conhecido, item_conhecido)
+    if fatores['enviesado']:
+        notas[usuario_conhecido, :] += bu[usuario_conhecido][:, None]
+        notas[:, item_conhecido] += fatores['bi'][itens_validos][None, :]
+        notas[conhecidos] += interacao
+    else:
+        notas[conhecidos] = interacao
+
+    nota_min, nota_max = fatores['escala']
+    return np.clip(notas, nota_min, nota_max, out=notas)
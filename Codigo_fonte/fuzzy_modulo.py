@@ -80,6 +80,174 @@ def testar_sistema(simulacao_fuzzy, nota, tempo):
     print(f"Resultado (Prioridade Final): {prioridade:.2f} / 100")
     return prioridade
 
+# --- Avaliador Fuzzy Vetorizado ---
+# O ControlSystemSimulation.compute() refaz a agregação das regras e a defuzzificação
+# em Python a cada chamada. O avaliador abaixo é montado uma única vez a partir das
+# regras e funções de pertinência do ControlSystem e calcula a prioridade de um array
+# inteiro de notas (para um mesmo tempo disponível) com operações NumPy.
+
+def compilar_avaliador_fuzzy(sistema_ctrl):
+    """
+    Extrai do ControlSystem (skfuzzy) os universos, funções de pertinência e regras
+    em arrays NumPy. Suporta regras com E/OU/NÃO, pesos nos consequentes e
+    defuzzificação por centroide de um único consequente.
+    """
+    consequentes = list(sistema_ctrl.consequents)
+    if len(consequentes) != 1:
+        raise ValueError("O avaliador vetorizado suporta apenas um consequente.")
+    consequente = consequentes[0]
+    if consequente.defuzzify_method != 'centroid':
+        raise ValueError(f"Método de defuzzificação '{consequente.defuzzify_method}' não suportado.")
+
+    antecedentes = {}
+    for antecedente in sistema_ctrl.antecedents:
+        universo = np.asarray(antecedente.universe, dtype=np.float64)
+        antecedentes[antecedente.label] = {
+            'universo': universo,
+            'termos': {label: np.asarray(termo.mf, dtype=np.float64) for label, termo in antecedente.terms.items()},
+        }
+
+    regras = []
+    for regra in sistema_ctrl.rules:
+        saidas = []
+        for termo_ponderado in regra.consequent:
+            if termo_ponderado.term.parent is not consequente:
+                raise ValueError("Regra com consequente desconhecido.")
+            saidas.append((termo_ponderado.term.label, termo_ponderado.weight))
+        regras.append({
+            'antecedente': _compilar_antecedente(regra.antecedent),
+            'e': regra.and_func,
+            'ou': regra.or_func,
+            'saidas': saidas,
+        })
+
+    return {
+        'antecedentes': antecedentes,
+        'regras': regras,
+        'saida': consequente.label,
+        'universo_saida': np.asarray(consequente.universe, dtype=np.float64),
+        'termos_saida': {label: np.asarray(termo.mf, dtype=np.float64) for label, termo in consequente.terms.items()},
+        'acumulacao': consequente.accumulation_method,
+    }
+
+def _compilar_antecedente(termo):
+    """Converte a árvore de Term/TermAggregate de uma regra em tuplas simples."""
+    if isinstance(termo, ctrl.term.TermAggregate):
+        if termo.kind == 'not':
+            return ('nao', _compilar_antecedente(termo.term1))
+        return (termo.kind, _compilar_antecedente(termo.term1), _compilar_antecedente(termo.term2))
+    return ('termo', termo.parent.label, termo.label)
+
+def _avaliar_antecedente(no, pertinencias, regra):
+    tipo = no[0]
+    if tipo == 'termo':
+        return pertinencias[(no[1], no[2])]
+    if tipo == 'nao':
+        return 1. - _avaliar_antecedente(no[1], pertinencias, regra)
+    func = regra['e'] if tipo == 'and' else regra['ou']
+    return func(_avaliar_antecedente(no[1], pertinencias, regra),
+                _avaliar_antecedente(no[2], pertinencias, regra))
+
+def _pontos_de_corte(universo, mf, cortes):
+    """
+    Para cada linha, os pontos do universo onde a função de pertinência cruza o
+    nível de corte (mesma regra de skfuzzy._interp_universe_fast). Retorna uma
+    matriz (N x K) completada com universo[0], que não altera a união dos pontos.
+    """
+    acima = np.where((cortes == 0.)[:, None], mf[None, :] > cortes[:, None], mf[None, :] >= cortes[:, None])
+    cruza = acima[:, 1:] != acima[:, :-1]
+    linhas, cols = np.nonzero(cruza)
+    contagem = cruza.sum(axis=1)
+    pontos = np.full((len(cortes), max(int(contagem.max(initial=0)), 1)), universo[0])
+    if linhas.size:
+        valores = (universo[cols]
+                   + (cortes[linhas] - mf[cols])
+                   * (universo[cols + 1] - universo[cols])
+                   / (mf[cols + 1] - mf[cols]))
+        inicio = np.cumsum(contagem) - contagem
+        pontos[linhas, np.arange(linhas.size) - inicio[linhas]] = valores
+    return pontos
+
+def calcular_prioridades_lote(avaliador, notas_previstas, tempo_disponivel):
+    """
+    Calcula a 'prioridade_final' para um array de notas previstas e um único tempo
+    disponível. Entradas fora do universo são cortadas nos limites (como no skfuzzy).
+    Retorna um array de floats; NaN onde a saída não pode ser defuzzificada
+    (área vazia), caso em que o compute() do skfuzzy lançaria ValueError.
+    """
+    notas = np.atleast_1d(np.asarray(notas_previstas, dtype=np.float64))
+    entradas = {'nota_prevista': notas, 'tempo_disponivel': float(tempo_disponivel)}
+    n = notas.shape[0]
+
+    # 1. Fuzzificação das entradas
+    pertinencias = {}
+    for label, antecedente in avaliador['antecedentes'].items():
+        universo = antecedente['universo']
+        valor = np.clip(entradas[label], universo.min(), universo.max())
+        for termo, mf in antecedente['termos'].items():
+            pertinencias[(label, termo)] = np.broadcast_to(np.interp(valor, universo, mf), (n,))
+
+    # 2. Regras (agregação, ativação e acumulação)
+    cortes = {}
+    for regra in avaliador['regras']:
+        disparo = _avaliar_antecedente(regra['antecedente'], pertinencias, regra)
+        for termo, peso in regra['saidas']:
+            ativacao = disparo * peso
+            cortes[termo] = ativacao if termo not in cortes else avaliador['acumulacao'](ativacao, cortes[termo])
+
+    if not cortes:
+        return np.full(n, np.nan)
+
+    # 3. Universo de saída com os pontos de corte de cada termo (como no skfuzzy)
+    universo = avaliador['universo_saida']
+    pontos = [np.broadcast_to(universo, (n, universo.size))]
+    for termo, corte in cortes.items():
+        pontos.append(_pontos_de_corte(universo, avaliador['termos_saida'][termo], np.asarray(corte, dtype=np.float64)))
+    x = np.sort(np.concatenate(pontos, axis=1), axis=1)
+
+    saida_mf = np.zeros_like(x)
+    for termo, corte in cortes.items():
+        mf = np.interp(x, universo, avaliador['termos_saida'][termo])
+        np.maximum(saida_mf, np.minimum(np.asarray(corte)[:, None], mf), out=saida_mf)
+
+    # 4. Defuzzificação por centroide (áreas exatas de cada trapézio)
+    dx = np.diff(x, axis=1)
+    y1, y2 = saida_mf[:, :-1], saida_mf[:, 1:]
+    area = 0.5 * dx * (y1 + y2)
+    momento = area * x[:, :-1] + dx * dx * (y1 + 2. * y2) / 6.
+    area_total = area.sum(axis=1)
+    prioridades = momento.sum(axis=1) / np.fmax(area_total, np.finfo(float).eps)
+    prioridades[saida_mf.sum(axis=1) == 0] = np.nan
+    return prioridades
+
+def verificar_equivalencia_skfuzzy(sistema_ctrl, tolerancia=1e-6):
+    ###Compara o avaliador vetorizado com o ControlSystemSimulation em uma grade de entradas.
+    avaliador = compilar_avaliador_fuzzy(sistema_ctrl)
+    notas = np.round(np.arange(0.5, 5.51, 0.05), 2) # Inclui valores fora do universo (corte nos limites)
+    maior_erro = 0.0
+
+    for tempo in (10, 15, 30, 60, 80, 90, 100, 120, 150, 200, 240, 300):
+        vetorizado = calcular_prioridades_lote(avaliador, notas, tempo)
+        for nota, valor in zip(notas, vetorizado):
+            # Simulação nova a cada ponto: uma simulação reutilizada pode manter a saída anterior quando a área é vazia
+            simulacao = ctrl.ControlSystemSimulation(sistema_ctrl)
+            simulacao.input['nota_prevista'] = nota
+            simulacao.input['tempo_disponivel'] = tempo
+            try:
+                simulacao.compute()
+                esperado = simulacao.output['prioridade_final']
+            except (ValueError, KeyError): # Área vazia: o skfuzzy não gera saída
+                esperado = np.nan
+            if np.isnan(esperado) != np.isnan(valor):
+                raise AssertionError(f"Divergência (nota={nota}, tempo={tempo}): skfuzzy={esperado}, vetorizado={valor}")
+            if not np.isnan(esperado):
+                maior_erro = max(maior_erro, abs(esperado - valor))
+
+    if maior_erro > tolerancia:
+        raise AssertionError(f"Avaliador vetorizado difere do skfuzzy em {maior_erro:.2e} (tolerância {tolerancia:.0e}).")
+    print(f"Avaliador vetorizado equivalente ao skfuzzy (maior diferença: {maior_erro:.2e}).")
+    return maior_erro
+
 # --- Bloco de Execução Principal ---
 if __name__ == "__main__":
     print("Executando 'fuzzy_modulo.py' para definir e salvar o sistema...")
@@ -97,4 +265,6 @@ if __name__ == "__main__":
     testar_sistema(sistema_sim, 3.0, 40)
     
     # Teste 4: Filme ruim (1.5), tempo qualquer (120 min) -> Deve dar prioridade BAIXA
-    testar_sistema(sistema_sim, 1.5, 120)
\ No newline at end of file
+    testar_sistema(sistema_sim, 1.5, 120)
+    print("\n--- Verificando o Avaliador Vetorizado contra o skfuzzy ---")
+    verificar_equivalencia_skfuzzy(sistema_sim.ctrl)
@@ -2,6 +2,11 @@ import pandas as pd
 import os
 import random
 from . import busca_filme 
+from . import indice_avaliacoes
+from . import indice_titulos
+from . import cache_recomendacoes
+from . import sobreposicao_cf
+from . import recursos
 import time
 import numpy as np
 
@@ -10,6 +15,7 @@ USUARIOS_CSV_PATH_GER = os.path.join("Data", "usuarios.csv")
 FILMES_CSV_PATH_GER = os.path.join("Data", "filmes.csv") 
 USUARIOS_DF_GER = None
 FILMES_DF_GER = None
+INDICE_AVALIACOES_GER = None # Índice CSR por usuário; atualizado a cada alteração de USUARIOS_DF_GER
 
 def _carregar_dados_gerenciamento():
     """Carrega o DataFrame de usuários e filmes globalmente."""
@@ -18,8 +24,10 @@ def _carregar_dados_gerenciamento():
     print("Iniciando carregamento de dados para gerenciamento de usuários...")
     
     try:
-        # Carrega filmes (necessário para listar filmes ao adicionar avaliações)
-        FILMES_DF_GER = pd.read_csv(FILMES_CSV_PATH_GER)
+        # Filmes (necessário para listar filmes ao adicionar avaliações), compartilhado pelo registro de recursos
+        FILMES_DF_GER = recursos.obter('filmes_df')
+        if FILMES_DF_GER is None:
+            raise FileNotFoundError(FILMES_CSV_PATH_GER)
         
         # Carrega ou cria USUARIOS_DF_GER
         if os.path.exists(USUARIOS_CSV_PATH_GER) and os.path.getsize(USUARIOS_CSV_PATH_GER) > 0:
@@ -40,21 +48,73 @@ def _carregar_dados_gerenciamento():
         print(f"ERRO INESPERADO ao carregar dados para gerenciamento: {e}")
         return False
 
-# Carrega os dados na inicialização do módulo
-_carregar_dados_gerenciamento()
+def _atualizar_indice_avaliacoes():
+    """Reconstrói o índice de avaliações a partir de USUARIOS_DF_GER."""
+    global INDICE_AVALIACOES_GER
+    if USUARIOS_DF_GER is not None:
+        INDICE_AVALIACOES_GER = indice_avaliacoes.construir_indice_avaliacoes(USUARIOS_DF_GER)
+
+def _garantir_dados_carregados():
+    """Carrega os dados de gerenciamento no primeiro uso (e não mais na importação do módulo)."""
+    if USUARIOS_DF_GER is None and _carregar_dados_gerenciamento():
+        _atualizar_indice_avaliacoes()
 
-def _salvar_usuarios_df():
-    """Salva o DataFrame de usuários no arquivo CSV."""
+def _salvar_usuarios_df(user_id=None):
+    """
+    Salva o DataFrame de usuários no arquivo CSV. Com 'user_id' (só as avaliações desse
+    usuário mudaram), os índices são atualizados apenas para ele; sem, são reconstruídos.
+    """
     global USUARIOS_DF_GER
     if USUARIOS_DF_GER is not None:
         USUARIOS_DF_GER.to_csv(USUARIOS_CSV_PATH_GER, index=False)
+        if user_id is None or INDICE_AVALIACOES_GER is None:
+            _atualizar_indice_avaliacoes()
+            # A cópia do registro de recursos (usada pelo recomendar) e o que depende dela são relidos no próximo uso
+            recursos.descartar('usuarios_df')
+        else:
+            _atualizar_usuario_nos_indices(user_id)
         print("Dados de usuários salvos em 'usuarios.csv'.")
 
+def _atualizar_usuario_nos_indices(user_id):
+    """
+    Troca as avaliações do usuário no índice local e nos artefatos já carregados do registro
+    de recursos (DataFrame, índice CSR e popularidade do autocompletar), sem recarregar o CSV.
+    """
+    global INDICE_AVALIACOES_GER
+    do_usuario = USUARIOS_DF_GER[USUARIOS_DF_GER['userId'] == user_id]
+    movie_ids = do_usuario['movieId'].to_numpy(dtype=np.int64)
+    ratings = do_usuario['rating'].to_numpy(dtype=np.float64)
+    antes = np.array(indice_avaliacoes.filmes_vistos(INDICE_AVALIACOES_GER, user_id))
+    INDICE_AVALIACOES_GER = indice_avaliacoes.substituir_usuario(INDICE_AVALIACOES_GER, user_id, movie_ids, ratings)
+
+    recursos.substituir('usuarios_df', lambda _: USUARIOS_DF_GER)
+    recursos.substituir('indice_avaliacoes', lambda indice: indice_avaliacoes.substituir_usuario(indice, user_id, movie_ids, ratings))
+    recursos.substituir('indice_prefixos', lambda indice: indice_titulos.atualizar_popularidade(indice, antes, movie_ids))
+
+def _dobrar_usuario_no_cf(user_id):
+    """
+    Recalcula os fatores CF do usuário a partir de todas as suas avaliações (fatores dos
+    filmes fixos) e os guarda em sobreposicao_cf, para que as próximas recomendações já
+    sejam personalizadas sem retreinar o modelo. Sem o modelo CF, não faz nada.
+    """
+    fatores = recursos.obter('fatores_cf')
+    if fatores is None or INDICE_AVALIACOES_GER is None:
+        return
+    movie_ids, notas = indice_avaliacoes.avaliacoes_do_usuario(INDICE_AVALIACOES_GER, user_id)
+    try:
+        sobreposicao_cf.atualizar_usuario(fatores, user_id, movie_ids, notas)
+    except Exception as e:
+        print(f"AVISO: Não foi possível atualizar os fatores CF do usuário {user_id}: {e}")
+
+def _usuario_existe(user_id):
+    return INDICE_AVALIACOES_GER is not None and indice_avaliacoes.usuario_existe(INDICE_AVALIACOES_GER, user_id)
+
 def obter_proximo_userid():
     """Retorna o próximo userId disponível."""
-    if USUARIOS_DF_GER is None or USUARIOS_DF_GER.empty or 'userId' not in USUARIOS_DF_GER.columns:
+    _garantir_dados_carregados()
+    if INDICE_AVALIACOES_GER is None or USUARIOS_DF_GER.empty:
         return 1
-    return USUARIOS_DF_GER['userId'].max() + 1
+    return indice_avaliacoes.maior_user_id(INDICE_AVALIACOES_GER) + 1
 
 def _adicionar_novo_usuario():
     """Adiciona um novo usuário ao sistema."""
@@ -78,7 +138,7 @@ def _listar_usuarios():
         print("\nAVISO: Coluna 'userId' não encontrada no DataFrame.")
         return False
         
-    user_ids = USUARIOS_DF_GER['userId'].unique()
+    user_ids = indice_avaliacoes.usuarios_disponiveis(INDICE_AVALIACOES_GER)
 
     if user_ids.size == 0:
         print("\nNão há usuários registrados ainda.")
@@ -99,9 +159,11 @@ def _deletar_usuario():
 
     try:
         user_id_del = int(input("Digite o ID do usuário a ser deletado: ").strip())
-        if user_id_del in USUARIOS_DF_GER['userId'].unique():
+        if _usuario_existe(user_id_del):
             USUARIOS_DF_GER = USUARIOS_DF_GER[USUARIOS_DF_GER['userId'] != user_id_del]
-            _salvar_usuarios_df()
+            _salvar_usuarios_df(user_id_del)
+            sobreposicao_cf.remover_usuario(user_id_del)
+            cache_recomendacoes.invalidar_usuario(user_id_del)
             print(f"Usuário {user_id_del} e suas avaliações deletados com sucesso.")
         else:
             print("ID de usuário não encontrado.")
@@ -111,10 +173,11 @@ def _deletar_usuario():
 def selecionar_usuario_existente():
     """Permite ao usuário selecionar um ID de usuário existente."""
     global USUARIOS_DF_GER
+    _garantir_dados_carregados()
     if _listar_usuarios():
         try:
             user_id_sel = int(input("Digite o ID do usuário que deseja selecionar: ").strip())
-            if user_id_sel in USUARIOS_DF_GER['userId'].unique():
+            if _usuario_existe(user_id_sel):
                 print(f"Usuário {user_id_sel} selecionado.")
                 return user_id_sel
             else:
@@ -130,6 +193,7 @@ def adicionar_avaliacoes(user_id, num_avaliacoes_aleatorias=10):
     Permite ao usuário adicionar avaliações (ou atribui avaliações aleatórias se o catálogo for pequeno).
     """
     global USUARIOS_DF_GER, FILMES_DF_GER
+    _garantir_dados_carregados()
     
     if FILMES_DF_GER is None or FILMES_DF_GER.empty:
         print("Não foi possível carregar o catálogo de filmes. Não é possível adicionar avaliações.")
@@ -139,7 +203,7 @@ def adicionar_avaliacoes(user_id, num_avaliacoes_aleatorias=10):
     print("Digite 'fim' para parar de adicionar avaliações.")
 
     # 1. Atribuição de Avaliações Aleatórias (Para garantir que o novo usuário tenha dados)
-    if user_id not in USUARIOS_DF_GER['userId'].unique():
+    if not _usuario_existe(user_id):
         print("Atribuindo avaliações iniciais aleatórias (para fins de teste)...")
         filmes_para_amostra = FILMES_DF_GER[FILMES_DF_GER['movieId'].notna()]
         if len(filmes_para_amostra) >= num_avaliacoes_aleatorias:
@@ -154,7 +218,9 @@ def adicionar_avaliacoes(user_id, num_avaliacoes_aleatorias=10):
         
         if novas_avaliacoes:
             USUARIOS_DF_GER = pd.concat([USUARIOS_DF_GER, pd.DataFrame(novas_avaliacoes)], ignore_index=True)
-            _salvar_usuarios_df()
+            _salvar_usuarios_df(user_id)
+            _dobrar_usuario_no_cf(user_id)
+            cache_recomendacoes.invalidar_usuario(user_id)
             print(f"Atribuição de {len(novas_avaliacoes)} avaliações aleatórias concluída.")
 
     # 2. Loop para Entrada Manual
@@ -164,8 +230,14 @@ def adicionar_avaliacoes(user_id, num_avaliacoes_aleatorias=10):
         if titulo_busca.lower() == 'fim':
             break # Sai do loop de entrada manual
 
-        # A função busca_filme.encontrar_movieid_por_titulo retorna uma LISTA DE IDs (inteiros)
-        found_movie_ids = busca_filme.encontrar_movieid_por_titulo(titulo_busca, top_n=5) 
+        # Primeiro os títulos que começam com o texto digitado (mais avaliados primeiro);
+        # a busca aproximada completa a lista, cobrindo erros de digitação.
+        found_movie_ids = busca_filme.autocompletar_titulo(titulo_busca, top_n=5)
+        if len(found_movie_ids) < 5:
+            # A função busca_filme.encontrar_movieid_por_titulo retorna uma LISTA DE IDs (inteiros)
+            for movie_id in busca_filme.encontrar_movieid_por_titulo(titulo_busca, top_n=5) or []:
+                if movie_id not in found_movie_ids and len(found_movie_ids) < 5:
+                    found_movie_ids.append(movie_id)
         
         if found_movie_ids:
             # Filtra o DataFrame de filmes com base nos IDs encontrados
@@ -229,7 +301,9 @@ def adicionar_avaliacoes(user_id, num_avaliacoes_aleatorias=10):
             }])
 
             USUARIOS_DF_GER = pd.concat([USUARIOS_DF_GER, new_rating_data], ignore_index=True)
-            _salvar_usuarios_df()
+            _salvar_usuarios_df(user_id)
+            _dobrar_usuario_no_cf(user_id)
+            cache_recomendacoes.invalidar_usuario(user_id)
             print(f"Avaliação para '{titulo_filme}' adicionada com sucesso.")
             
         else:
@@ -241,6 +315,7 @@ def gerenciar_usuarios_menu():
     Menu principal para gerenciamento de usuários.
     Retorna o userId selecionado/criado para ser usado no menu de recomendações.
     """
+    _garantir_dados_carregados()
     new_user_id_return = None
     while True:
         print("\n--- Menu de Gerenciamento de Usuários ---")
@@ -272,7 +347,7 @@ def gerenciar_usuarios_menu():
             if _listar_usuarios():
                 try:
                     user_id_avaliar = int(input("Digite o ID do usuário para adicionar avaliações: ").strip())
-                    if user_id_avaliar in USUARIOS_DF_GER['userId'].unique():
+                    if _usuario_existe(user_id_avaliar):
                         adicionar_avaliacoes(user_id_avaliar)
                     else:
                         print("ID de usuário não encontrado.")
@@ -0,0 +1,165 @@
+import os
+import numpy as np
+from Codigo_fonte import pnl_vetorizado
+
+# Índice aproximado (IVF) para a busca de similares do PNL em catálogos grandes.
+# Os vetores normalizados são agrupados por k-means esférico em 'n_listas' listas; a busca
+# compara a semente apenas com os centróides e depois, de forma exata, com os filmes das
+# 'n_sondas' listas mais próximas. Com n_listas ~ sqrt(filmes), cada consulta olha
+# ~n_sondas * sqrt(filmes) vetores em vez do catálogo inteiro.
+# Botões: n_listas (na construção) e n_sondas (na consulta): mais sondas = mais recall e
+# mais latência. medir_recall() compara com a busca exata. n_sondas pode ser passado em cada
+# busca (busca_filme, pnl_vetorizado.buscar_vizinhos, ranqueamento.candidatos_pnl); o padrão
+# do processo vem de RECOMENDA_AI_N_SONDAS.
+# O arquivo guarda a impressao_pnl do modelo usado na construção: um índice de outro treino
+# (mesmo com o mesmo número de filmes) é ignorado na carga.
+
+N_SONDAS_PADRAO = int(os.environ.get("RECOMENDA_AI_N_SONDAS", "8"))
+ITERACOES_KMEANS = 10
+AMOSTRA_POR_LISTA = 256 # Pontos de treino do k-means por lista
+
+def _atribuir(vetores, centroides, linhas=None):
+    """Lista (centróide mais similar) de cada vetor, calculada em blocos."""
+    linhas = np.arange(vetores.shape[0]) if linhas is None else linhas
+    atribuicao = np.empty(linhas.size, dtype=np.int64)
+    tamanho_bloco = max(1, pnl_vetorizado.LIMITE_ELEMENTOS_BLOCO // max(centroides.shape[0], 1))
+    for inicio in range(0, linhas.size, tamanho_bloco):
+        bloco = vetores[linhas[inicio:inicio + tamanho_bloco]]
+        atribuicao[inicio:inicio + tamanho_bloco] = np.argmax(bloco @ centroides.T, axis=1)
+    return atribuicao
+
+def _normalizar(matriz):
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+def construir_indice_ivf(pnl, n_listas=None, iteracoes=ITERACOES_KMEANS, semente=42):
+    """
+    Treina o k-means esférico sobre uma amostra dos vetores normalizados e distribui
+    todos os filmes nas listas. Retorna {'centroides', 'offsets', 'linhas'}: os filmes da
+    lista j são linhas[offsets[j]:offsets[j + 1]].
+    """
+    vetores = pnl['vetores']
+    total = vetores.shape[0]
+    n_listas = int(n_listas or max(1, round(np.sqrt(total))))
+    n_listas = max(1, min(n_listas, total))
+    rng = np.random.default_rng(semente)
+
+    amostra = rng.choice(total, size=min(total, n_listas * AMOSTRA_POR_LISTA), replace=False)
+    pontos = vetores[amostra]
+    centroides = pontos[rng.choice(pontos.shape[0], size=n_listas, replace=False)].copy()
+    for _ in range(iteracoes):
+        atribuicao = _atribuir(pontos, centroides)
+        somas = np.zeros_like(centroides)
+        np.add.at(somas, atribuicao, pontos)
+        vazias = np.bincount(atribuicao, minlength=n_listas) == 0
+        somas[vazias] = pontos[rng.choice(pontos.shape[0], size=int(vazias.sum()))] # Recomeça listas vazias
+        centroides = _normalizar(somas)
+
+    atribuicao = _atribuir(vetores, centroides)
+    linhas = np.argsort(atribuicao, kind='stable').astype(np.int32)
+    offsets = np.zeros(n_listas + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(atribuicao, minlength=n_listas))
+    return {'centroides': centroides.astype(np.float32), 'offsets': offsets, 'linhas': linhas}
+
+def atualizar_indice_ivf(pnl, indice, linhas_alteradas):
+    """
+    Redistribui nas listas existentes as linhas alteradas ou adicionadas ao fim da matriz,
+    sem treinar o k-means de novo (os centróides ficam os mesmos).
+    """
+    n_listas = indice['centroides'].shape[0]
+    total = pnl['vetores'].shape[0]
+    if indice['linhas'].size > total or indice['centroides'].shape[1] != pnl['vetores'].shape[1]:
+        return None
+    atribuicao = np.full(total, -1, dtype=np.int64)
+    atribuicao[indice['linhas']] = np.repeat(np.arange(n_listas), np.diff(indice['offsets']))
+    alteradas = np.unique(np.asarray(linhas_alteradas, dtype=np.int64))
+    atribuicao[alteradas] = _atribuir(pnl['vetores'], indice['centroides'], alteradas)
+    if (atribuicao < 0).any(): # Há linhas novas fora de 'linhas_alteradas': o índice precisa ser reconstruído
+        return None
+
+    linhas = np.argsort(atribuicao, kind='stable').astype(np.int32)
+    offsets = np.zeros(n_listas + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(atribuicao, minlength=n_listas))
+    return {'centroides': indice['centroides'], 'offsets': offsets, 'linhas': linhas}
+
+def salvar_indice_ivf(pnl, indice, caminho):
+    """Grava o índice e a impressao_pnl do modelo em um temporário e troca o arquivo de uma vez."""
+    temporario = caminho + ".tmp.npz"
+    np.savez(temporario, impressao_pnl=np.array(pnl_vetorizado.impressao_pnl(pnl)), **indice)
+    os.replace(temporario, caminho)
+
+def carregar_indice_ivf(pnl, caminho):
+    """Carrega o índice; None se o arquivo não existir ou não corresponder ao modelo carregado."""
+    if not os.path.exists(caminho):
+        return None
+    with np.load(caminho) as dados:
+        impressao = str(dados['impressao_pnl']) if 'impressao_pnl' in dados.files else None
+        indice = {nome: dados[nome] for nome in ('centroides', 'offsets', 'linhas')}
+    if impressao != pnl_vetorizado.impressao_pnl(pnl):
+        print(f"AVISO: Índice ANN do PNL '{caminho}' não foi construído para o modelo carregado. Ignorando.")
+        return None
+    total = pnl['vetores'].shape[0]
+    if indice['linhas'].size != total or indice['centroides'].shape[1] != pnl['vetores'].shape[1]:
+        print(f"AVISO: Índice ANN do PNL ({indice['linhas'].size} filmes) não corresponde ao modelo ({total} filmes). Ignorando.")
+        return None
+    return indice
+
+def buscar_ivf(pnl, indice, linhas, top_n, n_sondas=None):
+    """
+    Versão aproximada de pnl_vetorizado.vizinhos_mais_proximos (mesmo formato de saída).
+    Visita as n_sondas listas mais próximas (padrão: N_SONDAS_PADRAO); se elas não tiverem
+    top_n filmes além da semente, mais listas são visitadas.
+    """
+    linhas = np.asarray(linhas, dtype=np.int64)
+    return buscar_ivf_por_vetores(pnl, indice, pnl['vetores'][linhas], top_n, n_sondas, excluir=linhas)
+
+def buscar_ivf_por_vetores(pnl, indice, consultas, top_n, n_sondas=None, excluir=None):
+    """
+    Busca aproximada a partir de vetores de consulta normalizados (consultas x dimensões).
+    'excluir' (opcional) é a linha a ignorar para cada consulta, como a semente em buscar_ivf.
+    """
+    n_sondas = N_SONDAS_PADRAO if n_sondas is None else n_sondas
+    vetores = pnl['vetores']
+    consultas = np.asarray(consultas)
+    total = vetores.shape[0]
+    k = max(min(int(top_n), total - (excluir is not None)), 0)
+    vizinhos = np.empty((consultas.shape[0], k), dtype=np.int64)
+    similaridades = np.empty((consultas.shape[0], k), dtype=np.float64)
+    if k == 0 or consultas.shape[0] == 0:
+        return vizinhos, similaridades
+
+    centroides, offsets = indice['centroides'], indice['offsets']
+    tamanhos = np.diff(offsets)
+    ordem_listas = np.argsort(-(consultas @ centroides.T), axis=1, kind='stable')
+    necessarios = k + (excluir is not None)
+
+    for i in range(consultas.shape[0]):
+        # Número de listas visitadas: ao menos n_sondas, e o bastante para ter k candidatos além da semente
+        acumulado = np.cumsum(tamanhos[ordem_listas[i]])
+        n_listas = max(int(n_sondas), int(np.searchsorted(acumulado, necessarios)) + 1)
+        candidatos = np.concatenate([indice['linhas'][offsets[j]:offsets[j + 1]] for j in ordem_listas[i, :n_listas]])
+        if excluir is not None:
+            candidatos = candidatos[candidatos != excluir[i]]
+        candidatos = candidatos.astype(np.int64)
+
+        valores = vetores[candidatos] @ consultas[i]
+        if k < candidatos.size:
+            topo = np.argpartition(-valores, k - 1)[:k]
+            candidatos, valores = candidatos[topo], valores[topo]
+        ordem = np.lexsort((candidatos, -valores))[:k]
+        vizinhos[i] = candidatos[ordem]
+        similaridades[i] = valores[ordem]
+
+    return vizinhos, similaridades
+
+def medir_recall(pnl, indice, k=10, n_sondas=None, amostra=200, semente=0):
+    """recall@k médio do índice em relação à busca exata, para 'amostra' sementes aleatórias."""
+    total = pnl['vetores'].shape[0]
+    linhas = np.random.default_rng(semente).choice(total, size=min(amostra, total), replace=False)
+    exatos, _ = pnl_vetorizado.vizinhos_mais_proximos(pnl, linhas, k)
+    aproximados, _ = buscar_ivf(pnl, indice, linhas, k, n_sondas)
+    if exatos.shape[1] == 0:
+        return 1.0
+    acertos = [np.intersect1d(e, a).size for e, a in zip(exatos, aproximados)]
+    return float(np.mean(acertos) / exatos.shape[1])
@@ -0,0 +1,109 @@
+import numpy as np
+
+# Índice de avaliações por usuário no formato CSR.
+# Montado uma única vez a partir do usuarios.csv: as avaliações ficam ordenadas por
+# (userId, movieId) e 'offsets' marca onde começa cada usuário. Assim os filmes vistos
+# e favoritos de um usuário saem como fatias dos arrays, sem varrer todas as avaliações.
+# Quando só um usuário muda (uma avaliação nova), substituir_usuario troca a fatia dele
+# sem reler o CSV nem reordenar as demais avaliações.
+
+NOTA_FAVORITO = 4.5
+
+def construir_indice_avaliacoes(ratings_df):
+    """
+    Monta o índice a partir do DataFrame de avaliações (colunas userId, movieId, rating).
+    Retorna um dicionário com:
+      'user_ids'  -> userIds únicos e ordenados
+      'offsets'   -> avaliações do usuário i em [offsets[i], offsets[i+1])
+      'movie_ids' -> movieIds ordenados dentro de cada usuário
+      'ratings'   -> notas alinhadas com 'movie_ids'
+    """
+    user_ids = ratings_df['userId'].to_numpy(dtype=np.int64)
+    movie_ids = ratings_df['movieId'].to_numpy(dtype=np.int64)
+    ratings = ratings_df['rating'].to_numpy(dtype=np.float64)
+
+    ordem = np.lexsort((movie_ids, user_ids))
+    user_ids, movie_ids, ratings = user_ids[ordem], movie_ids[ordem], ratings[ordem]
+
+    usuarios, inicio = np.unique(user_ids, return_index=True)
+    offsets = np.empty(usuarios.size + 1, dtype=np.int64)
+    offsets[:-1] = inicio
+    offsets[-1] = user_ids.size
+
+    return {
+        'user_ids': usuarios,
+        'offsets': offsets,
+        'movie_ids': movie_ids,
+        'ratings': ratings,
+    }
+
+def substituir_usuario(indice, user_id, movie_ids, ratings):
+    """
+    Novo índice com as avaliações do usuário trocadas por (movie_ids, ratings); sem nenhuma,
+    o usuário sai do índice. Igual a reconstruir o índice com o DataFrame alterado, mas só
+    copia os arrays (sem ordenação global). O índice recebido não é alterado: quem já o
+    tem continua lendo um estado consistente.
+    """
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    ratings = np.asarray(ratings, dtype=np.float64)
+    ordem = np.argsort(movie_ids, kind='stable') # Mesma ordem do lexsort de construir_indice_avaliacoes
+    movie_ids, ratings = movie_ids[ordem], ratings[ordem]
+
+    usuarios, offsets = indice['user_ids'], indice['offsets']
+    pos = int(np.searchsorted(usuarios, user_id))
+    existe = pos < usuarios.size and usuarios[pos] == user_id
+    if not existe and movie_ids.size == 0:
+        return indice
+    inicio = int(offsets[pos])
+    fim = int(offsets[pos + 1]) if existe else inicio
+    diferenca = movie_ids.size - (fim - inicio)
+
+    if existe and movie_ids.size:
+        novos_usuarios = usuarios
+        novos_offsets = np.concatenate([offsets[:pos + 1], offsets[pos + 1:] + diferenca])
+    elif existe: # Remoção: o próximo usuário passa a começar onde este começava
+        novos_usuarios = np.delete(usuarios, pos)
+        novos_offsets = np.concatenate([offsets[:pos + 1], offsets[pos + 2:] + diferenca])
+    else:
+        novos_usuarios = np.insert(usuarios, pos, user_id)
+        novos_offsets = np.concatenate([offsets[:pos + 1], offsets[pos:] + diferenca])
+
+    return {
+        'user_ids': novos_usuarios,
+        'offsets': novos_offsets,
+        'movie_ids': np.concatenate([indice['movie_ids'][:inicio], movie_ids, indice['movie_ids'][fim:]]),
+        'ratings': np.concatenate([indice['ratings'][:inicio], ratings, indice['ratings'][fim:]]),
+    }
+
+def _posicao_usuario(indice, user_id):
+    """Posição do usuário em 'user_ids' (busca binária), ou -1 se ele não tiver avaliações."""
+    usuarios = indice['user_ids']
+    pos = int(np.searchsorted(usuarios, user_id))
+    if pos < usuarios.size and usuarios[pos] == user_id:
+        return pos
+    return -1
+
+def usuario_existe(indice, user_id):
+    return _posicao_usuario(indice, user_id) >= 0
+
+def avaliacoes_do_usuario(indice, user_id):
+    """Retorna (movie_ids, ratings) do usuário como fatias dos arrays do índice."""
+    pos = _posicao_usuario(indice, user_id)
+    if pos < 0:
+        return indice['movie_ids'][:0], indice['ratings'][:0]
+    inicio, fim = indice['offsets'][pos], indice['offsets'][pos + 1]
+    return indice['movie_ids'][inicio:fim], indice['ratings'][inicio:fim]
+
+def filmes_vistos(indice, user_id):
+    return avaliacoes_do_usuario(indice, user_id)[0]
+
+def filmes_favoritos(indice, user_id, nota_minima=NOTA_FAVORITO):
+    movie_ids, ratings = avaliacoes_do_usuario(indice, user_id)
+    return movie_ids[ratings >= nota_minima]
+
+def usuarios_disponiveis(indice):
+    """userIds (ordenados) que possuem ao menos uma avaliação."""
+    return indice['user_ids']
+
+def maior_user_id(indice):
+    return int(indice['user_ids'][-1]) if indice['user_ids'].size else 0
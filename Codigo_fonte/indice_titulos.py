@@ -0,0 +1,156 @@
+import bisect
+import re
+import unicodedata
+import numpy as np
+
+# Índice invertido de trigramas dos títulos, para a busca tolerante a erros de digitação.
+# Os títulos são normalizados (sem acentos, minúsculos, sem o ano entre parênteses) e
+# quebrados em trigramas de caracteres; cada trigrama aponta para as linhas dos títulos que
+# o contêm (listas em formato CSR). Uma consulta conta quantos trigramas cada título
+# compartilha com ela e só os melhores colocados vão para o fuzzywuzzy.
+
+_ANO = re.compile(r"\s*\(\d{4}\)\s*$")
+_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+def normalizar_titulo(titulo):
+    """'Coração Valente (1995)' -> 'coracao valente'."""
+    if not isinstance(titulo, str):
+        return ""
+    titulo = _ANO.sub("", titulo)
+    titulo = unicodedata.normalize('NFKD', titulo).encode('ascii', 'ignore').decode('ascii')
+    return _NAO_ALFANUMERICO.sub(" ", titulo.lower()).strip()
+
+def trigramas(texto_normalizado):
+    """Trigramas (sem repetição) do texto com um espaço de cada lado: 'toy' -> {' to', 'toy', 'oy '}."""
+    texto = f" {texto_normalizado} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def construir_indice_titulos(titulos_map):
+    """
+    Monta o índice a partir da Series movieId -> título. Retorna um dicionário com
+    'movie_ids' e 'titulos' (por linha), 'qtd_trigramas' de cada título, o vocabulário
+    'trigrama_id' e as listas invertidas 'offsets'/'linhas'.
+    """
+    movie_ids = titulos_map.index.to_numpy(dtype=np.int64)
+    titulos = titulos_map.tolist()
+
+    trigrama_id = {}
+    ids_trigramas = []
+    qtd_trigramas = np.zeros(len(titulos), dtype=np.int32)
+    for linha, titulo in enumerate(titulos):
+        grams = trigramas(normalizar_titulo(titulo))
+        qtd_trigramas[linha] = len(grams)
+        ids_trigramas.append([trigrama_id.setdefault(g, len(trigrama_id)) for g in grams])
+
+    # Pares (trigrama, linha) ordenados por trigrama = listas invertidas em CSR
+    pares_trigrama = np.fromiter((t for ids in ids_trigramas for t in ids), dtype=np.int32, count=int(qtd_trigramas.sum()))
+    pares_linha = np.repeat(np.arange(len(titulos), dtype=np.int32), qtd_trigramas)
+    ordem = np.argsort(pares_trigrama, kind='stable')
+    offsets = np.zeros(len(trigrama_id) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(pares_trigrama, minlength=len(trigrama_id)))
+
+    return {
+        'movie_ids': movie_ids,
+        'titulos': titulos,
+        'qtd_trigramas': qtd_trigramas,
+        'trigrama_id': trigrama_id,
+        'offsets': offsets,
+        'linhas': pares_linha[ordem],
+    }
+
+def pre_selecionar(indice, consulta, limite):
+    """
+    Linhas dos até 'limite' títulos mais parecidos com a consulta pelo coeficiente de Dice
+    dos trigramas (2 * comuns / (trigramas da consulta + do título)), da maior para a menor.
+    """
+    grams = trigramas(normalizar_titulo(consulta))
+    ids = [indice['trigrama_id'][g] for g in grams if g in indice['trigrama_id']]
+    if not ids:
+        return np.empty(0, dtype=np.int64)
+
+    offsets = indice['offsets']
+    postagens = np.concatenate([indice['linhas'][offsets[t]:offsets[t + 1]] for t in ids])
+    linhas, comuns = np.unique(postagens, return_counts=True)
+    dice = 2.0 * comuns / (len(grams) + indice['qtd_trigramas'][linhas])
+
+    if linhas.size > limite:
+        melhores = np.argpartition(-dice, limite - 1)[:limite]
+        linhas, dice = linhas[melhores], dice[melhores]
+    ordem = np.lexsort((linhas, -dice))
+    return linhas[ordem]
+
+# --- Autocompletar por prefixo ---
+# Lista ordenada com as palavras normalizadas de todos os títulos (uma entrada por palavra
+# de cada título). Um prefixo corresponde a um intervalo contíguo da lista, achado por busca
+# binária; os títulos do intervalo são ordenados pela popularidade (número de avaliações).
+
+def construir_indice_prefixos(titulos_map, indice_avaliacoes=None):
+    """
+    Monta o índice de prefixos a partir da Series movieId -> título e, se informado, do
+    índice CSR das avaliações (popularidade = número de avaliações de cada filme).
+    """
+    movie_ids = titulos_map.index.to_numpy(dtype=np.int64)
+    entradas = sorted((palavra, linha)
+                      for linha, titulo in enumerate(titulos_map.tolist())
+                      for palavra in set(normalizar_titulo(titulo).split()))
+
+    popularidade = np.zeros(movie_ids.size, dtype=np.int64)
+    if indice_avaliacoes is not None and indice_avaliacoes['movie_ids'].size:
+        avaliados, contagens = np.unique(indice_avaliacoes['movie_ids'], return_counts=True)
+        pos = np.minimum(np.searchsorted(avaliados, movie_ids), avaliados.size - 1)
+        encontrados = avaliados[pos] == movie_ids
+        popularidade[encontrados] = contagens[pos[encontrados]]
+
+    return {
+        'palavras': [palavra for palavra, _ in entradas],
+        'linhas': np.fromiter((linha for _, linha in entradas), dtype=np.int32, count=len(entradas)),
+        'movie_ids': movie_ids,
+        'ordem_ids': np.argsort(movie_ids, kind='stable'), # Para achar a linha de um movieId
+        'popularidade': popularidade,
+    }
+
+def atualizar_popularidade(indice, removidos, adicionados):
+    """
+    Novo índice de prefixos com a popularidade ajustada: -1 para cada avaliação removida e +1
+    para cada adicionada (movieIds, com repetição). As palavras são compartilhadas com o original.
+    """
+    popularidade = indice['popularidade'].copy()
+    ids_ordenados = indice['movie_ids'][indice['ordem_ids']]
+    for movie_ids, sinal in ((removidos, -1), (adicionados, 1)):
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if movie_ids.size == 0 or ids_ordenados.size == 0:
+            continue
+        pos = np.minimum(np.searchsorted(ids_ordenados, movie_ids), ids_ordenados.size - 1)
+        encontrados = ids_ordenados[pos] == movie_ids
+        np.add.at(popularidade, indice['ordem_ids'][pos[encontrados]], sinal)
+    return dict(indice, popularidade=popularidade)
+
+def _linhas_com_prefixo(indice, prefixo):
+    inicio = bisect.bisect_left(indice['palavras'], prefixo)
+    fim = bisect.bisect_left(indice['palavras'], prefixo + "{") # '{' vem logo depois de 'z'
+    return indice['linhas'][inicio:fim]
+
+def autocompletar(indice, texto, top_n=10):
+    """
+    movieIds dos top_n títulos mais populares em que cada palavra digitada é prefixo de
+    alguma palavra do título ('toy st' -> 'Toy Story'). Empates: menor movieId primeiro.
+    """
+    palavras = normalizar_titulo(texto).split()
+    if not palavras or top_n <= 0:
+        return []
+
+    linhas = None
+    for palavra in sorted(set(palavras), key=len, reverse=True): # Prefixos longos têm intervalos menores
+        encontradas = _linhas_com_prefixo(indice, palavra)
+        linhas = np.unique(encontradas) if linhas is None else np.intersect1d(linhas, encontradas)
+        if linhas.size == 0:
+            return []
+
+    popularidade = indice['popularidade'][linhas]
+    if linhas.size > top_n:
+        limite = np.partition(popularidade, linhas.size - top_n)[linhas.size - top_n]
+        finalistas = popularidade >= limite # Todos os empatados com o N-ésimo continuam na disputa
+        linhas, popularidade = linhas[finalistas], popularidade[finalistas]
+    movie_ids = indice['movie_ids'][linhas]
+    ordem = np.lexsort((movie_ids, -popularidade))[:top_n]
+    return movie_ids[ordem].tolist()
@@ -2,19 +2,34 @@ import pandas as pd
 import pickle
 import os
 import numpy as np
+import sys
+import time
 from surprise import Dataset, Reader
 from surprise.model_selection import GridSearchCV
 from surprise import SVD
 
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if diretorio_projeto not in sys.path: # Permite rodar como script (python3 Codigo_fonte/machine.py)
+    sys.path.insert(0, diretorio_projeto)
+from Codigo_fonte import ajuste_cf # Successive halving
+from Codigo_fonte import sobreposicao_cf
+from Codigo_fonte import cf_vetorizado
+
 DATA_FILE = os.path.join("Data", "usuarios.csv")
 MODEL_FILE = os.path.join ("Modelos", "modelo_colaborativo.pkl")
+ARTEFATO_DIR = os.path.join("Modelos", "cf_modelo") # Fatores em float32 para o recomendar (mmap, sem surprise)
+MODO_BUSCA = 'halving' # 'halving' (ajuste_cf.py) ou 'grade' (GridSearchCV com todas as 36 combinações)
+ORCAMENTO_SEGUNDOS = None # Limite de tempo da busca por halving (None: sem limite)
+MAX_TENTATIVAS = None     # Limite de tentativas da busca por halving (None: sem limite)
 
 print("iniciando o script machine.py...")
          
-def otimizar_e_treinar_modelo_colaborativo():
+def otimizar_e_treinar_modelo_colaborativo(modo=MODO_BUSCA, orcamento_segundos=ORCAMENTO_SEGUNDOS,
+                                           max_tentativas=MAX_TENTATIVAS, n_processos=None):
     """
-    Carrega os dados de avaliação, otimiza os hiperparâmetros do modelo SVD usando GridSearchCV,
-    treina o modelo SVD final com os melhores parâmetros e o salva.
+    Carrega os dados de avaliação, otimiza os hiperparâmetros do modelo SVD (successive halving
+    com parada antecipada, ou GridSearchCV com modo='grade'), treina o modelo SVD final com os
+    melhores parâmetros e o salva.
     """
 
     try: 
@@ -38,18 +53,26 @@ def otimizar_e_treinar_modelo_colaborativo():
         'random_state': [42]
     }
 
-    print("\nExecutando GridSearchCV para encontrar os melhores hiperparâmetros...")
-    gs = GridSearchCV (SVD, param_grid, measures=['rmse'], cv=3, n_jobs=-1)
-
-    gs.fit(data)  # . fit Executa e treina o 'data'
+    if modo == 'grade':
+        print("\nExecutando GridSearchCV para encontrar os melhores hiperparâmetros...")
+        gs = GridSearchCV (SVD, param_grid, measures=['rmse'], cv=3, n_jobs=-1)
 
-    print("\n--- Resultados do Grid Search ---")
-    print("Melhor RMSE:", gs.best_score['rmse'])
-    print("Melhores parâmetros:", gs.best_params['rmse'])
+        gs.fit(data)  # . fit Executa e treina o 'data'
+        melhor_rmse, melhores_parametros = gs.best_score['rmse'], gs.best_params['rmse']
+    else:
+        print("\nExecutando successive halving para encontrar os melhores hiperparâmetros...")
+        melhores_parametros, melhor_rmse, _ = ajuste_cf.buscar_hiperparametros(
+            df_usuarios, param_grid, n_dobras=3, orcamento_segundos=orcamento_segundos,
+            max_tentativas=max_tentativas, n_processos=n_processos, escala=reader.rating_scale)
+        print(f"Resultados de cada tentativa em '{ajuste_cf.LOG_TENTATIVAS_FILE}'.")
+
+    print("\n--- Resultados da Busca ---")
+    print("Melhor RMSE:", melhor_rmse)
+    print("Melhores parâmetros:", melhores_parametros)
     print("\nTreinando o modelo final SVD com os melhores parâmetros encontrados...")
 
     trainset = data.build_full_trainset() #construção o trainset completo
-    teste_final = SVD(**gs.best_params['rmse'])
+    teste_final = SVD(**melhores_parametros)
     teste_final.fit(trainset)
     print("Treinamento concluido!")
 
@@ -59,12 +82,24 @@ def otimizar_e_treinar_modelo_colaborativo():
         pickle.dump(teste_final, f)
         
     print(f"Sistema de Otimização e Treinamento salvo em '{MODEL_FILE}'!")
+
+    # Artefato NumPy carregado pelo recomendar (o pickle continua como fallback)
+    cf_vetorizado.salvar_artefato_cf(cf_vetorizado.extrair_fatores_cf(teste_final), ARTEFATO_DIR, metadados={
+        'parametros': melhores_parametros,
+        'rmse_validacao': float(melhor_rmse),
+        'modo_busca': modo,
+        'avaliacoes': int(trainset.n_ratings),
+        'treinado_em': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    print(f"Artefato CF (float32, mapeável em memória) salvo em '{ARTEFATO_DIR}'!")
+    # O modelo novo já inclui as avaliações dos usuários dobrados desde o último treino
+    sobreposicao_cf.limpar()
         
     return teste_final
 
 if __name__ == "__main__":
     print("Exibindo 'machine.py' com resultados otimizados.")
-    modelo_final = otimizar_e_treinar_modelo_colaborativo()
+    modelo_final = otimizar_e_treinar_modelo_colaborativo(modo='grade' if "--grade" in sys.argv[1:] else MODO_BUSCA)
     # print("\n--- Executando Testes de Simulação ---")
 
     if modelo_final: 
@@ -3,6 +3,8 @@ import os
 # MUDANÇA: 'from .' foi alterado para 'from Codigo_fonte'
 from Codigo_fonte import recomendar 
 from Codigo_fonte import busca_filme 
+from Codigo_fonte import indice_avaliacoes
+from Codigo_fonte import recursos
 
 print("Iniciando o Menu Interativo (menu_terminal.py)...")
 
@@ -10,26 +12,13 @@ print("Iniciando o Menu Interativo (menu_terminal.py)...")
 FILMES_CSV_PATH = os.path.join("Data", "filmes.csv")
 USUARIOS_CSV_PATH = os.path.join("Data", "usuarios.csv") # Este é o que contém os ratings dos usuários
 
-FILMES_DF_MENU = None
+# Os filmes vêm do registro de recursos (compartilhado com recomendar e busca_filme) e só
+# são lidos no primeiro uso; as avaliações são lidas em menu_interativo().
 USUARIOS_RATINGS_DF_MENU = None 
+INDICE_AVALIACOES_MENU = None # Índice CSR por usuário, reconstruído sempre que o CSV é recarregado
 
-try:
-    FILMES_DF_MENU = pd.read_csv(FILMES_CSV_PATH)
-    
-    # Tenta carregar usuarios.csv, verificando se não está vazio
-    if os.path.exists(USUARIOS_CSV_PATH) and os.path.getsize(USUARIOS_CSV_PATH) > 0:
-        USUARIOS_RATINGS_DF_MENU = pd.read_csv(USUARIOS_CSV_PATH)
-    else:
-        print(f"AVISO: '{USUARIOS_CSV_PATH}' está vazio ou não existe. O gerenciamento de usuários o criará/preencherá.")
-        USUARIOS_RATINGS_DF_MENU = pd.DataFrame(columns=['userId', 'movieId', 'rating', 'timestamp']) # DataFrame vazio com colunas esperadas
-        
-    print("Dados de filmes e usuários carregados para o menu terminal.")
-except FileNotFoundError:
-    print("\nERRO: Arquivos de dados (filmes.csv ou usuarios.csv) não encontrados.")
-    input("Pressione Enter para sair...")
-    exit(1)
-except Exception as e:
-    print(f"\nERRO inesperado ao carregar dados no menu terminal: {e}")
+def _filmes_df():
+    return recursos.obter('filmes_df')
 
 def exibir_recomendacoes(user_id, tempo_disponivel_min, top_n_recomendacoes):
     """
@@ -52,8 +41,9 @@ def exibir_recomendacoes(user_id, tempo_disponivel_min, top_n_recomendacoes):
             print(f"   Nota Prevista CF: {rec['nota_prevista_cf']:.2f}")
             
             # Busca detalhes adicionais do filme
-            if FILMES_DF_MENU is not None and not FILMES_DF_MENU.empty:
-                detalhes_filme_row = FILMES_DF_MENU[FILMES_DF_MENU['movieId'] == rec['movieId']]
+            filmes_df = _filmes_df()
+            if filmes_df is not None and not filmes_df.empty:
+                detalhes_filme_row = filmes_df[filmes_df['movieId'] == rec['movieId']]
                 if not detalhes_filme_row.empty:
                     detalhes_filme = detalhes_filme_row.iloc[0]
                     print(f"   Gêneros: {detalhes_filme.get('generos', 'N/A')}") 
@@ -74,11 +64,12 @@ def buscar_filme_e_similares():
     if titulo_busca.lower() == 'voltar':
         return
 
-    if titulo_busca and FILMES_DF_MENU is not None and not FILMES_DF_MENU.empty: 
+    filmes_df = _filmes_df()
+    if titulo_busca and filmes_df is not None and not filmes_df.empty: 
         movie_id_encontrado = busca_filme.encontrar_movieid_por_titulo(titulo_busca)
         
         if movie_id_encontrado:
-            filme_encontrado_row = FILMES_DF_MENU[FILMES_DF_MENU['movieId'] == movie_id_encontrado]
+            filme_encontrado_row = filmes_df[filmes_df['movieId'] == movie_id_encontrado]
             if not filme_encontrado_row.empty: 
                 filme_encontrado = filme_encontrado_row.iloc[0]
                 titulo_filme = filme_encontrado.get('titulo', 'N/A')
@@ -92,7 +83,7 @@ def buscar_filme_e_similares():
                     if similares_ids: # Checagem de lista/set não é ambígua
                         print(f"\nFilmes com 'DNA' similar a '{titulo_filme}':")
                         for i, mid_sim in enumerate(similares_ids):
-                            filme_sim_row = FILMES_DF_MENU[FILMES_DF_MENU['movieId'] == mid_sim]
+                            filme_sim_row = filmes_df[filmes_df['movieId'] == mid_sim]
                             if not filme_sim_row.empty: 
                                 filme_sim = filme_sim_row.iloc[0]
                                 print(f"  {i+1}. {filme_sim.get('titulo', 'N/A')} (ID: {mid_sim})") 
@@ -104,13 +95,13 @@ def buscar_filme_e_similares():
                 print(f"Detalhes do filme ID {movie_id_encontrado} não encontrados em {FILMES_CSV_PATH}.")
         else:
             print(f"Nenhum filme encontrado para a busca '{titulo_busca}'.")
-    elif FILMES_DF_MENU is None or FILMES_DF_MENU.empty:
+    elif filmes_df is None or filmes_df.empty:
         print("Dados de filmes não carregados, não é possível buscar.")
 
 def menu_interativo(initial_user_id=None): 
-    # Recarrega USUARIOS_RATINGS_DF_MENU caso ele não tenha sido carregado na inicialização
-    # ou caso novos usuários tenham sido adicionados em 'gerenciar_usuarios'.
-    global USUARIOS_RATINGS_DF_MENU
+    # (Re)carrega USUARIOS_RATINGS_DF_MENU a cada entrada no menu, para incluir
+    # novos usuários adicionados em 'gerenciar_usuarios'.
+    global USUARIOS_RATINGS_DF_MENU, INDICE_AVALIACOES_MENU
     try:
         if os.path.exists(USUARIOS_CSV_PATH) and os.path.getsize(USUARIOS_CSV_PATH) > 0:
             USUARIOS_RATINGS_DF_MENU = pd.read_csv(USUARIOS_CSV_PATH)
@@ -126,7 +117,8 @@ def menu_interativo(initial_user_id=None):
         input("Pressione Enter para voltar ao Menu Principal...")
         return 
         
-    user_ids_disponiveis = sorted(USUARIOS_RATINGS_DF_MENU['userId'].unique().tolist())
+    INDICE_AVALIACOES_MENU = indice_avaliacoes.construir_indice_avaliacoes(USUARIOS_RATINGS_DF_MENU)
+    user_ids_disponiveis = indice_avaliacoes.usuarios_disponiveis(INDICE_AVALIACOES_MENU).tolist() # Já ordenados
     
     if not user_ids_disponiveis: # Checagem se a lista de IDs está vazia
         print("\nATENÇÃO: Não há IDs de usuários disponíveis com avaliações. Por favor, adicione usuários primeiro.")
@@ -135,13 +127,13 @@ def menu_interativo(initial_user_id=None):
         
     user_id = initial_user_id 
     
-    if user_id is None or user_id not in user_ids_disponiveis: 
+    if user_id is None or not indice_avaliacoes.usuario_existe(INDICE_AVALIACOES_MENU, user_id): 
         user_id = None 
-        while user_id not in user_ids_disponiveis:
+        while user_id is None or not indice_avaliacoes.usuario_existe(INDICE_AVALIACOES_MENU, user_id):
             try:
                 user_id_input = input(f"Selecione seu ID de Usuário (Disponíveis: {', '.join(map(str, user_ids_disponiveis))}): ")
                 user_id = int(user_id_input.strip())
-                if user_id not in user_ids_disponiveis:
+                if not indice_avaliacoes.usuario_existe(INDICE_AVALIACOES_MENU, user_id):
                     print("ID de usuário inválido. Tente novamente.")
             except ValueError:
                 print("Entrada inválida. Digite um número.")
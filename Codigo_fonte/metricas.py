@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+# Instrumentação do pipeline de recomendação.
+# Cada chamada de gerar_recomendacoes_hibridas produz um registro de execução (dicionário)
+# com o tempo e a quantidade de filmes que entraram e saíram de cada estágio. O registro é
+# devolvido a quem pediu (retornar_metricas=True) e enviado a todos os sinks registrados:
+# qualquer função que receba o dicionário (ex.: sink_logging, sink_jsonl, sink_histograma).
+#
+# As mensagens de progresso (info) ficam silenciadas por padrão; defina a variável de
+# ambiente RECOMENDA_AI_VERBOSO=1 (ou metricas.VERBOSO = True) para exibi-las.
+
+VERBOSO = os.environ.get("RECOMENDA_AI_VERBOSO", "0") == "1"
+
+_SINKS = []
+_TRAVA_SINKS = threading.Lock()
+
+def info(mensagem):
+    """print() das mensagens de progresso, exibido apenas no modo verboso."""
+    if VERBOSO:
+        print(mensagem)
+
+# --- Registro de execução ---
+
+def iniciar_execucao(**parametros):
+    """Cria o registro de uma execução do pipeline (os parâmetros ficam em 'parametros')."""
+    return {
+        'parametros': parametros,
+        'inicio': time.time(),
+        'estagios': [],
+        'contadores': {},
+        'total_segundos': None,
+        '_relogio': time.perf_counter(),
+    }
+
+def registrar_estagio(execucao, nome, entrada, saida, inicio):
+    """
+    Anota quantos filmes entraram e saíram de um estágio e quanto tempo ele levou.
+    'inicio' é o time.perf_counter() tomado no começo do estágio.
+    """
+    execucao['estagios'].append({
+        'estagio': nome,
+        'entrada': int(entrada),
+        'saida': int(saida),
+        'segundos': time.perf_counter() - inicio,
+    })
+
+def finalizar_execucao(execucao):
+    """Fecha o registro (tempo total) e o envia para os sinks. Retorna o registro."""
+    execucao['total_segundos'] = time.perf_counter() - execucao.pop('_relogio')
+    with _TRAVA_SINKS:
+        sinks = list(_SINKS)
+    for sink in sinks:
+        try:
+            sink(execucao)
+        except Exception as e:
+            print(f"AVISO: Falha no sink de métricas {sink!r}: {e}")
+    return execucao
+
+# --- Sinks ---
+
+def adicionar_sink(sink):
+    with _TRAVA_SINKS:
+        _SINKS.append(sink)
+    return sink
+
+def remover_sink(sink):
+    with _TRAVA_SINKS:
+        if sink in _SINKS:
+            _SINKS.remove(sink)
+
+def sink_logging(logger=None, nivel=logging.INFO):
+    """Sink que escreve cada execução, em JSON, no logger informado."""
+    logger = logger or logging.getLogger("recomenda_ai.metricas")
+    def sink(execucao):
+        logger.log(nivel, json.dumps(execucao, default=str))
+    return sink
+
+def sink_jsonl(caminho):
+    """Sink que acrescenta cada execução como uma linha JSON no arquivo informado."""
+    trava = threading.Lock()
+    def sink(execucao):
+        linha = json.dumps(execucao, default=str)
+        with trava, open(caminho, 'a', encoding='utf-8') as f:
+            f.write(linha + "\n")
+    return sink
+
+# Limites (segundos) dos baldes do histograma: escala logarítmica de 10µs a 100s
+LIMITES_HISTOGRAMA = np.logspace(-5, 2, 57)
+
+def novo_histograma():
+    """Histograma em memória das durações por estágio (e do total, em 'total')."""
+    return {'trava': threading.Lock(), 'estagios': {}}
+
+def sink_histograma(histograma):
+    """Sink que acumula as durações de cada estágio no histograma informado."""
+    def sink(execucao):
+        duracoes = [(e['estagio'], e['segundos']) for e in execucao['estagios']]
+        duracoes.append(('total', execucao['total_segundos']))
+        with histograma['trava']:
+            for nome, segundos in duracoes:
+                estagio = histograma['estagios'].setdefault(nome, {
+                    'baldes': np.zeros(LIMITES_HISTOGRAMA.size + 1, dtype=np.int64),
+                    'contagem': 0, 'soma': 0.0, 'maximo': 0.0,
+                })
+                estagio['baldes'][np.searchsorted(LIMITES_HISTOGRAMA, segundos)] += 1
+                estagio['contagem'] += 1
+                estagio['soma'] += segundos
+                estagio['maximo'] = max(estagio['maximo'], segundos)
+    return sink
+
+def resumo_histograma(histograma, percentis=(50, 95, 99)):
+    """
+    Resumo por estágio: contagem, média, máximo e percentis (limite superior do balde
+    em que o percentil cai, portanto uma estimativa por excesso).
+    """
+    resumo = {}
+    with histograma['trava']:
+        for nome, estagio in histograma['estagios'].items():
+            acumulado = np.cumsum(estagio['baldes'])
+            linha = {
+                'contagem': estagio['contagem'],
+                'media': estagio['soma'] / estagio['contagem'],
+                'maximo': estagio['maximo'],
+            }
+            for p in percentis:
+                balde = int(np.searchsorted(acumulado, np.ceil(estagio['contagem'] * p / 100.)))
+                limite = LIMITES_HISTOGRAMA[balde] if balde < LIMITES_HISTOGRAMA.size else estagio['maximo']
+                linha[f'p{p}'] = min(float(limite), estagio['maximo'])
+            resumo[nome] = linha
+    return resumo
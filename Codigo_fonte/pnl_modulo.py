@@ -4,17 +4,56 @@ import nltk # biblioteca PNL"""
 from nltk.corpus import stopwords # reduz os ruidos das frases"""
 from nltk.stem import RSLPStemmer # reduz palavras para o entendimento"""
 from sklearn.feature_extraction.text import TfidfVectorizer # transforma os textos em vetor"""
+from sklearn.feature_extraction.text import HashingVectorizer # vetoriza sem vocabulário (modo streaming)
+from sklearn.preprocessing import normalize
+from scipy import sparse
+import tempfile
 from sklearn.metrics.pairwise import cosine_similarity # Para calcular a similaridade
 from sklearn.decomposition import TruncatedSVD #reduz a dimensão dos dados
 import pickle # Para salvar o modelo
 import os # Para lidar com caminhos de arquivo
 import string #  manipulação dos textos"""
 import numpy as np #  manipução numerica"""
+import sys
+import hashlib # Chave do cache de textos limpos
+from concurrent.futures import ProcessPoolExecutor # Limpeza dos textos em paralelo
 
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if diretorio_projeto not in sys.path: # Permite rodar como script (python3 Codigo_fonte/pnl_modulo.py)
+    sys.path.insert(0, diretorio_projeto)
+from Codigo_fonte import pnl_vetorizado # Tabela de vizinhos pré-calculada
+from Codigo_fonte import indice_ann # Índice aproximado para catálogos grandes
 
 
 DATA_FILE = os.path.join("Data", "filmes.csv") #Modelo
 MODEL_FILE = os.path.join("Modelos", "pnl_similarity_model.pkl")
+# Artefato float32 mapeável em memória (lido por busca_filme; o pickle fica como fallback)
+CABECALHO_FILE = os.path.join("Modelos", "pnl_modelo.json")
+VETORES_FILE = os.path.join("Modelos", "pnl_vetores.npy")
+MOVIE_IDS_FILE = os.path.join("Modelos", "pnl_movie_ids.npy")
+VIZINHOS_FILE = os.path.join("Modelos", "pnl_vizinhos.npy")
+SIMILARIDADES_FILE = os.path.join("Modelos", "pnl_vizinhos_similaridades.npy")
+VIZINHOS_PRECOMPUTADOS = 50 # K vizinhos por filme guardados na tabela (0 desliga a tabela)
+IVF_FILE = os.path.join("Modelos", "pnl_ivf.npz")
+ANN_MINIMO_FILMES = 100_000 # Abaixo disso a busca exata já é rápida e o índice aproximado não é gerado
+# Cache das sinopses limpas, indexado pelo hash de cada sinopse original: num retreino só as
+# sinopses novas ou alteradas passam pela limpeza.
+CACHE_TEXTOS_FILE = os.path.join("Modelos", "pnl_textos_limpos.pkl")
+VERSAO_LIMPEZA = 1 # Mude ao alterar limpar_texto, para invalidar o cache
+USAR_STEMMER = False # Reduz as palavras ao radical (RSLP); muda o vocabulário do TF-IDF
+TAMANHO_BLOCO_TEXTOS = 2000 # Sinopses por tarefa do pool de processos
+# TF-IDF e SVD já treinados, para projetar filmes novos sem retreinar (atualizar_modelo_incremental)
+TRANSFORMADORES_FILE = os.path.join("Modelos", "pnl_transformadores.pkl")
+# Deriva: acima destes limites a atualização incremental recomenda um retreino completo
+LIMITE_FRACAO_INCREMENTAL = 0.20 # Fração do catálogo projetada desde o último treino
+LIMITE_QUEDA_ENERGIA = 0.15      # Queda relativa da energia do TF-IDF capturada pelo SVD
+LIMITE_AUMENTO_FORA_VOCABULARIO = 0.10 # Aumento (absoluto) da fração de palavras fora do vocabulário
+# Treino em streaming (treinar_e_salvar_modelo_streaming), para catálogos que não cabem na memória
+TAMANHO_BLOCO_STREAMING = 50_000 # Linhas do CSV lidas por vez
+N_FEATURES_HASH = 2 ** 18        # Colunas do HashingVectorizer
+AMOSTRA_SVD = 20_000             # Filmes usados para ajustar o SVD
+# Peso de cada campo na contagem de termos (equivale a repetir o texto, sem montar a string repetida)
+PESOS_CAMPOS = {'sinopse_limpa': 3, 'generos_limpo': 2, 'diretor_limpo': 1, 'atores_limpo': 1}
 
 try:
     nltk.data.find('corpora/stopwords')
@@ -42,28 +81,191 @@ def limpar_texto(texto): #Limpa e pré-processa uma string de texto.
     palavras = [palavra for palavra in texto.split() if palavra not in STOPWORDS_PT]
     return " ".join(palavras)
 
-def criar_features_de_texto(df): #Combina colunas de texto (sinopse, generos, etc.) em uma única "super-feature" para o modelo PNL.
-    print("Criando features de texto combinadas...")
+_STEMMER = None
+
+class _TokensLimpos(dict):
+    # Memoização dos tokens: palavra -> forma limpa ("" para stopwords, radical com o stemmer).
+    # Cada palavra distinta do catálogo é avaliada uma única vez por processo.
+    def __init__(self, usar_stemmer):
+        super().__init__()
+        self.usar_stemmer = usar_stemmer
+
+    def __missing__(self, palavra):
+        global _STEMMER
+        if palavra in STOPWORDS_PT:
+            limpa = ""
+        elif not self.usar_stemmer:
+            limpa = palavra
+        else:
+            if _STEMMER is None:
+                try:
+                    nltk.data.find('stemmers/rslp')
+                except LookupError:
+                    print("Baixando pacote 'rslp' do NLTK...")
+                    nltk.download('rslp')
+                _STEMMER = RSLPStemmer()
+            limpa = _STEMMER.stem(palavra)
+        self[palavra] = limpa
+        return limpa
+
+_TOKENS_LIMPOS = {False: _TokensLimpos(False), True: _TokensLimpos(True)}
+
+def limpar_textos(textos, usar_stemmer=USAR_STEMMER):
+    # Versão vetorizada de limpar_texto para uma lista de textos (minúsculas e regex via .str do pandas).
+    textos = pd.Series(textos, dtype=object).fillna('').astype(str)
+    textos = textos.str.lower().str.replace(r'[^a-z\s]', '', regex=True)
+    tokens = _TOKENS_LIMPOS[bool(usar_stemmer)].__getitem__
+    return [" ".join(filter(None, map(tokens, texto.split()))) for texto in textos]
+
+def _hash_texto(texto):
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).digest()
+
+def _carregar_cache_textos(parametros):
+    try:
+        with open(CACHE_TEXTOS_FILE, 'rb') as f:
+            cache = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"AVISO: Cache de textos '{CACHE_TEXTOS_FILE}' ilegível ({e}). Limpando tudo de novo.")
+        return {}
+    if cache.get('parametros') != parametros: # Outra versão da limpeza ou outro stemmer
+        return {}
+    return cache['textos']
 
+def _gravar_pickle(caminho, objeto):
+    # Grava em um temporário e troca o arquivo de uma vez: quem lê (outro processo ou um
+    # treino interrompido no meio) vê o pickle antigo inteiro ou o novo inteiro.
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as f:
+        pickle.dump(objeto, f)
+    os.replace(temporario, caminho)
+
+def _salvar_cache_textos(parametros, textos):
+    os.makedirs(os.path.dirname(CACHE_TEXTOS_FILE), exist_ok=True)
+    _gravar_pickle(CACHE_TEXTOS_FILE, {'parametros': parametros, 'textos': textos})
+
+def limpar_sinopses(sinopses, usar_stemmer=USAR_STEMMER, n_processos=None, usar_cache=True):
+    # Limpa as sinopses reaproveitando o cache em disco. As que faltam são limpas em blocos
+    # de TAMANHO_BLOCO_TEXTOS, distribuídos em um pool de processos (n_processos=None: um
+    # por CPU; 1 ou um único bloco: no processo atual). O cache salvo contém só as sinopses atuais.
+    sinopses = pd.Series(sinopses, dtype=object).fillna('').astype(str).tolist()
+    chaves = [_hash_texto(texto) for texto in sinopses]
+    parametros = (VERSAO_LIMPEZA, bool(usar_stemmer))
+    cache = _carregar_cache_textos(parametros) if usar_cache else {}
+
+    pendentes = {}
+    for chave, texto in zip(chaves, sinopses):
+        if chave not in cache and chave not in pendentes:
+            pendentes[chave] = texto
+    print(f"Sinopses a limpar: {len(pendentes)} de {len(sinopses)} (as demais vêm do cache).")
+
+    textos = list(pendentes.values())
+    blocos = [textos[i:i + TAMANHO_BLOCO_TEXTOS] for i in range(0, len(textos), TAMANHO_BLOCO_TEXTOS)]
+    n_processos = os.cpu_count() if n_processos is None else n_processos
+    if n_processos <= 1 or len(blocos) <= 1:
+        limpos_por_bloco = [limpar_textos(bloco, usar_stemmer) for bloco in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_processos, len(blocos))) as executor:
+            limpos_por_bloco = list(executor.map(limpar_textos, blocos, [usar_stemmer] * len(blocos)))
+    limpos = [texto for bloco in limpos_por_bloco for texto in bloco]
+    cache.update(zip(pendentes.keys(), limpos))
+
+    resultado = [cache[chave] for chave in chaves]
+    if usar_cache and (pendentes or len(cache) != len(set(chaves))):
+        _salvar_cache_textos(parametros, {chave: cache[chave] for chave in chaves})
+    return resultado
+
+def limpar_colunas_de_texto(df, usar_stemmer=USAR_STEMMER, n_processos=None, usar_cache=True): # Cria as colunas *_limpa/*_limpo usadas pelo PNL.
     df['sinopse'] = df['sinopse'].fillna('') # Preenche valores vazios com strings vazias
     df['generos'] = df['generos'].fillna('')
     df['diretor'] = df['diretor'].fillna('')
     df['atores'] = df['atores'].fillna('')
-    df['sinopse_limpa'] = df['sinopse'].apply(limpar_texto) # Limpa e formata cada coluna de texto e são unidos por '|'. Trocamos por espaço.
-    df['generos_limpo'] = df['generos'].apply(lambda x: " ".join(x.split('|')))
-    df['diretor_limpo'] = df['diretor'].apply(lambda x: " ".join(x.split('|')))
-    df['atores_limpo'] = df['atores'].apply(lambda x: " ".join(x.split('|')))
-    df['feature_pnl'] = (
-        df['sinopse_limpa'] * 3 + " " + # Sinopse tem maior peso
-        df['generos_limpo'] * 2 + " " + # Gêneros tem peso médio
-        df['diretor_limpo'] + " " +     # Diretor tem peso normal
-        df['atores_limpo']              # Atores tem peso normal
-    )
+    df['sinopse_limpa'] = limpar_sinopses(df['sinopse'], usar_stemmer, n_processos, usar_cache) # Limpa e formata cada coluna de texto e são unidos por '|'. Trocamos por espaço.
+    df['generos_limpo'] = df['generos'].astype(str).str.replace('|', ' ', regex=False)
+    df['diretor_limpo'] = df['diretor'].astype(str).str.replace('|', ' ', regex=False)
+    df['atores_limpo'] = df['atores'].astype(str).str.replace('|', ' ', regex=False)
+    return df
+
+def criar_features_de_texto(df, usar_stemmer=USAR_STEMMER, n_processos=None, usar_cache=True): #Combina colunas de texto (sinopse, generos, etc.) em uma única "super-feature" para o modelo PNL.
+    print("Criando features de texto combinadas...")
+
+    df = limpar_colunas_de_texto(df, usar_stemmer, n_processos, usar_cache)
+    df['feature_pnl'] = combinar_features(df['sinopse_limpa'], df['generos_limpo'], df['diretor_limpo'], df['atores_limpo'])
     
     print("Features de texto criadas com sucesso.")
     return df
 
-def treinar_e_salvar_modelo():
+def combinar_features(sinopse_limpa, generos_limpo, diretor_limpo, atores_limpo):
+    # Texto que o TF-IDF vê para cada filme. Aceita colunas (Series) ou strings de um filme só.
+    return (
+        sinopse_limpa * 3 + " " + # Sinopse tem maior peso
+        generos_limpo * 2 + " " + # Gêneros tem peso médio
+        diretor_limpo + " " +     # Diretor tem peso normal
+        atores_limpo              # Atores tem peso normal
+    )
+
+def feature_de_descricao(descricao, usar_stemmer=USAR_STEMMER):
+    # 'feature_pnl' de um texto livre: a descrição faz o papel da sinopse de um filme sem
+    # gêneros, diretor e atores, com a mesma limpeza de criar_features_de_texto.
+    return combinar_features(limpar_textos([descricao], usar_stemmer)[0], "", "", "")
+
+def _hashes_de_origem(df):
+    # Hash (movieId -> bytes) dos textos de origem de cada filme; identifica linhas novas ou alteradas.
+    colunas = [df[c].fillna('').astype(str) for c in ('sinopse', 'generos', 'diretor', 'atores')]
+    return {int(movie_id): _hash_texto("\x1f".join(campos))
+            for movie_id, *campos in zip(df['movieId'], *colunas)}
+
+def _energia_capturada(tfidf_matrix, latent_matrix):
+    # Fração da energia de cada linha do TF-IDF que o SVD representa (as linhas do TF-IDF têm norma 1
+    # e os componentes são ortonormais). Linhas sem nenhuma palavra do vocabulário ficam de fora.
+    normas = np.asarray(tfidf_matrix.multiply(tfidf_matrix).sum(axis=1)).ravel()
+    validas = normas > 0
+    return (np.square(latent_matrix[validas]).sum(axis=1) / normas[validas])
+
+def _fora_do_vocabulario(tfidf_vectorizer, textos):
+    # (palavras fora do vocabulário do TF-IDF, total de palavras) dos textos.
+    analisar = tfidf_vectorizer.build_analyzer()
+    vocabulario = tfidf_vectorizer.vocabulary_
+    fora = total = 0
+    for texto in textos:
+        palavras = analisar(texto)
+        total += len(palavras)
+        fora += sum(1 for palavra in palavras if palavra not in vocabulario)
+    return fora, total
+
+def _salvar_modelo_e_artefatos(modelo_pnl_data, vizinhos_precomputados, usar_ann, linhas_alteradas=None):
+    # Grava o pickle do modelo e, a partir dele, o artefato float32, a tabela de vizinhos e o índice ANN.
+    # Com 'linhas_alteradas' (atualização incremental), a tabela e o índice existentes são atualizados.
+    os.makedirs("Modelos", exist_ok=True)
+
+    # Usa o pickle para "despejar" (dump) o dicionário no arquivo
+    _gravar_pickle(MODEL_FILE, modelo_pnl_data)
+
+    print(f"Modelo PNL salvo com sucesso em '{MODEL_FILE}'!")
+
+    pnl = pnl_vetorizado.preparar_pnl(modelo_pnl_data) # Matriz normalizada, usada pelos artefatos abaixo
+    pnl_vetorizado.salvar_artefato_pnl(pnl, CABECALHO_FILE, VETORES_FILE, MOVIE_IDS_FILE)
+    print(f"Artefato PNL (float32, mapeável em memória) salvo em '{CABECALHO_FILE}'!")
+    _salvar_estruturas_de_busca(pnl, vizinhos_precomputados, usar_ann, linhas_alteradas)
+
+def _salvar_estruturas_de_busca(pnl, vizinhos_precomputados, usar_ann, linhas_alteradas=None):
+    # Tabela de vizinhos e índice ANN (ou remoção dos antigos, que não valem para o novo modelo).
+    if vizinhos_precomputados:
+        salvar_tabela_vizinhos(pnl, vizinhos_precomputados, linhas_alteradas)
+    else:
+        # Uma tabela antiga não vale para o novo modelo
+        for caminho in (VIZINHOS_FILE, SIMILARIDADES_FILE, pnl_vetorizado.caminho_impressao_tabela(VIZINHOS_FILE)):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    # usar_ann=None: gera o índice aproximado apenas para catálogos grandes
+    if usar_ann or (usar_ann is None and pnl['vetores'].shape[0] >= ANN_MINIMO_FILMES):
+        salvar_indice_ann(pnl, linhas_alteradas=linhas_alteradas)
+    elif os.path.exists(IVF_FILE):
+        os.remove(IVF_FILE)
+
+def treinar_e_salvar_modelo(vizinhos_precomputados=VIZINHOS_PRECOMPUTADOS, usar_ann=None):
        # Função OTIMIZADA: Carrega, processa, aplica TF-IDF e
   #  USA REDUÇÃO DE DIMENSIONALIDADE (SVD) para salvar uma matriz leve.
     
@@ -94,21 +296,253 @@ def treinar_e_salvar_modelo():
     # Define o mapeamento do 'movieId' para o índice da matriz (0, 1, 2...)
     movie_indices = pd.Series(filmes_df.index, index=filmes_df['movieId']).drop_duplicates()
     
-    os.makedirs("Modelos", exist_ok=True) 
-    
     # Cria o dicionário que será salvo.
     modelo_pnl_data = {
         'latent_matrix': latent_matrix, # A matriz (9742 x 100)
         'movie_indices': movie_indices
     }
-    
-    # Abre o arquivo de modelo em modo 'write binary' (wb)
-    with open(MODEL_FILE, 'wb') as f:
-        # Usa o pickle para "despejar" (dump) o dicionário no arquivo
-        pickle.dump(modelo_pnl_data, f)
-        
-    print(f"Modelo PNL salvo com sucesso em '{MODEL_FILE}'!")
+    _salvar_modelo_e_artefatos(modelo_pnl_data, vizinhos_precomputados, usar_ann)
+
+    # Transformadores treinados + referência de deriva, para a atualização incremental
+    if hasattr(tfidf_vectorizer, 'stop_words_'): # Só serve para inspeção e ocupa muito espaço no pickle (sklearn < 1.7)
+        del tfidf_vectorizer.stop_words_
+    fora, total = _fora_do_vocabulario(tfidf_vectorizer, filmes_df['feature_pnl'])
+    transformadores = {
+        'tfidf': tfidf_vectorizer,
+        'svd': svd,
+        'usar_stemmer': USAR_STEMMER, # Limpeza usada no treino (feature_de_descricao deve repeti-la)
+        'hashes': _hashes_de_origem(filmes_df),
+        'deriva': {
+            'filmes_treino': int(latent_matrix.shape[0]),
+            'energia_treino': float(_energia_capturada(tfidf_matrix, latent_matrix).mean()),
+            'fora_vocabulario_treino': fora / total if total else 0.0,
+            # Acumulados das atualizações incrementais desde este treino
+            'filmes_incrementais': 0,
+            'soma_energia_incremental': 0.0,
+            'linhas_energia_incremental': 0,
+            'palavras_fora_incrementais': 0,
+            'palavras_incrementais': 0,
+        },
+    }
+    _gravar_pickle(TRANSFORMADORES_FILE, transformadores)
+    print(f"TF-IDF e SVD treinados salvos em '{TRANSFORMADORES_FILE}'.")
+
+def _contagens_ponderadas(df, vetorizador):
+    # Contagens (hash) dos termos de cada filme, somando os campos com os pesos de PESOS_CAMPOS.
+    contagens = None
+    for coluna, peso in PESOS_CAMPOS.items():
+        parcial = vetorizador.transform(df[coluna]) * peso
+        contagens = parcial if contagens is None else contagens + parcial
+    return contagens.tocsr()
+
+def _tfidf_hash(contagens, idf):
+    return normalize(contagens.multiply(idf).tocsr()) # Mesmo esquema do TfidfVectorizer: tf * idf, norma L2
+
+def treinar_e_salvar_modelo_streaming(tamanho_bloco=TAMANHO_BLOCO_STREAMING, amostra_svd=AMOSTRA_SVD,
+                                      n_componentes=100, vizinhos_precomputados=0, usar_ann=None):
+    # Treino para catálogos grandes, com memória limitada pelo tamanho do bloco e da amostra:
+    # 1ª passada: lê o CSV em blocos, limpa os textos, conta os termos com o HashingVectorizer
+    #   (sem vocabulário em memória), acumula a frequência de documentos (IDF) e guarda as
+    #   contagens de cada bloco em disco e uma amostra aleatória para o SVD;
+    # o SVD é ajustado só na amostra;
+    # 2ª passada: projeta cada bloco e grava os vetores normalizados direto em um .npy
+    #   (np.lib.format.open_memmap), sem nunca montar a matriz latente inteira. O .npy fica no
+    #   diretório temporário e só é publicado (gravar_cabecalho_artefato) depois de completo:
+    #   o artefato em uso, possivelmente mapeado por outro processo, nunca é reescrito.
+    # Não gera o pickle nem os transformadores da atualização incremental (que são removidos).
+    vetorizador = HashingVectorizer(n_features=N_FEATURES_HASH, alternate_sign=False, norm=None)
+    rng = np.random.default_rng(42)
+    frequencia = np.zeros(N_FEATURES_HASH, dtype=np.int64)
+    amostra = chaves_amostra = None
+    total = 0
+
+    os.makedirs("Modelos", exist_ok=True)
+    with tempfile.TemporaryDirectory(dir="Modelos") as temporario:
+        try:
+            leitor = pd.read_csv(DATA_FILE, chunksize=tamanho_bloco)
+        except FileNotFoundError:
+            print(f"Erro: Arquivo '{DATA_FILE}' não encontrado.")
+            return
+
+        blocos = []
+        for numero, bloco in enumerate(leitor):
+            bloco = limpar_colunas_de_texto(bloco, usar_cache=False)
+            contagens = _contagens_ponderadas(bloco, vetorizador)
+            frequencia += np.bincount(contagens.indices, minlength=N_FEATURES_HASH)
+            caminho = os.path.join(temporario, f"bloco_{numero}.npz")
+            sparse.save_npz(caminho, contagens)
+            blocos.append((caminho, bloco['movieId'].to_numpy(dtype=np.int64)))
+            total += contagens.shape[0]
+
+            # Amostra uniforme: ficam as amostra_svd linhas com as menores chaves aleatórias
+            chaves = rng.random(contagens.shape[0])
+            if amostra is not None:
+                contagens = sparse.vstack([amostra, contagens]).tocsr()
+                chaves = np.concatenate([chaves_amostra, chaves])
+            if chaves.size > amostra_svd:
+                manter = np.sort(np.argpartition(chaves, amostra_svd - 1)[:amostra_svd])
+                contagens, chaves = contagens[manter], chaves[manter]
+            amostra, chaves_amostra = contagens, chaves
+            print(f"Bloco {numero + 1}: {total} filmes lidos.")
+
+        if total < 2:
+            print("Erro: São necessários ao menos 2 filmes para treinar o modelo PNL.")
+            return
+
+        idf = np.log((1 + total) / (1 + frequencia)) + 1 # smooth_idf, como no TfidfVectorizer
+        # O SVD só vê as colunas do hash presentes na amostra (as demais teriam peso zero nos componentes)
+        colunas = np.flatnonzero(amostra.getnnz(axis=0))
+        n_componentes = min(n_componentes, amostra.shape[0] - 1, colunas.size - 1)
+        print(f"Ajustando o SVD ({n_componentes} componentes) em uma amostra de {amostra.shape[0]} filmes...")
+        svd = TruncatedSVD(n_components=n_componentes, random_state=42)
+        svd.fit(_tfidf_hash(amostra, idf)[:, colunas])
+        del amostra
+
+        movie_ids = np.concatenate([ids for _, ids in blocos])
+        if movie_ids.min() < np.iinfo(np.int32).min or movie_ids.max() > np.iinfo(np.int32).max:
+            raise ValueError("movieIds fora do intervalo de int32.")
+        temporario_movie_ids = os.path.join(temporario, os.path.basename(MOVIE_IDS_FILE))
+        np.save(temporario_movie_ids, movie_ids.astype(np.int32))
+        del movie_ids
+
+        temporario_vetores = os.path.join(temporario, os.path.basename(VETORES_FILE))
+        vetores = np.lib.format.open_memmap(temporario_vetores, mode='w+', dtype=np.float32, shape=(total, n_componentes))
+        inicio = 0
+        for caminho, ids in blocos:
+            latente = svd.transform(_tfidf_hash(sparse.load_npz(caminho), idf)[:, colunas])
+            vetores[inicio:inicio + latente.shape[0]] = normalize(latente) # Vetores nulos continuam nulos
+            inicio += latente.shape[0]
+        vetores.flush()
+        del vetores
+
+        pnl_vetorizado.gravar_cabecalho_artefato(CABECALHO_FILE, temporario_vetores, temporario_movie_ids)
+    print(f"Artefato PNL ({total} filmes, float32) salvo em '{CABECALHO_FILE}'!")
+    for caminho in (MODEL_FILE, TRANSFORMADORES_FILE): # Não correspondem mais ao artefato
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    pnl = pnl_vetorizado.carregar_artefato_pnl(CABECALHO_FILE)
+    _salvar_estruturas_de_busca(pnl, vizinhos_precomputados, usar_ann)
+
+def motivos_para_retreinar(deriva):
+    # Lista (vazia se estiver tudo bem) dos limites de deriva ultrapassados.
+    motivos = []
+    fracao = deriva['filmes_incrementais'] / max(deriva['filmes_treino'], 1)
+    if fracao > LIMITE_FRACAO_INCREMENTAL:
+        motivos.append(f"{fracao:.0%} do catálogo foi projetado sem retreino (limite {LIMITE_FRACAO_INCREMENTAL:.0%})")
+    if deriva['linhas_energia_incremental'] and deriva['energia_treino'] > 0:
+        energia_incremental = deriva['soma_energia_incremental'] / deriva['linhas_energia_incremental']
+        queda = 1 - energia_incremental / deriva['energia_treino']
+        if queda > LIMITE_QUEDA_ENERGIA:
+            motivos.append(f"o SVD captura {queda:.0%} menos do texto dos filmes novos (limite {LIMITE_QUEDA_ENERGIA:.0%})")
+    if deriva['palavras_incrementais']:
+        aumento = deriva['palavras_fora_incrementais'] / deriva['palavras_incrementais'] - deriva['fora_vocabulario_treino']
+        if aumento > LIMITE_AUMENTO_FORA_VOCABULARIO:
+            motivos.append(f"palavras fora do vocabulário subiram {aumento:.0%} (limite {LIMITE_AUMENTO_FORA_VOCABULARIO:.0%})")
+    return motivos
+
+def atualizar_modelo_incremental(vizinhos_precomputados=VIZINHOS_PRECOMPUTADOS, usar_ann=None):
+    # Projeta no espaço latente já treinado apenas os filmes novos ou alterados de filmes.csv
+    # (TF-IDF e SVD apenas com transform): alterados substituem a própria linha, novos são
+    # adicionados ao fim da matriz. Filmes que saíram do CSV continuam até o próximo treino completo.
+    # Atualiza as estatísticas de deriva e avisa quando vale a pena rodar treinar_e_salvar_modelo.
+    try:
+        with open(TRANSFORMADORES_FILE, 'rb') as f:
+            transformadores = pickle.load(f)
+        with open(MODEL_FILE, 'rb') as f:
+            modelo_pnl_data = pickle.load(f)
+    except FileNotFoundError as e:
+        print(f"ERRO: '{e.filename}' não encontrado. Rode o treinamento completo primeiro (python3 Codigo_fonte/pnl_modulo.py).")
+        return
+
+    filmes_df = carregar_dados()
+    if filmes_df is None:
+        return
+    filmes_df = filmes_df.drop_duplicates(subset='movieId').reset_index(drop=True)
+
+    hashes = _hashes_de_origem(filmes_df)
+    hashes_salvos = transformadores['hashes']
+    mudou = np.array([hashes_salvos.get(movie_id) != h for movie_id, h in hashes.items()], dtype=bool)
+    fora_do_csv = len(set(hashes_salvos) - set(hashes))
+    if fora_do_csv:
+        print(f"AVISO: {fora_do_csv} filmes do modelo não estão mais em '{DATA_FILE}' (mantidos até o próximo treino completo).")
+    if not mudou.any():
+        print("Nenhum filme novo ou alterado. Modelo PNL já está atualizado.")
+        return
+
+    alterados_df = criar_features_de_texto(filmes_df[mudou].copy(), usar_cache=False)
+    tfidf_novos = transformadores['tfidf'].transform(alterados_df['feature_pnl'])
+    latentes_novos = transformadores['svd'].transform(tfidf_novos)
+
+    latent_matrix = modelo_pnl_data['latent_matrix']
+    movie_indices = modelo_pnl_data['movie_indices']
+    ids_alterados = alterados_df['movieId'].to_numpy()
+    existentes = np.isin(ids_alterados, movie_indices.index.to_numpy())
+    latent_matrix[movie_indices.loc[ids_alterados[existentes]].to_numpy()] = latentes_novos[existentes]
+    linhas_novas = np.arange(latent_matrix.shape[0], latent_matrix.shape[0] + int((~existentes).sum()))
+    latent_matrix = np.vstack([latent_matrix, latentes_novos[~existentes]])
+    movie_indices = pd.concat([movie_indices, pd.Series(linhas_novas, index=pd.Index(ids_alterados[~existentes], name='movieId'))])
+    print(f"{int(existentes.sum())} filmes alterados e {int((~existentes).sum())} novos projetados. "
+          f"Matriz Latente: {latent_matrix.shape}")
+
+    modelo_pnl_data = {'latent_matrix': latent_matrix, 'movie_indices': movie_indices}
+    linhas_alteradas = np.concatenate([movie_indices.loc[ids_alterados[existentes]].to_numpy(), linhas_novas])
+    _salvar_modelo_e_artefatos(modelo_pnl_data, vizinhos_precomputados, usar_ann, linhas_alteradas)
+
+    deriva = transformadores['deriva']
+    energia = _energia_capturada(tfidf_novos, latentes_novos)
+    fora, total = _fora_do_vocabulario(transformadores['tfidf'], alterados_df['feature_pnl'])
+    deriva['filmes_incrementais'] += int(mudou.sum())
+    deriva['soma_energia_incremental'] += float(energia.sum())
+    deriva['linhas_energia_incremental'] += int(energia.size)
+    deriva['palavras_fora_incrementais'] += fora
+    deriva['palavras_incrementais'] += total
+    transformadores['hashes'].update({int(m): hashes[int(m)] for m in ids_alterados})
+    _gravar_pickle(TRANSFORMADORES_FILE, transformadores)
+
+    motivos = motivos_para_retreinar(deriva)
+    if motivos:
+        print("AVISO: Recomenda-se o treinamento completo do PNL: " + "; ".join(motivos) + ".")
+    return deriva
+
+def salvar_tabela_vizinhos(pnl, k=VIZINHOS_PRECOMPUTADOS, linhas_alteradas=None):
+    # Pré-calcula os K vizinhos mais similares de cada filme (int32) e as similaridades (float32).
+    # Na recomendação a busca de similares vira uma leitura da tabela, mapeada em memória.
+    # 'pnl' é o dicionário de pnl_vetorizado.preparar_pnl. Com 'linhas_alteradas', a tabela salva
+    # é atualizada só nas linhas afetadas (se for compatível; senão é recalculada inteira).
+    tabela = None
+    if linhas_alteradas is not None and os.path.exists(VIZINHOS_FILE) and os.path.exists(SIMILARIDADES_FILE):
+        anterior = {'vizinhos': np.load(VIZINHOS_FILE), 'similaridades': np.load(SIMILARIDADES_FILE)}
+        tabela = pnl_vetorizado.atualizar_tabela_vizinhos(pnl, anterior, linhas_alteradas, k)
+    if tabela is None:
+        print(f"Calculando a tabela com os {k} vizinhos de cada filme...")
+        tabela = pnl_vetorizado.construir_tabela_vizinhos(pnl, k)
+    pnl_vetorizado.salvar_tabela_vizinhos(pnl, tabela, VIZINHOS_FILE, SIMILARIDADES_FILE)
+    print(f"Tabela de vizinhos {tabela['vizinhos'].shape} salva em '{VIZINHOS_FILE}' e '{SIMILARIDADES_FILE}'!")
+
+def salvar_indice_ann(pnl, n_listas=None, k_recall=10, linhas_alteradas=None):
+    # Treina o índice IVF (k-means) sobre a matriz latente e informa o recall@k com as sondas padrão.
+    # Com 'linhas_alteradas', só essas linhas são redistribuídas nas listas do índice salvo.
+    indice = None
+    if linhas_alteradas is not None and os.path.exists(IVF_FILE):
+        with np.load(IVF_FILE) as dados:
+            anterior = {nome: dados[nome] for nome in ('centroides', 'offsets', 'linhas')}
+        indice = indice_ann.atualizar_indice_ivf(pnl, anterior, linhas_alteradas)
+    if indice is None:
+        print("Construindo o índice aproximado (IVF) do PNL...")
+        indice = indice_ann.construir_indice_ivf(pnl, n_listas)
+    indice_ann.salvar_indice_ivf(pnl, indice, IVF_FILE)
+    recall = indice_ann.medir_recall(pnl, indice, k_recall)
+    print(f"Índice IVF com {indice['centroides'].shape[0]} listas salvo em '{IVF_FILE}' "
+          f"(recall@{k_recall} = {recall:.3f} com {indice_ann.N_SONDAS_PADRAO} sondas).")
 
 if __name__ == "__main__":
-    print("Iniciando script de treinamento do 'pnl_modulo'...")
-    treinar_e_salvar_modelo()
\ No newline at end of file
+    if "--incremental" in sys.argv[1:]: # Só projeta os filmes novos/alterados no modelo atual
+        print("Iniciando atualização incremental do 'pnl_modulo'...")
+        atualizar_modelo_incremental()
+    elif "--streaming" in sys.argv[1:]: # Catálogos grandes: lê o CSV em blocos, com memória limitada
+        print("Iniciando treinamento em streaming do 'pnl_modulo'...")
+        treinar_e_salvar_modelo_streaming()
+    else:
+        print("Iniciando script de treinamento do 'pnl_modulo'...")
+        treinar_e_salvar_modelo()
\ No newline at end of file
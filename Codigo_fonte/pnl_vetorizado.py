@@ -0,0 +1,454 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Motor vetorizado da similaridade de conteúdo (PNL).
+# Normaliza (L2) a matriz latente uma única vez na carga; a similaridade do cosseno de
+# várias sementes contra o catálogo inteiro vira um único produto de matrizes, seguido
+# de uma seleção parcial (argpartition) dos k vizinhos de cada semente. Opcionalmente o
+# treino (pnl_modulo.py) grava a tabela com os K vizinhos de todos os filmes, e a busca
+# vira uma leitura O(K) dessa tabela.
+#
+# Artefato em disco (versão 1), gravado pelo treino ao lado do pickle:
+#   pnl_modelo.json          cabeçalho: formato, versão, dimensões e nome/sha256 de cada arquivo
+#   pnl_vetores.<sha>.npy    matriz float32 (filmes x dimensões) já normalizada
+#   pnl_movie_ids.<sha>.npy  int32 com o movieId de cada linha
+# A matriz é aberta com np.load(mmap_mode='r'): processos que servem recomendações
+# compartilham a mesma cópia no cache de páginas e a carga é quase instantânea.
+# Os arquivos de dados nunca são reescritos: cada treino grava arquivos novos, com o início
+# do sha256 no nome, e só então troca o cabeçalho. Quem já mapeou os arquivos antigos continua
+# lendo-os, e um cabeçalho nunca aponta para vetores de um treino e movie_ids de outro.
+# O cabeçalho também guarda a 'impressao' (impressao_pnl) do conteúdo, que a tabela de vizinhos
+# registra ao ser salva: uma tabela de outro treino é ignorada na carga.
+
+# Máximo de elementos da matriz (sementes x catálogo) calculada de uma vez;
+# acima disso as sementes são processadas em blocos para limitar a memória.
+LIMITE_ELEMENTOS_BLOCO = 2 ** 23
+
+def _mapa_de_linhas(movie_ids, linhas):
+    """Mapa denso movieId -> linha (-1 para ids fora do modelo). Para ids repetidos vale a primeira ocorrência."""
+    tamanho_mapa = int(movie_ids.max()) + 1 if movie_ids.size else 0
+    linha_por_movieid = np.full(tamanho_mapa, -1, dtype=np.int64)
+    ids_unicos, primeira = np.unique(movie_ids, return_index=True)
+    validos = ids_unicos >= 0
+    linha_por_movieid[ids_unicos[validos]] = linhas[primeira[validos]]
+    return linha_por_movieid
+
+def preparar_pnl(pnl_data):
+    """
+    Monta, a partir do modelo salvo por pnl_modulo.py, o dicionário usado pelas funções abaixo:
+    'vetores' (matriz latente com linhas de norma 1), 'movie_ids' (movieId de cada linha) e
+    'linha_por_movieid' (mapa denso movieId -> linha, -1 para ids fora do modelo).
+    """
+    matriz = np.asarray(pnl_data['latent_matrix'])
+    indices = pnl_data['movie_indices']
+
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0 # Vetores nulos continuam nulos (similaridade 0), como no cosine_similarity
+    vetores = matriz / normas
+
+    # A linha i da matriz corresponde à i-ésima entrada de movie_indices
+    movie_ids = indices.index.to_numpy(dtype=np.int64)
+    return {
+        'vetores': vetores,
+        'movie_ids': movie_ids,
+        'linha_por_movieid': _mapa_de_linhas(movie_ids, indices.to_numpy(dtype=np.int64)),
+    }
+
+# --- Artefato .npy (mmap) ---
+
+FORMATO_ARTEFATO = "recomenda_ai.pnl"
+VERSAO_ARTEFATO = 1
+
+def _sha256(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _impressao(vetores, movie_ids):
+    h = hashlib.sha256()
+    linhas_por_bloco = max(1, LIMITE_ELEMENTOS_BLOCO // max(vetores.shape[1], 1))
+    for inicio in range(0, vetores.shape[0], linhas_por_bloco):
+        h.update(np.ascontiguousarray(vetores[inicio:inicio + linhas_por_bloco], dtype=np.float32).tobytes())
+    h.update(np.ascontiguousarray(movie_ids, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+def impressao_pnl(pnl):
+    """
+    sha256 dos vetores (float32, na ordem das linhas) e dos movie_ids do modelo: identifica
+    o conteúdo das linhas a que uma tabela de vizinhos se refere. Vem do cabeçalho do
+    artefato; para modelos vindos do pickle é calculada uma vez e guardada em pnl['impressao'].
+    """
+    if 'impressao' not in pnl:
+        pnl['impressao'] = _impressao(pnl['vetores'], pnl['movie_ids'])
+    return pnl['impressao']
+
+def salvar_artefato_pnl(pnl, caminho_cabecalho, caminho_vetores, caminho_movie_ids):
+    """
+    Grava o artefato (float32 + int32 + cabeçalho JSON). Os .npy vão para arquivos novos
+    (ver gravar_cabecalho_artefato); caminho_vetores e caminho_movie_ids dão o nome base.
+    """
+    movie_ids = pnl['movie_ids']
+    if movie_ids.size and (movie_ids.min() < np.iinfo(np.int32).min or movie_ids.max() > np.iinfo(np.int32).max):
+        raise ValueError("movieIds fora do intervalo de int32.")
+
+    # Reordena as linhas (se preciso) para que a linha i seja a do movieId movie_ids[i]
+    linhas = linhas_dos_filmes(pnl, movie_ids)
+    vetores = pnl['vetores'] if np.array_equal(linhas, np.arange(movie_ids.size)) else pnl['vetores'][linhas]
+
+    diretorio = os.path.dirname(caminho_cabecalho) or "."
+    os.makedirs(diretorio, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=diretorio) as temporario:
+        temporario_vetores = os.path.join(temporario, os.path.basename(caminho_vetores))
+        temporario_movie_ids = os.path.join(temporario, os.path.basename(caminho_movie_ids))
+        np.save(temporario_vetores, np.ascontiguousarray(vetores, dtype=np.float32))
+        np.save(temporario_movie_ids, movie_ids.astype(np.int32))
+        gravar_cabecalho_artefato(caminho_cabecalho, temporario_vetores, temporario_movie_ids)
+
+def _nome_versionado(caminho, sha256):
+    """'pnl_vetores.npy' -> 'pnl_vetores.<16 primeiros hex do sha256>.npy'"""
+    raiz, extensao = os.path.splitext(os.path.basename(caminho))
+    return f"{raiz}.{sha256[:16]}{extensao}"
+
+def _arquivos_do_cabecalho(caminho_cabecalho):
+    # Nomes dos arquivos de dados referenciados pelo cabeçalho atual (vazio se não houver)
+    try:
+        with open(caminho_cabecalho, encoding='utf-8') as f:
+            return {info['nome'] for info in json.load(f)['arquivos'].values()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
+def gravar_cabecalho_artefato(caminho_cabecalho, caminho_vetores, caminho_movie_ids):
+    """
+    Publica vetores/movie_ids recém-gravados em arquivos temporários, no mesmo sistema de
+    arquivos do cabeçalho (também usado pelo treino em streaming, que preenche o .npy bloco a
+    bloco): cada um é movido (os.replace) para um nome com o início do seu sha256, e depois o
+    cabeçalho é substituído de uma vez. Arquivos de treinos mais antigos que o anterior são
+    apagados; os do anterior ficam para quem ainda está lendo o cabeçalho antigo.
+    """
+    diretorio = os.path.dirname(caminho_cabecalho) or "."
+    anteriores = _arquivos_do_cabecalho(caminho_cabecalho)
+
+    arquivos = {}
+    for chave, caminho in (('vetores', caminho_vetores), ('movie_ids', caminho_movie_ids)):
+        sha256 = _sha256(caminho)
+        nome = _nome_versionado(caminho, sha256)
+        os.replace(caminho, os.path.join(diretorio, nome))
+        arquivos[chave] = {'nome': nome, 'sha256': sha256}
+
+    vetores = np.load(os.path.join(diretorio, arquivos['vetores']['nome']), mmap_mode='r')
+    cabecalho = {
+        'formato': FORMATO_ARTEFATO,
+        'versao': VERSAO_ARTEFATO,
+        'linhas': int(vetores.shape[0]),
+        'dimensoes': int(vetores.shape[1]),
+        'dtype': 'float32',
+        'normalizado': True,
+        'impressao': _impressao(vetores, np.load(os.path.join(diretorio, arquivos['movie_ids']['nome']))),
+        'arquivos': arquivos,
+    }
+    del vetores
+    temporario = caminho_cabecalho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(cabecalho, f, indent=2)
+    os.replace(temporario, caminho_cabecalho)
+
+    # Limpeza: versões (e o nome sem versão, de artefatos antigos) que nenhum dos dois cabeçalhos usa
+    manter = anteriores | {info['nome'] for info in arquivos.values()}
+    for caminho in (caminho_vetores, caminho_movie_ids):
+        raiz, extensao = os.path.splitext(os.path.basename(caminho))
+        for nome in os.listdir(diretorio):
+            versionado = nome.startswith(raiz + ".") and nome.endswith(extensao) and nome.count(".") == raiz.count(".") + 2
+            if (versionado or nome == raiz + extensao) and nome not in manter:
+                os.remove(os.path.join(diretorio, nome))
+
+def carregar_artefato_pnl(caminho_cabecalho, verificar_checksum=False):
+    """
+    Abre o artefato com a matriz mapeada em memória. Retorna o mesmo dicionário de
+    preparar_pnl, ou None (com aviso) se ele não existir, for de outra versão ou estiver
+    inconsistente. Os checksums só são conferidos com verificar_checksum=True (lê os arquivos).
+    """
+    if not os.path.exists(caminho_cabecalho):
+        return None
+    try:
+        with open(caminho_cabecalho, encoding='utf-8') as f:
+            cabecalho = json.load(f)
+        if cabecalho.get('formato') != FORMATO_ARTEFATO or cabecalho.get('versao') != VERSAO_ARTEFATO:
+            print(f"AVISO: Artefato PNL '{caminho_cabecalho}' com formato/versão não suportados. Usando o pickle.")
+            return None
+
+        diretorio = os.path.dirname(caminho_cabecalho)
+        arquivos = {nome: os.path.join(diretorio, info['nome']) for nome, info in cabecalho['arquivos'].items()}
+        if verificar_checksum:
+            for nome, info in cabecalho['arquivos'].items():
+                if _sha256(arquivos[nome]) != info['sha256']:
+                    print(f"AVISO: Checksum de '{arquivos[nome]}' não confere. Usando o pickle.")
+                    return None
+
+        vetores = np.load(arquivos['vetores'], mmap_mode='r')
+        movie_ids = np.load(arquivos['movie_ids']).astype(np.int64)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"AVISO: Falha ao abrir o artefato PNL '{caminho_cabecalho}' ({e}). Usando o pickle.")
+        return None
+
+    if vetores.shape != (cabecalho['linhas'], cabecalho['dimensoes']) or movie_ids.size != cabecalho['linhas']:
+        print(f"AVISO: Artefato PNL '{caminho_cabecalho}' inconsistente com o cabeçalho. Usando o pickle.")
+        return None
+
+    pnl = {
+        'vetores': vetores,
+        'movie_ids': movie_ids,
+        'linha_por_movieid': _mapa_de_linhas(movie_ids, np.arange(movie_ids.size)),
+    }
+    if 'impressao' in cabecalho: # Cabeçalhos antigos não têm: impressao_pnl a calcula quando preciso
+        pnl['impressao'] = cabecalho['impressao']
+    return pnl
+
+def linhas_dos_filmes(pnl, movie_ids):
+    """Linha de cada movieId na matriz latente (-1 para ids fora do modelo)."""
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    mapa = pnl['linha_por_movieid']
+    dentro = (movie_ids >= 0) & (movie_ids < mapa.size)
+    linhas = np.full(movie_ids.shape, -1, dtype=np.int64)
+    linhas[dentro] = mapa[movie_ids[dentro]]
+    return linhas
+
+def blocos_de_similaridade(pnl, linhas):
+    """
+    Gera (inicio, similaridades) para blocos consecutivos das linhas-semente, onde
+    'similaridades' é a matriz (sementes do bloco x catálogo) de similaridade do cosseno.
+    """
+    vetores = pnl['vetores']
+    tamanho_bloco = max(1, LIMITE_ELEMENTOS_BLOCO // max(vetores.shape[0], 1))
+    for inicio in range(0, linhas.size, tamanho_bloco):
+        yield inicio, vetores[linhas[inicio:inicio + tamanho_bloco]] @ vetores.T
+
+def vizinhos_mais_proximos(pnl, linhas, top_n):
+    """
+    Para cada linha-semente, as top_n linhas mais similares, excluindo a própria semente.
+    Retorna (vizinhos, similaridades), ambos (sementes x k), com k = min(top_n, catálogo - 1),
+    em ordem decrescente de similaridade (empates: menor linha primeiro).
+    """
+    linhas = np.asarray(linhas, dtype=np.int64)
+    total = pnl['vetores'].shape[0]
+    k = max(min(int(top_n), total - 1), 0)
+    vizinhos = np.empty((linhas.size, k), dtype=np.int64)
+    similaridades = np.empty((linhas.size, k), dtype=np.float64)
+    if k == 0 or linhas.size == 0:
+        return vizinhos, similaridades
+
+    for inicio, bloco in blocos_de_similaridade(pnl, linhas):
+        n = bloco.shape[0]
+        bloco[np.arange(n), linhas[inicio:inicio + n]] = -np.inf # A semente é excluída pelo índice
+
+        candidatos = np.argpartition(-bloco, k - 1, axis=1)[:, :k] # k <= total - 1: a semente (-inf) nunca entra
+        valores = np.take_along_axis(bloco, candidatos, axis=1)
+        ordem = np.lexsort((candidatos, -valores)) # Ordena cada linha: maior similaridade, depois menor índice
+        vizinhos[inicio:inicio + n] = np.take_along_axis(candidatos, ordem, axis=1)
+        similaridades[inicio:inicio + n] = np.take_along_axis(valores, ordem, axis=1)
+
+    return vizinhos, similaridades
+
+AGREGACOES = ('max', 'media', 'contagem')
+
+def pontuar_vizinhanca(pnl, linhas, vizinhos_por_semente=25, agregacao='max', tabela=None, indice_ann=None, n_sondas=None):
+    """
+    Une os vizinhos de todas as sementes (calculados em um único bloco sementes x catálogo)
+    e agrega a similaridade de cada candidato sobre as sementes que o trouxeram:
+      'max'      -> maior similaridade com algum favorito;
+      'media'    -> média das similaridades;
+      'contagem' -> soma das similaridades (média ponderada pelo número de sementes).
+    Com 'tabela' ou 'indice_ann', os vizinhos vêm de buscar_vizinhos (tabela ou busca aproximada,
+    com n_sondas listas visitadas).
+    Retorna (movie_ids, pontuacoes) dos candidatos, sem repetição.
+    """
+    if agregacao not in AGREGACOES:
+        raise ValueError(f"Agregação '{agregacao}' inválida. Use uma de {AGREGACOES}.")
+
+    linhas_vizinhas, similaridades = buscar_vizinhos(pnl, linhas, vizinhos_por_semente, tabela, indice_ann, n_sondas)
+    linhas_candidatas, posicao = np.unique(linhas_vizinhas.ravel(), return_inverse=True)
+    similaridades = similaridades.ravel()
+
+    if agregacao == 'max':
+        pontuacoes = np.full(linhas_candidatas.size, -np.inf)
+        np.maximum.at(pontuacoes, posicao, similaridades)
+    else:
+        pontuacoes = np.bincount(posicao, weights=similaridades, minlength=linhas_candidatas.size)
+        if agregacao == 'media':
+            pontuacoes /= np.bincount(posicao, minlength=linhas_candidatas.size)
+
+    return pnl['movie_ids'][linhas_candidatas], pontuacoes
+
+# --- Tabela de vizinhos pré-calculada ---
+
+def construir_tabela_vizinhos(pnl, k, n_threads=None, linhas_por_tarefa=1024):
+    """
+    Calcula os k vizinhos (e as similaridades) de todas as linhas do modelo.
+    As linhas são divididas em tarefas processadas por um pool de threads: o produto de
+    matrizes e o argpartition do NumPy liberam o GIL, e todas as threads leem a mesma matriz.
+    Retorna {'vizinhos': int32 (filmes x k), 'similaridades': float32 (filmes x k)}.
+    """
+    total = pnl['vetores'].shape[0]
+    k = max(min(int(k), total - 1), 0)
+    vizinhos = np.empty((total, k), dtype=np.int32)
+    similaridades = np.empty((total, k), dtype=np.float32)
+
+    def processar(inicio):
+        linhas = np.arange(inicio, min(inicio + linhas_por_tarefa, total))
+        v, s = vizinhos_mais_proximos(pnl, linhas, k)
+        vizinhos[linhas] = v
+        similaridades[linhas] = s
+
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        list(pool.map(processar, range(0, total, linhas_por_tarefa)))
+
+    return {'vizinhos': vizinhos, 'similaridades': similaridades}
+
+def atualizar_tabela_vizinhos(pnl, tabela, linhas_alteradas, k):
+    """
+    Atualiza uma tabela depois que as 'linhas_alteradas' mudaram de vetor ou foram adicionadas
+    ao fim da matriz (as demais linhas não mudam de posição), sem recalcular o catálogo inteiro:
+    - as linhas alteradas, e as que tinham uma alterada entre os vizinhos, são recalculadas;
+    - as demais só podem ganhar vizinhos entre as alteradas: os k antigos são unidos a elas
+      e reordenados (mesmo critério de vizinhos_mais_proximos).
+    Retorna None se a tabela não for compatível (outro k ou linhas novas fora de 'linhas_alteradas');
+    nesse caso use construir_tabela_vizinhos.
+    """
+    vetores = pnl['vetores']
+    total = vetores.shape[0]
+    k = max(min(int(k), total - 1), 0)
+    antigos = tabela['vizinhos'].shape[0]
+    alteradas = np.unique(np.asarray(linhas_alteradas, dtype=np.int64))
+    if (tabela['vizinhos'].shape[1] != k or k == 0 or antigos > total
+            or not np.array_equal(alteradas[alteradas >= antigos], np.arange(antigos, total))):
+        return None
+
+    vizinhos = np.empty((total, k), dtype=np.int32)
+    similaridades = np.empty((total, k), dtype=np.float32)
+    vizinhos[:antigos] = tabela['vizinhos']
+    similaridades[:antigos] = tabela['similaridades']
+
+    alteradas_antigas = alteradas[alteradas < antigos]
+    recalcular = np.zeros(total, dtype=bool)
+    recalcular[alteradas] = True
+    recalcular[:antigos] |= np.isin(vizinhos[:antigos], alteradas_antigas).any(axis=1)
+
+    linhas = np.flatnonzero(recalcular)
+    for inicio in range(0, linhas.size, 1024):
+        bloco = linhas[inicio:inicio + 1024]
+        vizinhos[bloco], similaridades[bloco] = vizinhos_mais_proximos(pnl, bloco, k)
+
+    mesclar = np.flatnonzero(~recalcular)
+    tamanho_bloco = max(1, LIMITE_ELEMENTOS_BLOCO // max(alteradas.size + k, 1))
+    for inicio in range(0, mesclar.size, tamanho_bloco):
+        bloco = mesclar[inicio:inicio + tamanho_bloco]
+        candidatos = np.hstack([vizinhos[bloco].astype(np.int64), np.broadcast_to(alteradas, (bloco.size, alteradas.size))])
+        valores = np.hstack([similaridades[bloco].astype(np.float64), vetores[bloco] @ vetores[alteradas].T])
+        topo = np.argpartition(-valores, k - 1, axis=1)[:, :k]
+        candidatos = np.take_along_axis(candidatos, topo, axis=1)
+        valores = np.take_along_axis(valores, topo, axis=1)
+        ordem = np.lexsort((candidatos, -valores))
+        vizinhos[bloco] = np.take_along_axis(candidatos, ordem, axis=1)
+        similaridades[bloco] = np.take_along_axis(valores, ordem, axis=1)
+
+    return {'vizinhos': vizinhos, 'similaridades': similaridades}
+
+def caminho_impressao_tabela(caminho_vizinhos):
+    """JSON ao lado da tabela com a impressao_pnl do modelo usado para calculá-la ('pnl_vizinhos.json')."""
+    return os.path.splitext(caminho_vizinhos)[0] + ".json"
+
+def _impressao_da_tabela(caminho_vizinhos):
+    try:
+        with open(caminho_impressao_tabela(caminho_vizinhos), encoding='utf-8') as f:
+            return json.load(f)['impressao_pnl']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def salvar_tabela_vizinhos(pnl, tabela, caminho_vizinhos, caminho_similaridades):
+    """
+    Salva a tabela em dois .npy (carregáveis com np.load(..., mmap_mode='r')) e a impressao_pnl
+    do modelo em caminho_impressao_tabela. Os .npy são gravados em temporários e trocados com
+    os.replace (quem mapeou a tabela anterior continua lendo-a); a impressão é apagada antes da
+    troca e gravada por último, então uma tabela pela metade nunca é aceita na carga.
+    """
+    diretorio = os.path.dirname(caminho_vizinhos) or "."
+    caminho_impressao = caminho_impressao_tabela(caminho_vizinhos)
+    with tempfile.TemporaryDirectory(dir=diretorio) as temporario:
+        temporario_vizinhos = os.path.join(temporario, os.path.basename(caminho_vizinhos))
+        temporario_similaridades = os.path.join(temporario, os.path.basename(caminho_similaridades))
+        np.save(temporario_vizinhos, tabela['vizinhos'])
+        np.save(temporario_similaridades, tabela['similaridades'])
+        if os.path.exists(caminho_impressao):
+            os.remove(caminho_impressao)
+        os.replace(temporario_vizinhos, caminho_vizinhos)
+        os.replace(temporario_similaridades, caminho_similaridades)
+
+        temporario_impressao = os.path.join(temporario, os.path.basename(caminho_impressao))
+        with open(temporario_impressao, 'w', encoding='utf-8') as f:
+            json.dump({'impressao_pnl': impressao_pnl(pnl)}, f, indent=2)
+        os.replace(temporario_impressao, caminho_impressao)
+
+def carregar_tabela_vizinhos(pnl, caminho_vizinhos, caminho_similaridades):
+    """
+    Mapeia a tabela em memória (mmap). Retorna None se os arquivos não existirem ou não
+    corresponderem ao modelo carregado (impressao_pnl diferente da registrada ao salvar).
+    """
+    if not (os.path.exists(caminho_vizinhos) and os.path.exists(caminho_similaridades)):
+        return None
+    impressao = impressao_pnl(pnl)
+    if _impressao_da_tabela(caminho_vizinhos) != impressao:
+        print(f"AVISO: Tabela de vizinhos PNL '{caminho_vizinhos}' não foi calculada para o modelo carregado. Ignorando.")
+        return None
+    vizinhos = np.load(caminho_vizinhos, mmap_mode='r')
+    similaridades = np.load(caminho_similaridades, mmap_mode='r')
+    # Conferida de novo depois de mapear: se um treino trocou a tabela no meio, a impressão mudou ou sumiu
+    if _impressao_da_tabela(caminho_vizinhos) != impressao:
+        print(f"AVISO: Tabela de vizinhos PNL '{caminho_vizinhos}' foi substituída durante a carga. Ignorando.")
+        return None
+    total = pnl['vetores'].shape[0]
+    if vizinhos.shape[0] != total or similaridades.shape != vizinhos.shape:
+        print(f"AVISO: Tabela de vizinhos PNL ({vizinhos.shape[0]} filmes) não corresponde ao modelo ({total} filmes). Ignorando.")
+        return None
+    return {'vizinhos': vizinhos, 'similaridades': similaridades}
+
+def buscar_vizinhos(pnl, linhas, top_n, tabela=None, indice_ann=None, n_sondas=None):
+    """
+    Vizinhos das sementes, no formato de vizinhos_mais_proximos. Usa, nesta ordem:
+    a tabela pré-calculada (exata, O(top_n) por semente) quando ela cobre top_n; o índice
+    aproximado (indice_ann.py, visitando n_sondas listas) quando existir; e, por fim, a
+    busca exata no catálogo.
+    """
+    linhas = np.asarray(linhas, dtype=np.int64)
+    if tabela is not None and int(top_n) <= tabela['vizinhos'].shape[1]:
+        top_n = max(int(top_n), 0)
+        return (tabela['vizinhos'][linhas, :top_n].astype(np.int64),
+                tabela['similaridades'][linhas, :top_n].astype(np.float64))
+    if indice_ann is not None:
+        from Codigo_fonte import indice_ann as ann # Importado aqui: indice_ann depende deste módulo
+        return ann.buscar_ivf(pnl, indice_ann, linhas, top_n, n_sondas)
+    return vizinhos_mais_proximos(pnl, linhas, top_n)
+
+def buscar_por_vetor(pnl, vetor, top_n, indice_ann=None, n_sondas=None):
+    """
+    As top_n linhas mais similares a um vetor de consulta normalizado que não é um filme do
+    modelo (ex.: uma descrição em texto livre). Retorna (linhas, similaridades) em ordem
+    decrescente (empates: menor linha primeiro). Usa o índice aproximado (n_sondas listas) quando existir.
+    """
+    vetor = np.asarray(vetor)
+    if indice_ann is not None:
+        from Codigo_fonte import indice_ann as ann # Importado aqui: indice_ann depende deste módulo
+        vizinhos, similaridades = ann.buscar_ivf_por_vetores(pnl, indice_ann, vetor[None, :], top_n, n_sondas)
+        return vizinhos[0], similaridades[0]
+
+    valores = pnl['vetores'] @ vetor.astype(pnl['vetores'].dtype)
+    k = max(min(int(top_n), valores.size), 0)
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    candidatos = np.argpartition(-valores, k - 1)[:k]
+    ordem = np.lexsort((candidatos, -valores[candidatos]))
+    return candidatos[ordem].astype(np.int64), valores[candidatos[ordem]].astype(np.float64)
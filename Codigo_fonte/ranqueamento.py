@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from Codigo_fonte import catalogo
+from Codigo_fonte import pnl_vetorizado
+
+# Etapas finais do pipeline híbrido: filtros de metadados, faixa de notas, seleção do
+# top-N e montagem do resultado. São funções puras sobre os arrays do catálogo, sem
+# depender dos globais de recomendar.py, para que também rodem nos processos de
+# trabalho da recomendação em lote.
+
+FAIXA_NOTA = (1, 5)    # Notas CF aceitas pelo sistema fuzzy
+FAIXA_TEMPO = (0, 200) # Tempos disponíveis aceitos no ranqueamento
+
+# Casas decimais consideradas ao comparar prioridades e notas no top-N. A saída do fuzzy
+# tem ruído de ponto flutuante (o platô em 50 sai como 50 ± 1e-14) e as notas CF da
+# recomendação individual e da em lote diferem em ~1e-7 (ordem das somas, fatores float32);
+# sem o arredondamento esse ruído decidiria os empates no lugar dos critérios abaixo.
+CASAS_PRIORIDADE = 9
+CASAS_NOTA = 6
+
+def filtrar_por_metadados(cat, ids_candidatos, tempo_disponivel_min):
+    """
+    Aplica os filtros baratos (filme no catálogo, duração válida e que caiba no tempo).
+    Retorna um dicionário com os candidatos aprovados ('movie_ids', 'linhas', 'duracoes')
+    e os contadores de descarte ('falha_key', 'falha_type', 'falha_tempo').
+    """
+    ids_candidatos = np.asarray(ids_candidatos, dtype=np.int64)
+    linhas = catalogo.linhas_dos_filmes(cat, ids_candidatos)
+
+    # Filme fora do catálogo (ou sem coluna 'duracao')
+    tem_duracao = linhas >= 0
+    tem_duracao[tem_duracao] = cat['tem_duracao'][linhas[tem_duracao]]
+    falha_key = int(np.count_nonzero(~tem_duracao))
+    ids_candidatos, linhas = ids_candidatos[tem_duracao], linhas[tem_duracao]
+
+    # Duração inválida (não numérica)
+    duracao_valida = cat['duracao_valida'][linhas]
+    falha_type = int(np.count_nonzero(~duracao_valida))
+    ids_candidatos, linhas = ids_candidatos[duracao_valida], linhas[duracao_valida]
+
+    # Verifica o tempo
+    duracoes = cat['duracao'][linhas]
+    cabe_no_tempo = duracoes <= tempo_disponivel_min
+    falha_tempo = int(np.count_nonzero(~cabe_no_tempo))
+    ids_candidatos, linhas, duracoes = ids_candidatos[cabe_no_tempo], linhas[cabe_no_tempo], duracoes[cabe_no_tempo]
+
+    # Tempo disponível fora da faixa do sistema fuzzy: nenhum filme pode ser ranqueado
+    if not (FAIXA_TEMPO[0] <= tempo_disponivel_min <= FAIXA_TEMPO[1]):
+        ids_candidatos, linhas, duracoes = ids_candidatos[:0], linhas[:0], duracoes[:0]
+
+    return {
+        'movie_ids': ids_candidatos,
+        'linhas': linhas,
+        'duracoes': duracoes,
+        'falha_key': falha_key,
+        'falha_type': falha_type,
+        'falha_tempo': falha_tempo,
+    }
+
+def nota_na_faixa(notas_previstas):
+    """Máscara das notas CF aceitas (NaN, ou seja, previsão que falhou, fica de fora)."""
+    return (notas_previstas >= FAIXA_NOTA[0]) & (notas_previstas <= FAIXA_NOTA[1])
+
+def candidatos_pnl(pnl, cat, favoritos, vizinhos_por_favorito, agregacao, tabela=None, indice_ann=None, n_sondas=None):
+    """
+    Lista B: vizinhos PNL dos filmes favoritos, com a similaridade agregada sobre os
+    favoritos que trouxeram cada um (pnl_vetorizado.pontuar_vizinhanca). Favoritos fora
+    do catálogo ou do modelo PNL são ignorados. 'n_sondas' vale para o índice aproximado
+    (None: indice_ann.N_SONDAS_PADRAO). Retorna (movie_ids, pontuacoes).
+    """
+    sementes = np.asarray(favoritos, dtype=np.int64)
+    # Assegura que os favoritos existam no catálogo de filmes e no modelo PNL
+    sementes = sementes[catalogo.linhas_dos_filmes(cat, sementes) >= 0]
+    linhas = pnl_vetorizado.linhas_dos_filmes(pnl, sementes)
+    linhas = linhas[linhas >= 0]
+    return pnl_vetorizado.pontuar_vizinhanca(pnl, linhas, vizinhos_por_favorito, agregacao, tabela, indice_ann, n_sondas)
+
+def similaridades_dos_candidatos(ids_pnl, pontuacoes_pnl, movie_ids):
+    """Similaridade PNL agregada de cada candidato (NaN para os que não vieram da Lista B)."""
+    similaridades = np.full(movie_ids.shape, np.nan)
+    if ids_pnl.size == 0:
+        return similaridades
+    ordem = np.argsort(ids_pnl, kind='stable')
+    ids_ordenados = ids_pnl[ordem]
+    pos = np.minimum(np.searchsorted(ids_ordenados, movie_ids), ids_ordenados.size - 1)
+    encontrados = ids_ordenados[pos] == movie_ids
+    similaridades[encontrados] = pontuacoes_pnl[ordem[pos[encontrados]]]
+    return similaridades
+
+def selecionar_top_n(prioridades, notas_previstas, movie_ids, top_n, similaridades=None):
+    """
+    Índices dos top_n candidatos por 'prioridade_fuzzy' (decrescente), sem ordenar a lista toda.
+    Empates são resolvidos de forma determinística: maior 'nota_prevista_cf', depois maior
+    'similaridade_pnl' (se informada; candidatos sem ela ficam por último) e menor movieId.
+    Prioridades e notas são comparadas com CASAS_PRIORIDADE e CASAS_NOTA casas decimais.
+    """
+    prioridades = np.round(prioridades, CASAS_PRIORIDADE)
+    notas_previstas = np.round(notas_previstas, CASAS_NOTA)
+    total = prioridades.size
+    top_n = max(int(top_n), 0)
+    if top_n == 0 or total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if top_n < total:
+        # Prioridade do N-ésimo colocado; todos os empatados com ele continuam na disputa
+        limite = np.partition(prioridades, total - top_n)[total - top_n]
+        finalistas = np.flatnonzero(prioridades >= limite)
+    else:
+        finalistas = np.arange(total)
+
+    chaves = [movie_ids[finalistas]]
+    if similaridades is not None:
+        chaves.append(np.nan_to_num(-similaridades[finalistas], nan=np.inf))
+    chaves += [-notas_previstas[finalistas], -prioridades[finalistas]]
+    ordem = np.lexsort(chaves)
+    return finalistas[ordem[:top_n]]
+
+def montar_resultado(cat, movie_ids, linhas, prioridades, notas_previstas, duracoes, selecionados, similaridades=None):
+    """
+    Monta o DataFrame de saída apenas para as linhas selecionadas.
+    Com 'similaridades', inclui a coluna 'similaridade_pnl' (NaN para candidatos fora da Lista B).
+    """
+    df = pd.DataFrame({
+        'movieId': movie_ids[selecionados],
+        'titulo': catalogo.titulos_das_linhas(cat, linhas[selecionados]),
+        'prioridade_fuzzy': prioridades[selecionados],
+        'nota_prevista_cf': notas_previstas[selecionados],
+        'duracao_min': duracoes[selecionados]
+    })
+    if similaridades is not None:
+        df['similaridade_pnl'] = similaridades[selecionados]
+    return df
@@ -1,283 +1,354 @@
 import pandas as pd
-import pickle
 import os
+import time
 import numpy as np
 # MUDANÇA: 'from .' foi alterado para 'from Codigo_fonte'
 from Codigo_fonte import busca_filme 
+from Codigo_fonte import cf_vetorizado
+from Codigo_fonte import catalogo
+from Codigo_fonte import indice_avaliacoes
+from Codigo_fonte import ranqueamento
+from Codigo_fonte import recomendar_lote
+from Codigo_fonte import cache_recomendacoes
+from Codigo_fonte import sobreposicao_cf
+from Codigo_fonte import recursos
+from Codigo_fonte import metricas
+from Codigo_fonte import fuzzy_modulo
 from skfuzzy import control as ctrl
-from surprise import SVD, Dataset, Reader
 
-print("Carregando módulo 'recomendar.py'...")
+metricas.info("Carregando módulo 'recomendar.py'...")
 
-FILMES_CSV = os.path.join("Data", "filmes.csv")
-USUARIOS_CSV = os.path.join("Data", "usuarios.csv") 
-CF_MODEL_FILE = os.path.join("Modelos", "modelo_colaborativo.pkl")
-FUZZY_MODEL_FILE = os.path.join("Modelos", "fuzzy_control_system.pkl")
+USUARIOS_CSV = recursos.USUARIOS_CSV
+AGREGACAO_PNL = 'max' # Como a similaridade dos candidatos da Lista B é agregada: 'max', 'media' ou 'contagem'
+VIZINHOS_POR_FAVORITO = 25 # Vizinhos PNL buscados para cada filme favorito na Lista B
+N_SONDAS_PNL = None # Listas do índice aproximado visitadas na Lista B (None: indice_ann.N_SONDAS_PADRAO)
 
-# --- Passo 2: Carregamento GLOBAL de Modelos e Dados ---
-FILMES_DF_GLOBAL = None
-USUARIOS_RATINGS_DF_GLOBAL = None
-MODELO_CF_GLOBAL = None
-FUZZY_SISTEMA_GLOBAL = None
+# --- Passo 2: Modelos e Dados (carregados sob demanda pelo registro de recursos) ---
+# Os nomes globais antigos continuam acessíveis (recomendar.MODELO_CF_GLOBAL etc.), mas
+# cada artefato só é carregado no primeiro acesso. Veja recursos.warmup() para pré-carregar.
+_RECURSOS_GLOBAIS = {
+    'FILMES_DF_GLOBAL': 'filmes_por_id',
+    'CATALOGO_GLOBAL': 'catalogo', # Colunas do filmes.csv em arrays NumPy (movieId, duração, títulos)
+    'USUARIOS_RATINGS_DF_GLOBAL': 'usuarios_df',
+    'INDICE_AVALIACOES_GLOBAL': 'indice_avaliacoes', # Índice CSR das avaliações por usuário
+    'MODELO_CF_GLOBAL': 'modelo_cf', # SVD do surprise (pickle); a recomendação usa só os fatores abaixo
+    'FATORES_CF_GLOBAL': 'fatores_cf', # Arrays pu/qi/bu/bi do SVD (artefato mapeado em memória ou extraídos do pickle)
+    'FUZZY_SISTEMA_GLOBAL': 'sistema_fuzzy',
+    'AVALIADOR_FUZZY_GLOBAL': 'avaliador_fuzzy', # Regras e funções de pertinência do sistema fuzzy em arrays NumPy
+}
+
+def __getattr__(nome):
+    if nome in _RECURSOS_GLOBAIS:
+        return recursos.obter(_RECURSOS_GLOBAIS[nome])
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 def _carregar_recursos_para_recomendacao():
     """
-    Função interna para carregar todos os modelos (CF, Fuzzy) e dados (Usuários/Ratings, Filmes).
-    Esta função é chamada uma única vez na inicialização do módulo.
+    Pré-carrega todos os modelos (CF, Fuzzy) e dados (Usuários/Ratings, Filmes) usados na recomendação.
+    Opcional: sem ela, cada artefato é carregado no primeiro uso.
     """
-    global FILMES_DF_GLOBAL, USUARIOS_RATINGS_DF_GLOBAL, MODELO_CF_GLOBAL, FUZZY_SISTEMA_GLOBAL
-    
-    print("Iniciando carregamento GLOBAL de modelos (CF, Fuzzy) e dados (Usuários/Ratings, Filmes)...")
-    
-    try:
-        # Carrega filmes_df e define movieId como índice para acesso rápido com .loc
-        FILMES_DF_GLOBAL = pd.read_csv(FILMES_CSV, index_col='movieId')
-        USUARIOS_RATINGS_DF_GLOBAL = pd.read_csv(USUARIOS_CSV)
-        
-        with open(CF_MODEL_FILE, 'rb') as f:
-            MODELO_CF_GLOBAL = pickle.load(f)
-            
-        with open(FUZZY_MODEL_FILE, 'rb') as f:
-            FUZZY_SISTEMA_GLOBAL = pickle.load(f)
-            
-        print("Modelos CF, Fuzzy e dados carregados GLOBALMENTE com sucesso.")
-        return True # Indica sucesso
-    except FileNotFoundError as e:
-        print(f"ERRO CRÍTICO ao carregar o arquivo: {e}")
-        print("Verifique se os arquivos .csv e .pkl existem e estão nas pastas corretas.")
-        print("Certifique-se de executar 'coleta_api.py', 'machine.py' e 'fuzzy_modulo.py' (nessa ordem) antes.")
-        return False # Indica falha
-    except Exception as e:
-        print(f"ERRO INESPERADO ao carregar recursos de recomendação: {e}")
-        return False
-
-# Chama a função de carregamento imediatamente quando o módulo é importado
-_carregar_recursos_para_recomendacao()
+    print("Iniciando carregamento de modelos (CF, Fuzzy) e dados (Usuários/Ratings, Filmes)...")
+    # O pickle do SVD fica de fora: os fatores vêm do artefato NumPy (ou do pickle, se ele faltar)
+    nomes = [nome for nome in _RECURSOS_GLOBAIS.values() if nome != 'modelo_cf']
+    recursos.warmup(nomes)
+    sucesso = all(recursos.obter(nome) is not None for nome in nomes if nome != 'avaliador_fuzzy')
+    if sucesso:
+        print("Modelos CF, Fuzzy e dados carregados com sucesso.")
+    return sucesso
 
 # --- Passo 3: Funções de Geração de Candidatos ---
 
+def _pontuar_cf(modelo_cf, user_id, movie_ids):
+    """
+    Notas previstas (CF) do usuário para os movie_ids informados, na mesma ordem.
+    'modelo_cf' são os fatores de recursos.obter('fatores_cf') ou um SVD do surprise.
+    Retorna NaN onde a previsão falhar.
+    """
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+
+    # Caminho vetorizado: uma única multiplicação matriz-vetor para todos os candidatos.
+    # Usuários dobrados depois do treino (sobreposicao_cf) usam os fatores dobrados.
+    if recursos.carregado('modelo_cf') and modelo_cf is recursos.obter('modelo_cf'):
+        modelo_cf = recursos.obter('fatores_cf')
+    if isinstance(modelo_cf, dict):
+        return cf_vetorizado.prever_notas_cf(modelo_cf, user_id, movie_ids, sobreposicao_cf.instantaneo())
+
+    notas = np.full(movie_ids.shape, np.nan)
+    for i, movie_id in enumerate(movie_ids.tolist()):
+        try:
+            notas[i] = modelo_cf.predict(uid=user_id, iid=movie_id).est
+        except Exception:
+            pass
+    return notas
+
 def _get_lista_a_cf(modelo_cf, user_id, unseen_movie_ids):
     """
     (Gera a "Lista A": Candidatos da Filtragem Colaborativa)
     """
-    print(f"Calculando {len(unseen_movie_ids)} previsões (CF) para o usuário {user_id}...")
-    
-    predictions = {}
-    for movie_id in unseen_movie_ids:
-        # Verifica se o movie_id está no índice GLOBAL de filmes antes de tentar prever
-        if FILMES_DF_GLOBAL is not None and movie_id in FILMES_DF_GLOBAL.index:
-            try:
-                pred = modelo_cf.predict(uid=user_id, iid=movie_id)
-                predictions[movie_id] = pred.est 
-            except Exception:
-                pass
-            
-    print("Cálculo de previsões CF concluído.")
-    return predictions
+    metricas.info(f"Calculando {len(unseen_movie_ids)} previsões (CF) para o usuário {user_id}...")
+
+    cat = recursos.obter('catalogo')
+    if cat is None:
+        return {}
+
+    # Verifica se os movie_ids estão no catálogo GLOBAL de filmes antes de tentar prever
+    movie_ids = np.asarray(list(unseen_movie_ids) if isinstance(unseen_movie_ids, set) else unseen_movie_ids, dtype=np.int64)
+    movie_ids = movie_ids[catalogo.linhas_dos_filmes(cat, movie_ids) >= 0]
+    notas = _pontuar_cf(modelo_cf, user_id, movie_ids)
+    validas = ~np.isnan(notas)
 
-def _get_lista_b_pnl(favorite_movie_ids, num_recs_per_movie=25):
+    metricas.info("Cálculo de previsões CF concluído.")
+    return dict(zip(movie_ids[validas].tolist(), notas[validas].tolist()))
+
+def _get_lista_b_pnl(favorite_movie_ids, num_recs_per_movie=VIZINHOS_POR_FAVORITO, agregacao=AGREGACAO_PNL):
     """
     (Gera a "Lista B": Candidatos do Conteúdo/PNL)
+    Os vizinhos de todos os favoritos saem de uma única operação matricial (favoritos x catálogo).
+    Retorna um dicionário {movieId: similaridade agregada sobre os favoritos que o trouxeram}.
     """
-    print(f"Buscando filmes similares (PNL) para {len(favorite_movie_ids)} filmes favoritos...")
-    
-    all_pnl_candidates = set()
-    
-    for seed_id in favorite_movie_ids:
-        # Assegura que o seed_id exista no FILMES_DF_GLOBAL antes de buscar similaridade
-        if FILMES_DF_GLOBAL is None or seed_id not in FILMES_DF_GLOBAL.index: 
-            # print(f"AVISO: Filme favorito ID {seed_id} não encontrado no catálogo global. Pulando PNL para ele.")
-            continue
+    metricas.info(f"Buscando filmes similares (PNL) para {len(favorite_movie_ids)} filmes favoritos...")
 
-        try:
-            similars_result = busca_filme.recomendar_por_similaridade(
-                movieId_base=seed_id,
-                top_n=num_recs_per_movie
-            )
-            
-            if isinstance(similars_result, (list, set)):
-                if similars_result: # Se a lista/set não for vazia
-                    all_pnl_candidates.update(similars_result)
-            elif isinstance(similars_result, pd.DataFrame):
-                if not similars_result.empty and 'movieId' in similars_result.columns:
-                    all_pnl_candidates.update(similars_result['movieId'].tolist())
-            elif isinstance(similars_result, pd.Series):
-                if not similars_result.empty:
-                    all_pnl_candidates.update(similars_result.tolist())
-            elif similars_result is not None:
-                try: 
-                    all_pnl_candidates.update(list(similars_result))
-                except TypeError:
-                    # print(f"AVISO: Retorno inesperado de busca_filme.recomendar_por_similaridade para {seed_id}: {type(similars_result)}")
-                    pass # Ignora tipos não iteráveis ou inválidos
-
-        except Exception as e:
-            print(f"ERRO ao buscar similares para o filme ID {seed_id}: {e}")
-            pass # Continua para o próximo filme favorito mesmo se houver erro
-        
-    print(f"Encontrados {len(all_pnl_candidates)} candidatos únicos via PNL.")
-    return all_pnl_candidates
+    pnl = recursos.obter('pnl_vetorizado')
+    cat = recursos.obter('catalogo')
+    if pnl is None or cat is None or not favorite_movie_ids:
+        return {}
+
+    sementes = np.fromiter(favorite_movie_ids, dtype=np.int64, count=len(favorite_movie_ids))
+    try:
+        movie_ids, pontuacoes = ranqueamento.candidatos_pnl(
+            pnl, cat, sementes, num_recs_per_movie, agregacao,
+            recursos.obter('tabela_vizinhos_pnl'), recursos.obter('indice_ann_pnl'), N_SONDAS_PNL)
+    except Exception as e:
+        print(f"ERRO ao buscar similares para os filmes favoritos: {e}")
+        return {}
+
+    candidatos = dict(zip(movie_ids.tolist(), pontuacoes.tolist()))
+    metricas.info(f"Encontrados {len(candidatos)} candidatos únicos via PNL.")
+    return candidatos
 
-def gerar_recomendacoes_hibridas(user_id, tempo_disponivel_min, top_n=10):
+def _calcular_prioridades_fuzzy(notas_previstas, tempo_disponivel_min):
     """
-    Esta é a função principal que orquestra todo o processo de recomendação.
-    Retorna: Um DataFrame Pandas com o Top N, ordenado pela prioridade.
+    Calcula a prioridade fuzzy de todos os candidatos para um mesmo tempo disponível.
+    Usa o avaliador vetorizado; se ele não estiver disponível, recorre ao skfuzzy filme a filme.
+    Candidatos sem saída fuzzy (área vazia) recebem prioridade 0.
     """
-    global FILMES_DF_GLOBAL, USUARIOS_RATINGS_DF_GLOBAL, MODELO_CF_GLOBAL, FUZZY_SISTEMA_GLOBAL
+    avaliador = recursos.obter('avaliador_fuzzy')
+    if avaliador is not None:
+        prioridades = fuzzy_modulo.calcular_prioridades_lote(avaliador, notas_previstas, tempo_disponivel_min)
+        return np.nan_to_num(prioridades, nan=0.0)
 
-    if FILMES_DF_GLOBAL is None or FILMES_DF_GLOBAL.empty:
+    simulacao_fuzzy = ctrl.ControlSystemSimulation(recursos.obter('sistema_fuzzy'))
+    prioridades = np.zeros(len(notas_previstas))
+    for i, nota_prevista in enumerate(notas_previstas):
+        simulacao_fuzzy.input['nota_prevista'] = nota_prevista
+        simulacao_fuzzy.input['tempo_disponivel'] = tempo_disponivel_min
+        try:
+            simulacao_fuzzy.compute()
+            prioridades[i] = simulacao_fuzzy.output['prioridade_final']
+        except Exception:
+            prioridades[i] = 0
+    return prioridades
+
+def _gerar_ranking_hibrido(user_id, tempo_disponivel_min, top_n, execucao):
+    """
+    Executa todo o pipeline híbrido e retorna (DataFrame com o Top N, completo), onde
+    'completo' indica que o DataFrame contém todos os filmes aprovados.
+    Retorna None quando a recomendação não pôde ser calculada (dados ausentes, usuário inexistente).
+    Tempos e contagens de cada estágio são anotados em 'execucao' (ver metricas.py).
+    """
+    filmes_df = recursos.obter('filmes_por_id')
+    if filmes_df is None or filmes_df.empty:
         print("ERRO: FILMES_DF_GLOBAL não carregado ou está vazio.")
-        return pd.DataFrame()
-    if USUARIOS_RATINGS_DF_GLOBAL is None or USUARIOS_RATINGS_DF_GLOBAL.empty:
+        return None
+    usuarios_df = recursos.obter('usuarios_df')
+    if usuarios_df is None or usuarios_df.empty:
         print("ERRO: USUARIOS_RATINGS_DF_GLOBAL não carregado ou está vazio.")
-        return pd.DataFrame()
-    if MODELO_CF_GLOBAL is None:
-        print("ERRO: MODELO_CF_GLOBAL não carregado.")
-        return pd.DataFrame()
-    if FUZZY_SISTEMA_GLOBAL is None:
+        return None
+    modelo_cf = recursos.obter('fatores_cf')
+    if modelo_cf is None:
+        print("ERRO: Modelo CF não carregado.")
+        return None
+    if recursos.obter('sistema_fuzzy') is None:
         print("ERRO: FUZZY_SISTEMA_GLOBAL não carregado.")
-        return pd.DataFrame()
+        return None
+    cat = recursos.obter('catalogo')
+    indice = recursos.obter('indice_avaliacoes')
+
+    # O pipeline é dividido em estágios, dos mais baratos para os mais caros:
+    #   usuário -> listas A e B -> pool de candidatos -> filtros de metadados -> CF -> fuzzy -> top-N
+    # Os filtros baratos (catálogo, duração) rodam ANTES da previsão CF, que só é
+    # calculada para os filmes que ainda podem ser recomendados.
+    metricas.info("\nIniciando processo de recomendação híbrida...")
 
-    print("\nIniciando processo de recomendação híbrida...")
+    # --- ESTÁGIO 1: Avaliações do usuário (entrada: avaliações, saída: favoritos) ---
+    inicio = time.perf_counter()
     try:
-        if 'userId' not in USUARIOS_RATINGS_DF_GLOBAL.columns:
+        if 'userId' not in usuarios_df.columns or indice is None:
             print(f"ERRO: Coluna 'userId' não encontrada em '{USUARIOS_CSV}'.")
-            return pd.DataFrame()
+            return None
 
-        user_ratings = USUARIOS_RATINGS_DF_GLOBAL[USUARIOS_RATINGS_DF_GLOBAL['userId'] == user_id]
-        if user_ratings.empty:
+        # Fatias do índice CSR: O(avaliações do usuário), sem varrer todo o usuarios.csv
+        vistos, notas_usuario = indice_avaliacoes.avaliacoes_do_usuario(indice, user_id)
+        if vistos.size == 0:
             print(f"Erro: Usuário {user_id} não encontrado ou não possui avaliações em '{USUARIOS_CSV}'.")
-            return pd.DataFrame()
+            return None
 
-        seen_movie_ids = set(user_ratings['movieId'])
-        favoritos_filtered = user_ratings[user_ratings['rating'] >= 4.5]
-        if favoritos_filtered.empty:
-            favorite_movie_ids = set()
-        else:
-            favorite_movie_ids = set(favoritos_filtered['movieId'].tolist())
-        
-        all_movie_ids = set(FILMES_DF_GLOBAL.index)
-        unseen_movie_ids = list(all_movie_ids - seen_movie_ids)
-        
+        favorite_movie_ids = set(vistos[notas_usuario >= indice_avaliacoes.NOTA_FAVORITO].tolist())
         if not favorite_movie_ids:
-            print(f"Aviso: Usuário {user_id} não tem filmes 'favoritos' (>= 4.5). A Lista B (PNL) será vazia ou limitada.")
+            metricas.info(f"Aviso: Usuário {user_id} não tem filmes 'favoritos' (>= 4.5). A Lista B (PNL) será vazia ou limitada.")
             
     except Exception as e:
         print(f"Erro ao processar dados do usuário {user_id} na fase inicial: {e}")
-        return pd.DataFrame() 
+        return None
+    metricas.registrar_estagio(execucao, 'usuario', vistos.size, len(favorite_movie_ids), inicio)
 
-    cf_scores_map = _get_lista_a_cf(MODELO_CF_GLOBAL, user_id, unseen_movie_ids)
-    
-    pnl_candidates_set = _get_lista_b_pnl(favorite_movie_ids)
+    # --- ESTÁGIO 2: Lista A (não vistos do catálogo) ---
+    inicio = time.perf_counter()
+    unseen_movie_ids = np.setdiff1d(cat['movie_ids'], vistos)
+    metricas.registrar_estagio(execucao, 'lista_a_cf', cat['movie_ids'].size, unseen_movie_ids.size, inicio)
 
-    cf_candidates_set = set(cf_scores_map.keys())
-    candidate_ids = cf_candidates_set.union(pnl_candidates_set)
-    candidate_ids = candidate_ids - seen_movie_ids # Remove filmes já vistos novamente
-    
-    print(f"Listas combinadas. Total de {len(candidate_ids)} candidatos únicos para ranquear.")
+    # --- ESTÁGIO 3: Lista B (similares PNL dos favoritos) ---
+    inicio = time.perf_counter()
+    pnl_candidatos = _get_lista_b_pnl(favorite_movie_ids)
+    ids_pnl = np.fromiter(pnl_candidatos.keys(), dtype=np.int64, count=len(pnl_candidatos))
+    pontuacoes_pnl = np.fromiter(pnl_candidatos.values(), dtype=np.float64, count=len(pnl_candidatos))
+    metricas.registrar_estagio(execucao, 'lista_b_pnl', len(favorite_movie_ids), ids_pnl.size, inicio)
 
-    if FUZZY_SISTEMA_GLOBAL is None:
-        print("ERRO: Sistema Fuzzy não carregado.")
-        return pd.DataFrame()
-        
-    simulacao_fuzzy = ctrl.ControlSystemSimulation(FUZZY_SISTEMA_GLOBAL) # Usa o sistema fuzzy GLOBAL
-    recomendacoes = []
+    # --- ESTÁGIO 4: Pool de candidatos (Lista A ∪ Lista B, sem os vistos) ---
+    inicio = time.perf_counter()
+    ids_candidatos = np.union1d(unseen_movie_ids, ids_pnl)
+    ids_candidatos = ids_candidatos[~np.isin(ids_candidatos, vistos)] # Remove filmes já vistos novamente
+    metricas.registrar_estagio(execucao, 'pool_candidatos', unseen_movie_ids.size + ids_pnl.size, ids_candidatos.size, inicio)
     
-    # --- CONTADORES DE DEBUG ---
-    cont_sucesso = 0
-    cont_falha_key = 0
-    cont_falha_type = 0
-    cont_falha_tempo = 0
-
-    print("Iniciando filtragem por tempo e ranqueamento Fuzzy...")
-    for movie_id in candidate_ids:
-        
-        if FILMES_DF_GLOBAL is None or movie_id not in FILMES_DF_GLOBAL.index:
-            cont_falha_key += 1
-            continue 
-        movie_data_series = FILMES_DF_GLOBAL.loc[movie_id] 
+    metricas.info(f"Listas combinadas. Total de {ids_candidatos.size} candidatos únicos para ranquear.")
 
-        try:
-            duracao_raw = movie_data_series.get('duracao')
-            
-            if duracao_raw is None: 
-                cont_falha_key += 1
-                continue
+    # --- ESTÁGIO 5: Filtros de metadados (catálogo e duração) ---
+    inicio = time.perf_counter()
+    entrada = ids_candidatos.size
+    filtrados = ranqueamento.filtrar_por_metadados(cat, ids_candidatos, tempo_disponivel_min)
+    ids_candidatos, linhas, duracoes = filtrados['movie_ids'], filtrados['linhas'], filtrados['duracoes']
+    metricas.registrar_estagio(execucao, 'filtros_metadados', entrada, ids_candidatos.size, inicio)
 
-            duracao = int(duracao_raw)
-            
-            # 2. VERIFICA O TEMPO
-            if duracao > tempo_disponivel_min:
-                cont_falha_tempo += 1
-                continue 
-            
-        except (ValueError, TypeError): 
-            cont_falha_type += 1
-            continue
-        except Exception: 
-            cont_falha_type += 1
-            continue
-
-        # --- REFINAMENTO (CF + FUZZY) ---
-        nota_prevista = cf_scores_map.get(movie_id)
-        if nota_prevista is None:
-            continue 
-            
-        min_nota = 1
-        max_nota = 5
-        min_tempo = 0
-        max_tempo = 200
+    # --- ESTÁGIO 6: Previsão CF (apenas para os filmes que passaram nos filtros) ---
+    inicio = time.perf_counter()
+    entrada = ids_candidatos.size
+    metricas.info(f"Calculando {entrada} previsões (CF) para o usuário {user_id}...")
+    notas_previstas = _pontuar_cf(modelo_cf, user_id, ids_candidatos)
 
-        if not (min_nota <= nota_prevista <= max_nota):
-            continue 
-        if not (min_tempo <= tempo_disponivel_min <= max_tempo):
-            continue 
+    # Filmes sem nota CF (NaN) também são descartados aqui
+    aprovados = ranqueamento.nota_na_faixa(notas_previstas)
+    ids_candidatos, linhas, duracoes, notas_previstas = (
+        ids_candidatos[aprovados], linhas[aprovados], duracoes[aprovados], notas_previstas[aprovados])
+    similaridades = ranqueamento.similaridades_dos_candidatos(ids_pnl, pontuacoes_pnl, ids_candidatos)
+    cont_sucesso = int(ids_candidatos.size)
+    metricas.registrar_estagio(execucao, 'pontuacao_cf', entrada, cont_sucesso, inicio)
 
-        simulacao_fuzzy.input['nota_prevista'] = nota_prevista
-        simulacao_fuzzy.input['tempo_disponivel'] = tempo_disponivel_min
-        
-        try:
-            simulacao_fuzzy.compute()
-            prioridade = simulacao_fuzzy.output['prioridade_final']
-        except ValueError as fuzzy_e: 
-            prioridade = 0 
-        except Exception as e:
-            prioridade = 0 
-
-        recomendacoes.append({
-            'movieId': movie_id,
-            'titulo': movie_data_series.get('titulo', f"Filme ID {movie_id}"), 
-            'prioridade_fuzzy': prioridade,
-            'nota_prevista_cf': nota_prevista,
-            'duracao_min': duracao
-        })
-        cont_sucesso += 1 
+    # --- ESTÁGIO 7: Ranqueamento Fuzzy (todos os candidatos de uma só vez) ---
+    inicio = time.perf_counter()
+    prioridades = _calcular_prioridades_fuzzy(notas_previstas, tempo_disponivel_min) if cont_sucesso else np.empty(0)
+    metricas.registrar_estagio(execucao, 'ranqueamento_fuzzy', cont_sucesso, prioridades.size, inicio)
 
-    print("\n--- RELATÓRIO DE DIAGNÓSTICO ---")
-    print(f"Filmes que passaram nos filtros: {cont_sucesso}")
-    print(f"Filmes filtrados por Tempo.....: {cont_falha_tempo}")
-    print(f"Filmes filtrados por KeyError..: {cont_falha_key}")
-    print(f"Filmes filtrados por TypeError.: {cont_falha_type}")
-    print("---------------------------------")
+    # --- ESTÁGIO 8: Top-N (seleção parcial: só as N primeiras linhas viram DataFrame) ---
+    inicio = time.perf_counter()
+    if cont_sucesso:
+        selecionados = ranqueamento.selecionar_top_n(prioridades, notas_previstas, ids_candidatos, top_n, similaridades)
+        df_recs = ranqueamento.montar_resultado(cat, ids_candidatos, linhas, prioridades, notas_previstas, duracoes,
+                                                selecionados, similaridades)
+    else:
+        df_recs = pd.DataFrame()
+    metricas.registrar_estagio(execucao, 'top_n', cont_sucesso, len(df_recs), inicio)
+
+    execucao['contadores'] = {
+        'sucesso': cont_sucesso,
+        'falha_tempo': filtrados['falha_tempo'],
+        'falha_key': filtrados['falha_key'],
+        'falha_type': filtrados['falha_type'],
+    }
+    if metricas.VERBOSO:
+        _imprimir_relatorio(execucao)
     
-    if not recomendacoes:
-        print("Nenhuma recomendação encontrada após aplicar todos os filtros.")
-        return pd.DataFrame()
-        
-    df_recs = pd.DataFrame(recomendacoes)
-    df_recs = df_recs.sort_values(by='prioridade_fuzzy', ascending=False)
+    if cont_sucesso == 0:
+        metricas.info("Nenhuma recomendação encontrada após aplicar todos os filtros.")
     
-    return df_recs.head(top_n) 
+    return df_recs, cont_sucesso <= top_n
+
+def _imprimir_relatorio(execucao):
+    contadores = execucao['contadores']
+    print("\n--- RELATÓRIO DE DIAGNÓSTICO ---")
+    print(f"Filmes que passaram nos filtros: {contadores['sucesso']}")
+    print(f"Filmes filtrados por Tempo.....: {contadores['falha_tempo']}")
+    print(f"Filmes filtrados por KeyError..: {contadores['falha_key']}")
+    print(f"Filmes filtrados por TypeError.: {contadores['falha_type']}")
+    print("Estágios (entrada -> saída, tempo):")
+    for estagio in execucao['estagios']:
+        print(f"  {estagio['estagio']:<20} {estagio['entrada']:>7} -> {estagio['saida']:>7}  {estagio['segundos'] * 1000:>9.2f} ms")
+    print("---------------------------------")
+
+def gerar_recomendacoes_hibridas(user_id, tempo_disponivel_min, top_n=10, retornar_metricas=False):
+    """
+    Esta é a função principal que orquestra todo o processo de recomendação.
+    Pedidos repetidos para o mesmo usuário e tempo são atendidos pelo cache_recomendacoes,
+    fatiando o ranking guardado quando o top_n pedido cabe nele.
+    O registro de execução (tempos e contagens por estágio) é enviado aos sinks de metricas.py.
+    Retorna: Um DataFrame Pandas com o Top N, ordenado pela prioridade
+             (ou a tupla (DataFrame, registro de execução) se retornar_metricas=True).
+    """
+    execucao = metricas.iniciar_execucao(user_id=user_id, tempo_disponivel_min=tempo_disponivel_min, top_n=top_n)
+    tempo_disponivel_min = cache_recomendacoes.balde_tempo(tempo_disponivel_min)
+    df_recs = cache_recomendacoes.obter(user_id, tempo_disponivel_min, top_n)
+    execucao['cache'] = 'acerto' if df_recs is not None else 'falha'
+
+    if df_recs is not None:
+        metricas.info(f"Recomendações do usuário {user_id} ({tempo_disponivel_min} min) obtidas do cache.")
+    else:
+        # Calcula um ranking um pouco maior que o pedido para atender top_n maiores sem recalcular
+        resultado = _gerar_ranking_hibrido(user_id, tempo_disponivel_min, max(top_n, cache_recomendacoes.TOP_N_MINIMO), execucao)
+        if resultado is None:
+            df_recs = pd.DataFrame()
+        else:
+            ranking, completo = resultado
+            cache_recomendacoes.guardar(user_id, tempo_disponivel_min, ranking, completo)
+            df_recs = ranking.head(max(top_n, 0)).reset_index(drop=True)
+
+    execucao['resultados'] = len(df_recs)
+    metricas.finalizar_execucao(execucao)
+    return (df_recs, execucao) if retornar_metricas else df_recs
+
+def gerar_recomendacoes_em_lote(pedidos, tamanho_bloco=recomendar_lote.TAMANHO_BLOCO_PADRAO, n_processos=None):
+    """
+    Gera recomendações para vários pedidos (user_id, tempo_disponivel_min, top_n) de uma vez,
+    compartilhando os modelos e o catálogo já carregados. As notas CF são calculadas em blocos
+    de usuários e, com n_processos > 1, os blocos são divididos entre processos.
+    Retorna: Uma lista de DataFrames, na mesma ordem dos pedidos.
+    """
+    pedidos = list(pedidos)
+    fatores, cat, indice = recursos.obter('fatores_cf'), recursos.obter('catalogo'), recursos.obter('indice_avaliacoes')
+    if fatores is None or cat is None or indice is None:
+        print("ERRO: Modelos e dados não carregados. Não é possível gerar recomendações em lote.")
+        return [pd.DataFrame() for _ in pedidos]
+
+    avaliador = recursos.obter('avaliador_fuzzy')
+    if avaliador is None:
+        # Sem o avaliador vetorizado não há como ranquear em bloco: um pedido por vez
+        return [gerar_recomendacoes_hibridas(u, t, n) for u, t, n in pedidos]
+
+    # Lista B: o lote usa o mesmo modelo PNL (tabela de vizinhos, índice ANN) da recomendação individual
+    pnl = recursos.obter('pnl_vetorizado')
+    tabela, indice_ann = (recursos.obter('tabela_vizinhos_pnl'), recursos.obter('indice_ann_pnl')) if pnl is not None else (None, None)
+    contexto = recomendar_lote.montar_contexto(fatores, cat, indice, avaliador, sobreposicao_cf.instantaneo(),
+                                               pnl, tabela, indice_ann, AGREGACAO_PNL, VIZINHOS_POR_FAVORITO, N_SONDAS_PNL)
+    metricas.info(f"Gerando recomendações em lote para {len(pedidos)} pedidos...")
+    return recomendar_lote.recomendar_em_lote(contexto, pedidos, tamanho_bloco=tamanho_bloco, n_processos=n_processos)
 
 if __name__ == "__main__":
     
     print("\n" + "="*50)
     print("EXECUTANDO 'recomendar.py' DIRETAMENTE PARA TESTE...")
     print("="*50)
+    metricas.VERBOSO = True # Exibe o progresso e o relatório de diagnóstico no teste
 
-    # Note: O carregamento de recursos agora acontece na importação do módulo.
-    # Esta verificação é para garantir que o carregamento global foi bem-sucedido.
-    if FILMES_DF_GLOBAL is not None and MODELO_CF_GLOBAL is not None:
+    # Pré-carrega os recursos e garante que o carregamento foi bem-sucedido.
+    if _carregar_recursos_para_recomendacao():
             
         USER_ID_TESTE = 1      
         TEMPO_DISPONIVEL_TESTE = 90
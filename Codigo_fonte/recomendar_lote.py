@@ -0,0 +1,216 @@
+import mmap
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from Codigo_fonte import cf_vetorizado
+from Codigo_fonte import indice_avaliacoes
+from Codigo_fonte import ranqueamento
+from Codigo_fonte import fuzzy_modulo
+
+# Recomendação em lote: muitos pedidos (user_id, tempo_disponivel_min, top_n) de uma vez.
+# Os pedidos são agrupados em blocos; para cada bloco as notas CF de todos os usuários
+# saem de uma única multiplicação de matrizes (usuários x filmes ranqueáveis) e depois
+# cada pedido passa pelos mesmos filtros, fuzzy e top-N de gerar_recomendacoes_hibridas.
+#
+# A Lista B (PNL) não acrescenta candidatos: eles são filmes do catálogo, que já estão
+# todos no pool de não vistos. Ela é calculada por usuário apenas para a coluna
+# 'similaridade_pnl' e o desempate do top-N, como em gerar_recomendacoes_hibridas.
+#
+# Com n_processos > 1 os blocos são distribuídos em um ProcessPoolExecutor. Os arrays
+# grandes (fatores do SVD e da sobreposição, catálogo, índice de avaliações, modelo PNL) vão para memória compartilhada
+# e os processos de trabalho apenas se anexam a ela, em vez de receber cópias via pickle. Arrays
+# já mapeados de um arquivo (artefato CF) não são copiados: cada processo mapeia o mesmo arquivo.
+
+TAMANHO_BLOCO_PADRAO = 256
+
+# Contexto do processo de trabalho (preenchido pelo initializer do pool)
+_CONTEXTO_PROCESSO = None
+_SEGMENTOS_PROCESSO = []
+
+def montar_contexto(fatores, cat, indice, avaliador, sobreposicao=None, pnl=None, tabela_pnl=None,
+                    indice_ann_pnl=None, agregacao_pnl='max', vizinhos_por_favorito=25, n_sondas_pnl=None):
+    """
+    Reúne os recursos já carregados que a recomendação em lote usa. Os filmes
+    ranqueáveis (no catálogo, com duração válida e dentro da faixa de tempo do
+    sistema fuzzy) são calculados aqui uma única vez para todos os pedidos.
+    'sobreposicao' é o instantâneo de sobreposicao_cf (usuários dobrados após o treino).
+    'pnl', 'tabela_pnl' e 'indice_ann_pnl' são os recursos da Lista B (None sem o modelo PNL).
+    """
+    ids_catalogo = np.unique(cat['movie_ids'])
+    ranqueaveis = ranqueamento.filtrar_por_metadados(cat, ids_catalogo, ranqueamento.FAIXA_TEMPO[1])
+    return {
+        'fatores': fatores,
+        'catalogo': cat,
+        'indice': indice,
+        'avaliador': avaliador,
+        'sobreposicao': sobreposicao,
+        'pnl': pnl,
+        'tabela_pnl': tabela_pnl,
+        'indice_ann_pnl': indice_ann_pnl,
+        'parametros_pnl': {'agregacao': agregacao_pnl, 'vizinhos_por_favorito': vizinhos_por_favorito,
+                           'n_sondas': n_sondas_pnl},
+        'ranqueaveis': {
+            'movie_ids': ranqueaveis['movie_ids'],
+            'linhas': ranqueaveis['linhas'],
+            'duracoes': ranqueaveis['duracoes'],
+        },
+    }
+
+def _tempo_na_faixa(tempo_disponivel_min):
+    return ranqueamento.FAIXA_TEMPO[0] <= tempo_disponivel_min <= ranqueamento.FAIXA_TEMPO[1]
+
+def _lista_b(contexto, vistos, notas_usuario):
+    """(movie_ids, pontuacoes) da Lista B do usuário; vazia sem modelo PNL ou sem favoritos."""
+    vazia = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+    favoritos = vistos[notas_usuario >= indice_avaliacoes.NOTA_FAVORITO]
+    if contexto.get('pnl') is None or favoritos.size == 0:
+        return vazia
+    parametros = contexto['parametros_pnl']
+    try:
+        return ranqueamento.candidatos_pnl(
+            contexto['pnl'], contexto['catalogo'], favoritos, parametros['vizinhos_por_favorito'],
+            parametros['agregacao'], contexto.get('tabela_pnl'), contexto.get('indice_ann_pnl'), parametros['n_sondas'])
+    except Exception as e:
+        print(f"ERRO ao buscar similares para os filmes favoritos: {e}")
+        return vazia
+
+def recomendar_bloco(contexto, pedidos):
+    """
+    Gera as recomendações de um bloco de pedidos (user_id, tempo_disponivel_min, top_n).
+    Retorna uma lista de DataFrames alinhada com 'pedidos' (DataFrame vazio quando o
+    usuário não tem avaliações ou nenhum filme passa nos filtros).
+    """
+    resultados = [pd.DataFrame() for _ in pedidos]
+    ranqueaveis = contexto['ranqueaveis']
+    tempos_validos = [tempo for _, tempo, _ in pedidos if _tempo_na_faixa(tempo)]
+    if not tempos_validos:
+        return resultados
+
+    # Colunas do bloco: filmes que cabem no maior tempo disponível entre os pedidos
+    colunas = np.flatnonzero(ranqueaveis['duracoes'] <= max(tempos_validos))
+    movie_ids = ranqueaveis['movie_ids'][colunas]
+    linhas = ranqueaveis['linhas'][colunas]
+    duracoes = ranqueaveis['duracoes'][colunas]
+
+    usuarios, linha_do_usuario = np.unique(np.asarray([p[0] for p in pedidos], dtype=np.int64), return_inverse=True)
+    notas_bloco = cf_vetorizado.prever_notas_cf_bloco(contexto['fatores'], usuarios, movie_ids, contexto.get('sobreposicao'))
+
+    listas_b = {} # Pedidos repetidos do mesmo usuário reaproveitam a Lista B
+    for i, (user_id, tempo_disponivel_min, top_n) in enumerate(pedidos):
+        vistos, notas_usuario = indice_avaliacoes.avaliacoes_do_usuario(contexto['indice'], user_id)
+        if vistos.size == 0 or not _tempo_na_faixa(tempo_disponivel_min):
+            continue
+
+        notas_previstas = notas_bloco[linha_do_usuario[i]]
+        aprovados = (duracoes <= tempo_disponivel_min) & ~np.isin(movie_ids, vistos)
+        aprovados &= ranqueamento.nota_na_faixa(notas_previstas)
+        if not aprovados.any():
+            continue
+
+        ids_aprovados, notas_aprovadas = movie_ids[aprovados], notas_previstas[aprovados]
+        if user_id not in listas_b:
+            listas_b[user_id] = _lista_b(contexto, vistos, notas_usuario)
+        similaridades = ranqueamento.similaridades_dos_candidatos(*listas_b[user_id], ids_aprovados)
+        prioridades = fuzzy_modulo.calcular_prioridades_lote(contexto['avaliador'], notas_aprovadas, tempo_disponivel_min)
+        prioridades = np.nan_to_num(prioridades, nan=0.0)
+
+        selecionados = ranqueamento.selecionar_top_n(prioridades, notas_aprovadas, ids_aprovados, top_n, similaridades)
+        resultados[i] = ranqueamento.montar_resultado(
+            contexto['catalogo'], ids_aprovados, linhas[aprovados], prioridades, notas_aprovadas,
+            duracoes[aprovados], selecionados, similaridades)
+
+    return resultados
+
+# --- Memória compartilhada ---
+
+def _publicar_arrays(contexto):
+    """
+    Copia os arrays NumPy do contexto para segmentos de memória compartilhada.
+    Retorna (segmentos, descritores, extras): os descritores (segmento ou arquivo, forma,
+    dtype, offset no arquivo) e os valores pequenos (escalares, buffer de títulos,
+    avaliador fuzzy) vão para os processos.
+    """
+    segmentos = []
+    descritores = {}
+    extras = {}
+    try:
+        for grupo, valores in contexto.items():
+            if not isinstance(valores, dict) or grupo == 'avaliador':
+                extras[grupo] = valores
+                continue
+            for chave, valor in valores.items():
+                if not isinstance(valor, np.ndarray):
+                    extras.setdefault(grupo, {})[chave] = valor
+                    continue
+                if isinstance(valor, np.memmap) and isinstance(valor.base, mmap.mmap):
+                    # Mapeamento original do arquivo (não uma fatia dele): o offset é o do array
+                    descritores.setdefault(grupo, {})[chave] = (valor.filename, valor.shape, valor.dtype.str, valor.offset)
+                    continue
+                segmento = shared_memory.SharedMemory(create=True, size=max(valor.nbytes, 1))
+                segmentos.append(segmento)
+                np.ndarray(valor.shape, dtype=valor.dtype, buffer=segmento.buf)[...] = valor
+                descritores.setdefault(grupo, {})[chave] = (segmento.name, valor.shape, valor.dtype.str, None)
+    except Exception:
+        _liberar_segmentos(segmentos)
+        raise
+    return segmentos, descritores, extras
+
+def _anexar_arrays(descritores, extras):
+    """Remonta o contexto no processo de trabalho a partir da memória compartilhada."""
+    segmentos = []
+    contexto = {grupo: (dict(valores) if isinstance(valores, dict) and grupo != 'avaliador' else valores)
+                for grupo, valores in extras.items()}
+    for grupo, arrays in descritores.items():
+        for chave, (nome, forma, dtype, offset) in arrays.items():
+            if offset is not None:
+                contexto.setdefault(grupo, {})[chave] = np.memmap(nome, dtype=np.dtype(dtype), mode='r', offset=offset, shape=forma)
+                continue
+            segmento = shared_memory.SharedMemory(name=nome)
+            segmentos.append(segmento)
+            contexto.setdefault(grupo, {})[chave] = np.ndarray(forma, dtype=np.dtype(dtype), buffer=segmento.buf)
+    return contexto, segmentos
+
+def _liberar_segmentos(segmentos):
+    for segmento in segmentos:
+        segmento.close()
+        segmento.unlink()
+
+def _inicializar_processo(descritores, extras):
+    global _CONTEXTO_PROCESSO, _SEGMENTOS_PROCESSO
+    _CONTEXTO_PROCESSO, _SEGMENTOS_PROCESSO = _anexar_arrays(descritores, extras)
+
+def _recomendar_bloco_no_processo(pedidos):
+    return recomendar_bloco(_CONTEXTO_PROCESSO, pedidos)
+
+# --- Ponto de entrada ---
+
+def recomendar_em_lote(contexto, pedidos, tamanho_bloco=TAMANHO_BLOCO_PADRAO, n_processos=None):
+    """
+    Gera as recomendações de todos os pedidos (user_id, tempo_disponivel_min, top_n).
+    Os pedidos são ordenados por usuário antes de formar os blocos, para que pedidos
+    repetidos do mesmo usuário reaproveitem a mesma linha da matriz CF.
+    Retorna uma lista de DataFrames na mesma ordem de 'pedidos'.
+    """
+    pedidos = [(int(u), t, int(n)) for u, t, n in pedidos]
+    tamanho_bloco = max(int(tamanho_bloco), 1)
+    ordem = sorted(range(len(pedidos)), key=lambda i: pedidos[i][0])
+    blocos = [ordem[i:i + tamanho_bloco] for i in range(0, len(ordem), tamanho_bloco)]
+    pedidos_por_bloco = [[pedidos[i] for i in bloco] for bloco in blocos]
+
+    if n_processos is None or n_processos <= 1 or len(blocos) <= 1:
+        resultados_por_bloco = [recomendar_bloco(contexto, bloco) for bloco in pedidos_por_bloco]
+    else:
+        segmentos, descritores, extras = _publicar_arrays(contexto)
+        try:
+            with ProcessPoolExecutor(max_workers=n_processos, initializer=_inicializar_processo,
+                                     initargs=(descritores, extras)) as executor:
+                resultados_por_bloco = list(executor.map(_recomendar_bloco_no_processo, pedidos_por_bloco))
+        finally:
+            _liberar_segmentos(segmentos)
+
+    resultados = [None] * len(pedidos)
+    for bloco, resultados_bloco in zip(blocos, resultados_por_bloco):
+        for i, df in zip(bloco, resultados_bloco):
+            resultados[i] = df
+    return resultados
@@ -0,0 +1,249 @@
+import os
+import pickle
+import threading
+import time
+import pandas as pd
+from Codigo_fonte import catalogo
+from Codigo_fonte import cf_vetorizado
+from Codigo_fonte import indice_avaliacoes
+from Codigo_fonte import pnl_vetorizado
+from Codigo_fonte import indice_ann
+from Codigo_fonte import indice_titulos
+from Codigo_fonte import metricas
+
+# Registro preguiçoso dos artefatos do sistema (CSVs, modelos e estruturas derivadas).
+# Cada artefato é carregado apenas no primeiro obter(), uma única vez por processo, e
+# o tempo de carga fica registrado. Assim um processo que só busca títulos não paga o
+# unpickle do modelo CF, e warmup() permite pré-carregar tudo (inclusive em segundo plano).
+# Uma carga que falha (ou devolve None) não fica guardada: depois de INTERVALO_NOVA_TENTATIVA
+# segundos o próximo obter() tenta de novo, então um modelo gerado com o servidor no ar é
+# encontrado sem reiniciá-lo. Antes disso obter() devolve None sem repetir a carga.
+# Já um artefato opcional que simplesmente não existe (o carregador levanta ArtefatoAusente,
+# ex.: treino sem tabela de vizinhos) não é falha: a ausência fica guardada, sem avisos nem
+# novas tentativas, até descartar() dele ou do modelo de que ele depende (ex.: ao recarregar o PNL).
+
+FILMES_CSV = os.path.join("Data", "filmes.csv")
+USUARIOS_CSV = os.path.join("Data", "usuarios.csv")
+CF_MODEL_FILE = os.path.join("Modelos", "modelo_colaborativo.pkl") # Fallback do artefato NumPy abaixo
+CF_ARTEFATO_DIR = os.path.join("Modelos", "cf_modelo") # Fatores do SVD em float32, mapeados em memória
+FUZZY_MODEL_FILE = os.path.join("Modelos", "fuzzy_control_system.pkl")
+PNL_MODEL_FILE = os.path.join("Modelos", "pnl_similarity_model.pkl") # Fallback do artefato .npy abaixo
+PNL_CABECALHO_FILE = os.path.join("Modelos", "pnl_modelo.json") # Artefato float32 mapeado em memória
+PNL_VIZINHOS_FILE = os.path.join("Modelos", "pnl_vizinhos.npy") # Opcional (pnl_modulo.py)
+PNL_SIMILARIDADES_FILE = os.path.join("Modelos", "pnl_vizinhos_similaridades.npy")
+PNL_IVF_FILE = os.path.join("Modelos", "pnl_ivf.npz") # Opcional: índice aproximado (catálogos grandes)
+PNL_TRANSFORMADORES_FILE = os.path.join("Modelos", "pnl_transformadores.pkl") # TF-IDF e SVD (busca por descrição)
+
+INTERVALO_NOVA_TENTATIVA = 30.0 # Segundos até tentar de novo uma carga que falhou
+
+_REGISTRO = {}  # nome -> {'carregador', 'dependencias'}
+_VALORES = {}   # nome -> artefato carregado (só cargas bem-sucedidas)
+_FALHAS = {}    # nome -> time.monotonic() da última carga que falhou
+_AUSENTES = set() # nomes dos artefatos opcionais que não existem (ArtefatoAusente)
+_TEMPOS = {}    # nome -> segundos gastos no carregador (sem contar as dependências)
+_TRAVAS = {}    # nome -> trava do artefato (cargas concorrentes esperam a primeira)
+_TRAVA_REGISTRO = threading.Lock()
+_WARMUP_THREAD = None
+
+# Com RECOMENDA_AI_VERIFICAR_CHECKSUM=1 os checksums dos artefatos PNL e CF são conferidos na carga
+VERIFICAR_CHECKSUM = os.environ.get("RECOMENDA_AI_VERIFICAR_CHECKSUM", "0") == "1"
+
+class ArtefatoAusente(Exception):
+    """Levantada por um carregador quando o artefato (opcional) não foi gerado."""
+
+def registrar(nome, carregador, dependencias=(), pre_carregar=True):
+    """
+    Registra um artefato. 'carregador' recebe os valores das dependências, na ordem
+    informada, e retorna o artefato. Se alguma dependência falhar, o artefato fica None
+    (e é tentado de novo junto com ela, ver INTERVALO_NOVA_TENTATIVA).
+    Com pre_carregar=False o artefato fica fora do warmup() padrão (só carrega sob demanda).
+    """
+    with _TRAVA_REGISTRO:
+        _REGISTRO[nome] = {'carregador': carregador, 'dependencias': tuple(dependencias), 'pre_carregar': pre_carregar}
+        _TRAVAS.setdefault(nome, threading.RLock())
+
+def _falhou_recentemente(nome):
+    falha = _FALHAS.get(nome)
+    return falha is not None and time.monotonic() - falha < INTERVALO_NOVA_TENTATIVA
+
+def obter(nome):
+    """
+    Retorna o artefato, carregando-o (e as suas dependências) no primeiro uso.
+    Retorna None se o artefato está ausente ou se a carga falhou (há menos de
+    INTERVALO_NOVA_TENTATIVA segundos, sem tentar de novo).
+    """
+    if nome in _VALORES:
+        return _VALORES[nome]
+    if nome not in _REGISTRO:
+        raise KeyError(f"Recurso '{nome}' não registrado.")
+    if nome in _AUSENTES or _falhou_recentemente(nome):
+        return None
+
+    with _TRAVAS[nome]:
+        if nome in _VALORES: # Outra thread terminou a carga enquanto esperávamos
+            return _VALORES[nome]
+        if nome in _AUSENTES or _falhou_recentemente(nome): # ... ou acabou de falhar
+            return None
+
+        entrada = _REGISTRO[nome]
+        valores_dependencias = [obter(dependencia) for dependencia in entrada['dependencias']]
+        if any(dependencia in _AUSENTES for dependencia in entrada['dependencias']):
+            _AUSENTES.add(nome) # Depende de um artefato opcional que não existe
+            return None
+        if any(valor is None for valor in valores_dependencias):
+            print(f"AVISO: Recurso '{nome}' indisponível porque uma dependência não foi carregada.")
+            _FALHAS[nome] = time.monotonic()
+            return None
+
+        inicio = time.perf_counter()
+        try:
+            valor = entrada['carregador'](*valores_dependencias)
+        except ArtefatoAusente:
+            _TEMPOS[nome] = time.perf_counter() - inicio
+            _FALHAS.pop(nome, None)
+            _AUSENTES.add(nome)
+            return None
+        except FileNotFoundError as e:
+            print(f"ERRO CRÍTICO ao carregar o recurso '{nome}': {e}")
+            print("Certifique-se de executar 'coleta_api.py', 'machine.py' e 'fuzzy_modulo.py' (nessa ordem) antes.")
+            valor = None
+        except Exception as e:
+            print(f"ERRO INESPERADO ao carregar o recurso '{nome}': {e}")
+            valor = None
+        _TEMPOS[nome] = time.perf_counter() - inicio
+        if valor is None:
+            _FALHAS[nome] = time.monotonic()
+        else:
+            _FALHAS.pop(nome, None)
+            _VALORES[nome] = valor
+        return valor
+
+def carregado(nome):
+    return nome in _VALORES
+
+def substituir(nome, atualizar):
+    """
+    Troca o artefato carregado por atualizar(artefato), sem descartar o que depende dele
+    (atualizações incrementais, como uma avaliação nova). Não faz nada se ele não estiver carregado.
+    """
+    with _TRAVAS[nome]:
+        if nome in _VALORES:
+            _VALORES[nome] = atualizar(_VALORES[nome])
+
+def ausente(nome):
+    """True se o artefato opcional não existe (ver ArtefatoAusente)."""
+    return nome in _AUSENTES
+
+def descartar(nome):
+    """Esquece o artefato (a falha ou a ausência) e tudo que depende dele; o próximo obter() carrega de novo."""
+    with _TRAVAS[nome]:
+        _VALORES.pop(nome, None)
+        _TEMPOS.pop(nome, None)
+        _FALHAS.pop(nome, None)
+        _AUSENTES.discard(nome)
+    for outro, entrada in list(_REGISTRO.items()):
+        if nome in entrada['dependencias'] and (carregado(outro) or outro in _FALHAS or outro in _AUSENTES):
+            descartar(outro)
+
+def tempos_de_carga():
+    """Tempo de carga (segundos) de cada artefato já carregado."""
+    return dict(_TEMPOS)
+
+def warmup(nomes=None, em_segundo_plano=False):
+    """
+    Carrega os artefatos informados (por padrão, todos os registrados com pre_carregar=True).
+    Com em_segundo_plano=True a carga roda em uma thread daemon, que é retornada;
+    chamadas repetidas enquanto ela estiver ativa retornam a mesma thread.
+    Caso contrário, retorna o dicionário de tempos de carga.
+    """
+    global _WARMUP_THREAD
+    nomes = [nome for nome, entrada in _REGISTRO.items() if entrada['pre_carregar']] if nomes is None else list(nomes)
+
+    if em_segundo_plano:
+        with _TRAVA_REGISTRO:
+            if _WARMUP_THREAD is None or not _WARMUP_THREAD.is_alive():
+                _WARMUP_THREAD = threading.Thread(target=warmup, args=(nomes,), name="warmup-recursos", daemon=True)
+                _WARMUP_THREAD.start()
+            return _WARMUP_THREAD
+
+    for nome in nomes:
+        obter(nome)
+    tempos = tempos_de_carga()
+    metricas.info("Tempos de carga dos recursos:")
+    for nome in nomes:
+        if nome in tempos:
+            estado = "ok" if carregado(nome) else ("ausente" if ausente(nome) else "indisponível")
+            metricas.info(f"  {nome:<20} {tempos[nome]:>8.3f}s  {estado}")
+    return tempos
+
+# --- Carregadores ---
+
+def _ler_pickle(caminho):
+    with open(caminho, 'rb') as f:
+        return pickle.load(f)
+
+def _exigir_opcional(*caminhos):
+    # Artefato opcional: sem os arquivos o recurso fica ausente (não é uma falha)
+    for caminho in caminhos:
+        if not os.path.exists(caminho):
+            raise ArtefatoAusente(caminho)
+
+def _carregar_pnl_vetorizado():
+    # Prefere o artefato .npy (mmap); sem ele, normaliza a matriz do pickle
+    pnl = pnl_vetorizado.carregar_artefato_pnl(PNL_CABECALHO_FILE, VERIFICAR_CHECKSUM)
+    if pnl is not None:
+        return pnl
+    pnl_data = obter('modelo_pnl')
+    return pnl_vetorizado.preparar_pnl(pnl_data) if pnl_data is not None else None
+
+def _carregar_fatores_cf():
+    # Prefere o artefato NumPy (mmap, sem surprise); sem ele, extrai os fatores do pickle
+    fatores = cf_vetorizado.carregar_artefato_cf(CF_ARTEFATO_DIR, VERIFICAR_CHECKSUM)
+    if fatores is not None:
+        return fatores
+    modelo_cf = obter('modelo_cf')
+    return cf_vetorizado.extrair_fatores_cf(modelo_cf) if modelo_cf is not None else None
+
+def _carregar_transformadores_pnl(pnl):
+    # TF-IDF e SVD do treino, para projetar textos livres no espaço do PNL (ausente se o treino não os salvou)
+    _exigir_opcional(PNL_TRANSFORMADORES_FILE)
+    transformadores = _ler_pickle(PNL_TRANSFORMADORES_FILE)
+    if transformadores['svd'].components_.shape[0] != pnl['vetores'].shape[1]:
+        print(f"AVISO: '{PNL_TRANSFORMADORES_FILE}' não corresponde ao modelo PNL carregado. Ignorando.")
+        return None
+    return {'tfidf': transformadores['tfidf'], 'svd': transformadores['svd'],
+            'usar_stemmer': transformadores.get('usar_stemmer', False)}
+
+def _compilar_avaliador_fuzzy(sistema_fuzzy):
+    from Codigo_fonte import fuzzy_modulo # skfuzzy só é importado quando o fuzzy é usado
+    try:
+        return fuzzy_modulo.compilar_avaliador_fuzzy(sistema_fuzzy)
+    except ValueError as e: # Sistema que o avaliador não reproduz: não adianta tentar de novo
+        print(f"AVISO: Avaliador fuzzy vetorizado indisponível ({e}). Usando o skfuzzy filme a filme.")
+        raise ArtefatoAusente(str(e))
+
+def _carregar_tabela_vizinhos_pnl(pnl):
+    _exigir_opcional(PNL_VIZINHOS_FILE, PNL_SIMILARIDADES_FILE)
+    return pnl_vetorizado.carregar_tabela_vizinhos(pnl, PNL_VIZINHOS_FILE, PNL_SIMILARIDADES_FILE)
+
+def _carregar_indice_ann_pnl(pnl):
+    _exigir_opcional(PNL_IVF_FILE)
+    return indice_ann.carregar_indice_ivf(pnl, PNL_IVF_FILE)
+
+registrar('filmes_df', lambda: pd.read_csv(FILMES_CSV))
+registrar('filmes_por_id', lambda filmes: filmes.set_index('movieId'), ('filmes_df',))
+registrar('titulos_map', lambda filmes: filmes.set_index('movieId')['titulo'], ('filmes_df',))
+registrar('catalogo', catalogo.construir_catalogo, ('filmes_df',))
+registrar('indice_titulos', indice_titulos.construir_indice_titulos, ('titulos_map',))
+registrar('indice_prefixos', indice_titulos.construir_indice_prefixos, ('titulos_map', 'indice_avaliacoes'))
+registrar('usuarios_df', lambda: pd.read_csv(USUARIOS_CSV))
+registrar('indice_avaliacoes', indice_avaliacoes.construir_indice_avaliacoes, ('usuarios_df',))
+registrar('modelo_cf', lambda: _ler_pickle(CF_MODEL_FILE), pre_carregar=False) # Só usado sem o artefato NumPy
+registrar('fatores_cf', _carregar_fatores_cf)
+registrar('sistema_fuzzy', lambda: _ler_pickle(FUZZY_MODEL_FILE))
+registrar('avaliador_fuzzy', _compilar_avaliador_fuzzy, ('sistema_fuzzy',))
+registrar('modelo_pnl', lambda: _ler_pickle(PNL_MODEL_FILE), pre_carregar=False) # Só usado sem o artefato .npy
+registrar('pnl_vetorizado', _carregar_pnl_vetorizado)
+registrar('tabela_vizinhos_pnl', _carregar_tabela_vizinhos_pnl, ('pnl_vetorizado',))
+registrar('indice_ann_pnl', _carregar_indice_ann_pnl, ('pnl_vetorizado',))
+registrar('transformadores_pnl', _carregar_transformadores_pnl, ('pnl_vetorizado',))
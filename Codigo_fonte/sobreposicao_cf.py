@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+import numpy as np
+from Codigo_fonte import cf_vetorizado
+
+# Sobreposição de fatores do modelo CF: pu e bu de usuários novos ou com avaliações novas,
+# calculados por cf_vetorizado.dobrar_usuario logo depois que as avaliações são salvas.
+# As previsões de cf_vetorizado consultam a sobreposição antes dos fatores do treino, então
+# o usuário recebe recomendações personalizadas sem esperar o próximo 'machine.py'.
+# Em disco ficam um retrato (SOBREPOSICAO_FILE, .npz) e um log só de acréscimos
+# (SOBREPOSICAO_LOG): cada dobra acrescenta um registro ao log, sem reescrever o retrato, e
+# quando o log passa de LIMITE_BYTES_LOG ele é compactado em um retrato novo. machine.py
+# apaga os dois ao treinar um modelo novo, que já inclui essas avaliações.
+# Outro processo (como o menu do terminal) pode dobrar usuários: o disco é conferido no máximo
+# a cada INTERVALO_VERIFICACAO segundos; registros novos do log são lidos a partir de onde a
+# última leitura parou e um retrato trocado é relido inteiro. Uma dobra gravada por outro
+# processo bem durante uma compactação pode se perder do disco (as avaliações continuam no
+# usuarios.csv e voltam na próxima dobra do usuário ou no próximo treino).
+# Como o cache_recomendacoes, não carrega nenhum modelo: quem chama passa os fatores já carregados.
+
+SOBREPOSICAO_FILE = os.path.join("Modelos", "cf_sobreposicao.npz")
+SOBREPOSICAO_LOG = os.path.join("Modelos", "cf_sobreposicao.log")
+LIMITE_BYTES_LOG = 1 << 20 # ~1300 dobras com 100 fatores entre compactações
+INTERVALO_VERIFICACAO = 1.0 # Segundos entre conferências do disco (mudanças de outros processos)
+
+_FATORES = None   # user_id -> (pu, bu); None até a primeira leitura do disco
+_VERSAO_ARQUIVO = None # (mtime_ns, tamanho) do retrato lido/gravado por último; None se ele não existia
+_POSICAO_LOG = None # (inode, bytes já aplicados) do log; None se ainda não foi lido
+_PROXIMA_VERIFICACAO = 0.0 # time.monotonic() a partir do qual o disco é conferido de novo
+_INSTANTANEO = None # Arrays ordenados por user_id, montados sob demanda (ver instantaneo())
+_TRAVA = threading.Lock() # O Streamlit atende cada sessão em uma thread
+
+# Registro do log: cabeçalho int64 [user_id, k] e, se k >= 0, k + 1 float64 [bu, pu...];
+# k = -1 marca a remoção do usuário.
+_CABECALHO_REGISTRO = 16
+
+def _versao_do_arquivo():
+    try:
+        estado = os.stat(SOBREPOSICAO_FILE)
+    except FileNotFoundError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size)
+
+def _registro(user_id, pu=None, bu=0.0):
+    if pu is None:
+        return np.array([user_id, -1], dtype='<i8').tobytes()
+    valores = np.concatenate([[bu], pu]).astype('<f8')
+    return np.array([user_id, pu.size], dtype='<i8').tobytes() + valores.tobytes()
+
+def _aplicar_registros(dados):
+    # Aplica os registros completos de 'dados' em _FATORES; retorna os bytes consumidos.
+    # Um registro incompleto no fim (gravação em andamento ou interrompida) fica para depois.
+    posicao = 0
+    while posicao + _CABECALHO_REGISTRO <= len(dados):
+        user_id, k = np.frombuffer(dados, dtype='<i8', count=2, offset=posicao).tolist()
+        tamanho = _CABECALHO_REGISTRO + 8 * (k + 1 if k >= 0 else 0)
+        if posicao + tamanho > len(dados):
+            break
+        if k < 0:
+            _FATORES.pop(user_id, None)
+        else:
+            valores = np.frombuffer(dados, dtype='<f8', count=k + 1, offset=posicao + _CABECALHO_REGISTRO)
+            _FATORES[user_id] = (valores[1:].copy(), float(valores[0]))
+        posicao += tamanho
+    return posicao
+
+def _ler_log():
+    # Chamada com _TRAVA adquirida. Aplica o que o log ganhou desde a última leitura (tudo, se
+    # ele ainda não tinha sido lido). Reaplicar os próprios registros não muda nada: o último
+    # registro de cada usuário prevalece. Retorna False, sem aplicar nada, se o log lido antes
+    # sumiu ou foi trocado (limpar() ou compactação em outro processo): é preciso reler tudo.
+    global _POSICAO_LOG, _INSTANTANEO
+    try:
+        with open(SOBREPOSICAO_LOG, 'rb') as f:
+            estado = os.fstat(f.fileno())
+            posicao = 0
+            if _POSICAO_LOG is not None:
+                if _POSICAO_LOG[0] != estado.st_ino or _POSICAO_LOG[1] > estado.st_size:
+                    return False
+                posicao = _POSICAO_LOG[1]
+            f.seek(posicao)
+            dados = f.read()
+    except FileNotFoundError:
+        return _POSICAO_LOG is None
+    consumidos = _aplicar_registros(dados)
+    _POSICAO_LOG = (estado.st_ino, posicao + consumidos)
+    if consumidos:
+        _INSTANTANEO = None
+    return True
+
+def _recarregar(versao):
+    # Chamada com _TRAVA adquirida: retrato inteiro e, por cima, o log inteiro
+    global _FATORES, _INSTANTANEO, _VERSAO_ARQUIVO, _POSICAO_LOG
+    _FATORES, _INSTANTANEO, _VERSAO_ARQUIVO, _POSICAO_LOG = {}, None, versao, None
+    if versao is not None:
+        try:
+            with np.load(SOBREPOSICAO_FILE) as dados:
+                for user_id, pu, bu in zip(dados['user_ids'].tolist(), dados['pu'], dados['bu'].tolist()):
+                    _FATORES[user_id] = (pu, bu)
+        except Exception as e:
+            print(f"AVISO: Não foi possível ler '{SOBREPOSICAO_FILE}' ({e}). Começando com a sobreposição vazia.")
+    _ler_log()
+
+def _garantir_carregada():
+    # Chamada com _TRAVA adquirida. Lê o disco na primeira vez e, depois, confere se ele
+    # mudou no máximo a cada INTERVALO_VERIFICACAO segundos.
+    global _PROXIMA_VERIFICACAO
+    agora = time.monotonic()
+    if _FATORES is not None and agora < _PROXIMA_VERIFICACAO:
+        return
+    _PROXIMA_VERIFICACAO = agora + INTERVALO_VERIFICACAO
+    versao = _versao_do_arquivo()
+    if _FATORES is None or versao != _VERSAO_ARQUIVO or not _ler_log():
+        _recarregar(versao)
+
+def _acrescentar(registro):
+    # Chamada com _TRAVA adquirida. Uma única write() em modo append: registros de processos
+    # diferentes não se misturam. Compacta o log quando ele passa do limite.
+    os.makedirs(os.path.dirname(SOBREPOSICAO_LOG) or ".", exist_ok=True)
+    descritor = os.open(SOBREPOSICAO_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        os.write(descritor, registro)
+        tamanho_log = os.fstat(descritor).st_size
+    finally:
+        os.close(descritor)
+    if tamanho_log > LIMITE_BYTES_LOG:
+        _compactar()
+
+def _compactar():
+    # Chamada com _TRAVA adquirida: lê o que falta do log, grava o retrato completo (temporário
+    # e troca, para não deixar o arquivo pela metade) e só então apaga o log
+    global _VERSAO_ARQUIVO, _POSICAO_LOG
+    if not _ler_log(): # Outro processo limpou ou compactou: o estado em memória está velho
+        return
+    user_ids = np.array(sorted(_FATORES), dtype=np.int64)
+    if user_ids.size == 0:
+        if os.path.exists(SOBREPOSICAO_FILE):
+            os.remove(SOBREPOSICAO_FILE)
+    else:
+        temporario = SOBREPOSICAO_FILE + ".tmp.npz"
+        np.savez(temporario, user_ids=user_ids,
+                 pu=np.stack([_FATORES[u][0] for u in user_ids.tolist()]),
+                 bu=np.array([_FATORES[u][1] for u in user_ids.tolist()], dtype=np.float64))
+        os.replace(temporario, SOBREPOSICAO_FILE)
+    if os.path.exists(SOBREPOSICAO_LOG):
+        os.remove(SOBREPOSICAO_LOG)
+    _VERSAO_ARQUIVO, _POSICAO_LOG = _versao_do_arquivo(), None
+
+def atualizar_usuario(fatores, user_id, movie_ids, notas):
+    """
+    Dobra o usuário no modelo CF (fatores de recursos.obter('fatores_cf')) a partir de todas
+    as suas avaliações e guarda o resultado na sobreposição. Sem nenhum filme conhecido pelo
+    modelo, o usuário sai da sobreposição (as previsões voltam ao fallback do treino).
+    Retorna True se o usuário ficou com fatores na sobreposição.
+    """
+    global _INSTANTANEO
+    dobrado = cf_vetorizado.dobrar_usuario(fatores, movie_ids, notas) if len(movie_ids) else None
+    with _TRAVA:
+        _garantir_carregada()
+        if dobrado is None and int(user_id) not in _FATORES:
+            return False
+        if dobrado is None:
+            del _FATORES[int(user_id)]
+            _acrescentar(_registro(int(user_id)))
+        else:
+            _FATORES[int(user_id)] = (np.asarray(dobrado[0], dtype=np.float64), float(dobrado[1]))
+            _acrescentar(_registro(int(user_id), *_FATORES[int(user_id)]))
+        _INSTANTANEO = None
+    return dobrado is not None
+
+def remover_usuario(user_id):
+    """Tira o usuário da sobreposição (por exemplo, um userId reaproveitado por um cadastro novo)."""
+    global _INSTANTANEO
+    with _TRAVA:
+        _garantir_carregada()
+        if _FATORES.pop(int(user_id), None) is not None:
+            _INSTANTANEO = None
+            _acrescentar(_registro(int(user_id)))
+
+def instantaneo():
+    """
+    Sobreposição atual como arrays {'user_ids' (ordenados), 'pu', 'bu'}, no formato que
+    cf_vetorizado.prever_notas_cf e prever_notas_cf_bloco recebem. None se estiver vazia.
+    O mesmo dicionário é reaproveitado até a próxima alteração.
+    """
+    global _INSTANTANEO
+    with _TRAVA:
+        _garantir_carregada()
+        if _INSTANTANEO is None and _FATORES:
+            user_ids = np.array(sorted(_FATORES), dtype=np.int64)
+            _INSTANTANEO = {
+                'user_ids': user_ids,
+                'pu': np.stack([_FATORES[u][0] for u in user_ids.tolist()]),
+                'bu': np.array([_FATORES[u][1] for u in user_ids.tolist()], dtype=np.float64),
+            }
+        return _INSTANTANEO
+
+def limpar():
+    """Esvazia a sobreposição e apaga o retrato e o log (chamada por machine.py depois de treinar)."""
+    global _FATORES, _INSTANTANEO, _VERSAO_ARQUIVO, _POSICAO_LOG, _PROXIMA_VERIFICACAO
+    with _TRAVA:
+        _FATORES, _INSTANTANEO, _VERSAO_ARQUIVO, _POSICAO_LOG = {}, None, None, None
+        _PROXIMA_VERIFICACAO = 0.0
+        for caminho in (SOBREPOSICAO_FILE, SOBREPOSICAO_LOG):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+def tamanho():
+    with _TRAVA:
+        _garantir_carregada()
+        return len(_FATORES)
@@ -22,7 +22,10 @@ import auth_simple # O auth simples com senha em texto puro
 try:
     from Codigo_fonte import recomendar 
     from Codigo_fonte import busca_filme 
+    from Codigo_fonte import recursos
     print("Módulos 'recomendar' e 'busca_filme' importados com sucesso.")
+    # Modelos e dados carregam em segundo plano enquanto a tela de login é exibida
+    recursos.warmup(em_segundo_plano=True)
 except ImportError as e:
     st.error(f"Erro de Importação: {e}")
     st.error("Verifique se 'app.py' está na pasta raiz e 'recomendar.py' está em 'Codigo_fonte'.")
@@ -67,7 +70,7 @@ if st.session_state.username is None:
                     st.session_state.username = username # Salva o NOME do usuário
                     
                     welcome_message = (f"Olá {username.capitalize()}! "
-                                     "Você pode dizer **'recomendar'** para eu te ajudar a encontrar filmes ou **'buscar'** para procurar um título específico.")
+                                     "Você pode dizer **'recomendar'** para eu te ajudar a encontrar filmes ou **'buscar'** para procurar um título específico, ou **'descrever'** para me contar que tipo de filme você quer.")
 
                     st.session_state.messages = [{"role": "assistant", "content": welcome_message}]
                     st.session_state.chat_state = "IDLE"
@@ -99,7 +102,7 @@ if st.session_state.username is None:
                         st.session_state.username = new_username # Salva o NOME
                         st.session_state.messages = [{"role": "assistant", "content": (
                             f"Bem-vindo, {new_username.capitalize()}! "
-                            "Você pode dizer **'recomendar'** para eu te ajudar a encontrar filmes ou **'buscar'** para procurar um título específico.")}]
+                            "Você pode dizer **'recomendar'** para eu te ajudar a encontrar filmes ou **'buscar'** para procurar um título específico, ou **'descrever'** para me contar que tipo de filme você quer.")}]
                         st.session_state.chat_state = "IDLE"
                         st.session_state.temp_data = {}
                         time.sleep(2)
@@ -124,7 +127,7 @@ else:
             st.markdown(message["content"])
 
     # Input do chat
-    if prompt := st.chat_input("Diga 'recomendar' ou 'buscar'..."):
+    if prompt := st.chat_input("Diga 'recomendar', 'buscar' ou 'descrever'..."):
         st.session_state.messages.append({"role": "user", "content": prompt})
         
         state = st.session_state.chat_state
@@ -141,9 +144,14 @@ else:
                     st.session_state.chat_state = "AWAITING_SEARCH_TITLE"
                     bot_response = "Claro. Qual o nome do filme que você quer buscar?"
                     st.session_state.messages.append({"role": "assistant", "content": bot_response})
+
+                elif "descrever" in prompt.lower():
+                    st.session_state.chat_state = "AWAITING_DESCRIPTION"
+                    bot_response = "Me conte: que tipo de filme você quer ver? (ex: 'uma comédia sobre viagem no tempo')"
+                    st.session_state.messages.append({"role": "assistant", "content": bot_response})
                 
                 else:
-                    bot_response = "Desculpe, não entendi. Você pode dizer **'recomendar'** ou **'buscar'**."
+                    bot_response = "Desculpe, não entendi. Você pode dizer **'recomendar'**, **'buscar'** ou **'descrever'**."
                     st.session_state.messages.append({"role": "assistant", "content": bot_response})
 
             # --- ESTADO 2: ESPERANDO O TEMPO ---
@@ -207,12 +215,30 @@ else:
                 st.session_state.chat_state = "IDLE"
                 st.session_state.temp_data = {}
 
+            # --- ESTADO 5: ESPERANDO A DESCRIÇÃO (E EXECUTANDO) ---
+            elif state == "AWAITING_DESCRIPTION":
+                descricao = prompt.strip()
+
+                with st.spinner("Procurando filmes parecidos com a sua descrição..."):
+                    similares_ids = busca_filme.recomendar_por_descricao(descricao, top_n=5)
+
+                if similares_ids:
+                    bot_response = "Estes filmes combinam com o que você descreveu:\n"
+                    for sim_id in similares_ids:
+                        bot_response += f"\n- {busca_filme.TITULOS_MAP.get(sim_id, f'ID {sim_id}')}"
+                    st.session_state.messages.append({"role": "assistant", "content": bot_response})
+                else:
+                    st.session_state.messages.append({"role": "assistant", "content": "Não encontrei filmes para essa descrição. Tente com outras palavras."})
+
+                st.session_state.chat_state = "IDLE"
+                st.session_state.temp_data = {}
+
         except ValueError:
             st.session_state.messages.append({"role": "assistant", "content": "Por favor, digite um número válido (ex: 120, 5)."})
         except Exception as e:
             print(f"ERRO NO CHAT: {e}")
             st.session_state.chat_state = "IDLE"
             st.session_state.temp_data = {}
-            st.session_state.messages.append({"role": "assistant", "content": "Ops, algo deu errado. Vamos tentar de novo. Diga 'recomendar' ou 'buscar'."})
+            st.session_state.messages.append({"role": "assistant", "content": "Ops, algo deu errado. Vamos tentar de novo. Diga 'recomendar', 'buscar' ou 'descrever'."})
 
         st.rerun()
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pandas as pd
 import os
+from Codigo_fonte import cache_recomendacoes
+from Codigo_fonte import sobreposicao_cf
 
 def _load_credentials_db(auth_csv_path):
     """Carrega o banco de dados de credenciais ou cria um novo."""
@@ -92,6 +94,11 @@ def register_user(username, password, auth_csv_path, ratings_csv_path):
         # Salva (append) no user_credentials.csv
         new_user_df.to_csv(auth_csv_path, mode='a', header=not os.path.exists(auth_csv_path) or os.path.getsize(auth_csv_path) == 0, index=False)
         
+        # Descarta recomendações e fatores CF dobrados antigos que possam existir para este userId;
+        # os fatores do novo usuário são dobrados a partir das avaliações, assim que ele avaliar filmes
+        cache_recomendacoes.invalidar_usuario(new_user_id)
+        sobreposicao_cf.remover_usuario(new_user_id)
+        
         print(f"Usuário {username} (ID: {new_user_id}) registrado com sucesso.")
         return new_user_id # Sucesso
         
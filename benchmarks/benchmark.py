@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+import numpy as np
+
+# Benchmark do Recomenda.ai.
+#   python benchmarks/benchmark.py executar --escala pequena
+#   python benchmarks/benchmark.py comparar resultado_antes.json resultado_depois.json
+#
+# 'executar' gera (uma única vez) os dados sintéticos da escala em benchmarks/dados/<escala>,
+# e mede em um processo separado, para que o pico de RSS reflita apenas a carga e o uso dos
+# modelos: tempo de importação, tempo de carga de cada recurso, latência p50/p95/p99 e vazão de
+# gerar_recomendacoes_hibridas, recomendar_por_similaridade, recomendar_por_descricao e
+# encontrar_movieid_por_titulo.
+# O resultado é salvo em JSON em benchmarks/resultados/.
+
+diretorio_benchmarks = os.path.dirname(os.path.abspath(__file__))
+diretorio_projeto = os.path.abspath(os.path.join(diretorio_benchmarks, ".."))
+if diretorio_projeto not in sys.path:
+    sys.path.insert(0, diretorio_projeto)
+
+DIRETORIO_DADOS = os.path.join(diretorio_benchmarks, "dados")
+DIRETORIO_RESULTADOS = os.path.join(diretorio_benchmarks, "resultados")
+PERCENTIS = (50, 95, 99)
+
+def _estatisticas(latencias):
+    """Resumo das latências (segundos) de uma operação."""
+    latencias = np.asarray(latencias, dtype=np.float64)
+    resumo = {
+        'consultas': int(latencias.size),
+        'media_ms': float(latencias.mean() * 1000),
+        'min_ms': float(latencias.min() * 1000),
+        'max_ms': float(latencias.max() * 1000),
+        'vazao_por_segundo': float(latencias.size / latencias.sum()) if latencias.sum() > 0 else None,
+    }
+    for p in PERCENTIS:
+        resumo[f'p{p}_ms'] = float(np.percentile(latencias, p) * 1000)
+    return resumo
+
+def _medir(funcao, argumentos, aquecimento=2, antes=None):
+    """Chama funcao(*args) para cada item de 'argumentos' e retorna as latências (s)."""
+    for args in argumentos[:aquecimento]:
+        if antes:
+            antes()
+        funcao(*args)
+    latencias = []
+    for args in argumentos:
+        if antes:
+            antes()
+        inicio = time.perf_counter()
+        funcao(*args)
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+def _rss_pico_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # ru_maxrss em KB no Linux
+
+def medir(diretorio_dados, consultas, semente=0):
+    """
+    Mede o sistema com os dados de 'diretorio_dados' (deve conter Data/ e Modelos/).
+    Roda no processo atual; use executar() para isolar o pico de RSS.
+    """
+    os.chdir(diretorio_dados) # Os módulos usam caminhos relativos (Data/, Modelos/)
+    rng = np.random.default_rng(semente)
+
+    inicio = time.perf_counter()
+    from Codigo_fonte import recomendar, busca_filme, recursos, cache_recomendacoes, indice_avaliacoes
+    tempo_importacao = time.perf_counter() - inicio
+    rss_apos_importacao = _rss_pico_mb()
+
+    inicio = time.perf_counter()
+    tempos_recursos = recursos.warmup()
+    tempo_carga = time.perf_counter() - inicio
+    rss_apos_carga = _rss_pico_mb()
+
+    usuarios = indice_avaliacoes.usuarios_disponiveis(recursos.obter('indice_avaliacoes'))
+    filmes = recursos.obter('catalogo')['movie_ids']
+    titulos = recursos.obter('titulos_map')
+
+    pedidos = [(int(u), int(t), 10) for u, t in zip(rng.choice(usuarios, consultas['recomendacao']),
+                                                   rng.integers(60, 181, consultas['recomendacao']))]
+    sementes = [(int(m), 10) for m in rng.choice(filmes, consultas['similaridade'])]
+    buscas = []
+    for titulo in titulos.iloc[rng.integers(0, len(titulos), consultas['titulo'])].tolist():
+        posicao = int(rng.integers(0, len(titulo)))
+        buscas.append((titulo[:posicao] + titulo[posicao + 1:], 5)) # Consulta com um erro de digitação
+
+    # Descrições com palavras das sinopses sintéticas; o cache de descrições é limpo antes de cada
+    # chamada para medir limpeza, TF-IDF, SVD e busca
+    from benchmarks.dados_sinteticos import PALAVRAS_SINOPSE
+    descricoes = [(" ".join(rng.choice(PALAVRAS_SINOPSE, 6).tolist()), 10) for _ in range(consultas.get('descricao', 0))]
+
+    operacoes = {
+        # O cache é limpo antes de cada chamada para medir o pipeline completo
+        'gerar_recomendacoes_hibridas': _estatisticas(_medir(recomendar.gerar_recomendacoes_hibridas, pedidos,
+                                                             antes=cache_recomendacoes.limpar)),
+        'recomendar_por_similaridade': _estatisticas(_medir(busca_filme.recomendar_por_similaridade, sementes)),
+        'encontrar_movieid_por_titulo': _estatisticas(_medir(busca_filme.encontrar_movieid_por_titulo, buscas)),
+    }
+    if descricoes:
+        operacoes['recomendar_por_descricao'] = _estatisticas(_medir(busca_filme.recomendar_por_descricao, descricoes,
+                                                                     antes=busca_filme.limpar_cache_descricoes))
+
+    return {
+        'dados': {
+            'filmes': int(filmes.size),
+            'usuarios': int(usuarios.size),
+            'avaliacoes': int(recursos.obter('indice_avaliacoes')['movie_ids'].size),
+        },
+        'carga': {
+            'importacao_s': tempo_importacao,
+            'warmup_s': tempo_carga,
+            'recursos_s': tempos_recursos,
+        },
+        'operacoes': operacoes,
+        'memoria': {
+            'rss_pico_apos_importacao_mb': rss_apos_importacao,
+            'rss_pico_apos_carga_mb': rss_apos_carga,
+            'rss_pico_mb': _rss_pico_mb(),
+        },
+    }
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=diretorio_projeto,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def executar(escala, consultas, tamanho=None, saida=None, regenerar=False, vizinhos_pnl=0):
+    """Gera os dados (se preciso), mede em um subprocesso e salva o JSON. Retorna o caminho do JSON."""
+    from benchmarks import dados_sinteticos
+
+    tamanho = tamanho or dados_sinteticos.ESCALAS[escala]
+    nome = f"{escala}-{tamanho['filmes']}f-{tamanho['avaliacoes']}a" + (f"-k{vizinhos_pnl}" if vizinhos_pnl else "")
+    diretorio_dados = os.path.join(DIRETORIO_DADOS, nome)
+    if regenerar or not os.path.exists(os.path.join(diretorio_dados, "Modelos", "fuzzy_control_system.pkl")):
+        inicio = time.perf_counter()
+        dados_sinteticos.gerar_diretorio(diretorio_dados, vizinhos_pnl=vizinhos_pnl, **tamanho)
+        print(f"Dados sintéticos gerados em {time.perf_counter() - inicio:.1f}s.")
+
+    comando = [sys.executable, os.path.abspath(__file__), "medir", diretorio_dados, "--consultas", json.dumps(consultas)]
+    processo = subprocess.run(comando, capture_output=True, text=True)
+    if processo.returncode != 0:
+        print(processo.stdout)
+        print(processo.stderr)
+        raise RuntimeError("A medição falhou.")
+    medicao = json.loads(processo.stdout.strip().splitlines()[-1])
+
+    resultado = {
+        'escala': escala,
+        'tamanho_solicitado': tamanho,
+        'vizinhos_pnl': vizinhos_pnl,
+        'consultas': consultas,
+        'data': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        **medicao,
+    }
+
+    os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+    saida = saida or os.path.join(DIRETORIO_RESULTADOS, f"{nome}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    return saida
+
+def comparar(caminho_antes, caminho_depois):
+    """Imprime, operação a operação, a variação de p50/p95/p99 e da vazão entre dois resultados."""
+    with open(caminho_antes, encoding='utf-8') as f:
+        antes = json.load(f)
+    with open(caminho_depois, encoding='utf-8') as f:
+        depois = json.load(f)
+
+    print(f"Antes : {antes.get('commit')} ({antes.get('data')})")
+    print(f"Depois: {depois.get('commit')} ({depois.get('data')})")
+    for operacao, resumo_depois in depois['operacoes'].items():
+        resumo_antes = antes['operacoes'].get(operacao)
+        if resumo_antes is None:
+            continue
+        print(f"\n{operacao}")
+        for chave in [f'p{p}_ms' for p in PERCENTIS] + ['vazao_por_segundo']:
+            a, d = resumo_antes[chave], resumo_depois[chave]
+            variacao = f"{d / a:6.2f}x" if a else "   n/a"
+            print(f"  {chave:<20} {a:>12.3f} -> {d:>12.3f}  {variacao}")
+    print(f"\nrss_pico_mb          {antes['memoria']['rss_pico_mb']:>12.1f} -> {depois['memoria']['rss_pico_mb']:>12.1f}")
+    print(f"warmup_s             {antes['carga']['warmup_s']:>12.3f} -> {depois['carga']['warmup_s']:>12.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do Recomenda.ai com dados sintéticos.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_executar = sub.add_parser("executar", help="Gera os dados (se preciso), mede e salva o JSON")
+    p_executar.add_argument("--escala", choices=["pequena", "media", "grande"], default="pequena")
+    p_executar.add_argument("--filmes", type=int)
+    p_executar.add_argument("--usuarios", type=int)
+    p_executar.add_argument("--avaliacoes", type=int)
+    p_executar.add_argument("--consultas-recomendacao", type=int, default=50)
+    p_executar.add_argument("--consultas-similaridade", type=int, default=200)
+    p_executar.add_argument("--consultas-titulo", type=int, default=20)
+    p_executar.add_argument("--consultas-descricao", type=int, default=200)
+    p_executar.add_argument("--regenerar", action="store_true", help="Gera os dados sintéticos novamente")
+    p_executar.add_argument("--vizinhos-pnl", type=int, default=0, help="Usa a tabela de vizinhos PNL pré-calculada (K)")
+    p_executar.add_argument("--saida", help="Caminho do JSON de resultado")
+
+    p_medir = sub.add_parser("medir", help="(interno) Mede um diretório de dados e imprime o JSON")
+    p_medir.add_argument("diretorio")
+    p_medir.add_argument("--consultas", required=True)
+
+    p_comparar = sub.add_parser("comparar", help="Compara dois JSONs de resultado")
+    p_comparar.add_argument("antes")
+    p_comparar.add_argument("depois")
+
+    args = parser.parse_args()
+
+    if args.comando == "executar":
+        from benchmarks import dados_sinteticos
+        tamanho = dict(dados_sinteticos.ESCALAS[args.escala])
+        for chave in ('filmes', 'usuarios', 'avaliacoes'):
+            if getattr(args, chave):
+                tamanho[chave] = getattr(args, chave)
+        consultas = {
+            'recomendacao': args.consultas_recomendacao,
+            'similaridade': args.consultas_similaridade,
+            'titulo': args.consultas_titulo,
+            'descricao': args.consultas_descricao,
+        }
+        caminho = executar(args.escala, consultas, tamanho=tamanho, saida=args.saida, regenerar=args.regenerar,
+                           vizinhos_pnl=args.vizinhos_pnl)
+        print(f"Resultado salvo em '{caminho}'.")
+    elif args.comando == "medir":
+        medicao = medir(args.diretorio, json.loads(args.consultas))
+        print(json.dumps(medicao))
+    elif args.comando == "comparar":
+        comparar(args.antes, args.depois)
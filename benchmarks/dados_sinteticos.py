@@ -0,0 +1,207 @@
+import os
+import sys
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+
+# Gerador de dados sintéticos para o benchmark.
+# Cria, em um diretório próprio, a mesma estrutura que o sistema espera (Data/filmes.csv,
+# Data/usuarios.csv e os artefatos em Modelos/), em escalas configuráveis e sem acesso à
+# rede. Os modelos não são treinados: o SVD recebe fatores aleatórios e a matriz latente
+# do PNL é formada por grupos de filmes parecidos, o que basta para medir o custo de servir
+# as recomendações (o tamanho e o formato dos artefatos são os mesmos dos modelos reais).
+
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if diretorio_projeto not in sys.path:
+    sys.path.insert(0, diretorio_projeto)
+from Codigo_fonte import pnl_vetorizado
+
+ESCALAS = {
+    'pequena': {'filmes': 10_000, 'usuarios': 1_000, 'avaliacoes': 100_000},
+    'media': {'filmes': 100_000, 'usuarios': 20_000, 'avaliacoes': 2_500_000},
+    'grande': {'filmes': 1_000_000, 'usuarios': 160_000, 'avaliacoes': 25_000_000},
+}
+
+PALAVRAS_TITULO = [
+    "Toy", "Story", "Matrix", "Alien", "Heat", "Casino", "Rocky", "Fargo", "Titanic", "Batman",
+    "Sabrina", "Apollo", "Braveheart", "Seven", "Jumanji", "Noite", "Cidade", "Amor", "Guerra",
+    "Estrela", "Sombra", "Rio", "Mar", "Fogo", "Gelo", "Sonho", "Tempo", "Caminho", "Lenda", "Reino",
+]
+PALAVRAS_SINOPSE = [
+    "amor", "guerra", "viagem", "rei", "magia", "detetive", "futebol", "floresta", "vampiro", "musica",
+    "ilha", "carro", "deserto", "cachorro", "alien", "espaco", "fantasma", "danca", "assassinato",
+    "heroi", "tempo", "robo", "montanha", "corrida", "passado", "familia", "segredo", "vinganca",
+    "escola", "cidade", "natal", "mar", "dragao", "policia", "tesouro", "cientista", "planeta",
+]
+GENEROS = ["Ação", "Aventura", "Animação", "Comédia", "Crime", "Documentário", "Drama", "Família",
+           "Fantasia", "Terror", "Romance", "Ficção científica", "Suspense", "Guerra", "Faroeste"]
+
+DIMENSOES_PNL = 100
+FATORES_CF = 100
+AMOSTRA_TRANSFORMADORES = 20_000 # Filmes usados para ajustar o TF-IDF/SVD da busca por descrição
+
+def _juntar_palavras(rng, vocabulario, n_linhas, n_palavras, separador=" "):
+    """Sorteia n_palavras do vocabulário por linha e junta cada linha em uma string."""
+    vocabulario = np.asarray(vocabulario, dtype=object)
+    sorteio = vocabulario[rng.integers(0, len(vocabulario), size=(n_linhas, n_palavras))]
+    return [separador.join(linha) for linha in sorteio.tolist()]
+
+def gerar_filmes(rng, n_filmes):
+    """DataFrame com as colunas de Data/filmes.csv. Os movieIds são esparsos, como no MovieLens."""
+    movie_ids = np.sort(rng.choice(np.arange(1, 3 * n_filmes + 1), size=n_filmes, replace=False))
+    titulos = [f"{a} {b}" for a, b in zip(_juntar_palavras(rng, PALAVRAS_TITULO, n_filmes, 2),
+                                          rng.integers(1, 1000, size=n_filmes).tolist())]
+    duracoes = np.clip(rng.normal(110, 30, size=n_filmes), 40, 240).round()
+    duracoes[rng.random(n_filmes) < 0.01] = np.nan # ~1% sem duração, como nos dados coletados
+    return pd.DataFrame({
+        'movieId': movie_ids,
+        'titulo': titulos,
+        'sinopse': [s.capitalize() + "." for s in _juntar_palavras(rng, PALAVRAS_SINOPSE, n_filmes, 20)],
+        'generos': _juntar_palavras(rng, GENEROS, n_filmes, 2, separador="|"),
+        'duracao': duracoes,
+        'diretor': [f"Pessoa {i}" for i in rng.integers(1, 500, size=n_filmes).tolist()],
+        'atores': _juntar_palavras(rng, [f"Pessoa {i}" for i in range(1, 500)], n_filmes, 5, separador="|"),
+        'tmdbId': rng.integers(1, 10 * n_filmes, size=n_filmes).astype(float),
+    })
+
+def gerar_avaliacoes(rng, movie_ids, n_usuarios, n_avaliacoes):
+    """
+    DataFrame com as colunas de Data/usuarios.csv. A popularidade dos filmes e a atividade
+    dos usuários seguem distribuições de cauda longa; pares (usuário, filme) repetidos são
+    removidos, então o total pode ficar um pouco abaixo de n_avaliacoes.
+    """
+    atividade = rng.pareto(1.2, size=n_usuarios) + 1
+    atividade = np.maximum(np.round(atividade / atividade.sum() * n_avaliacoes), 20).astype(np.int64)
+    user_ids = np.repeat(np.arange(1, n_usuarios + 1, dtype=np.int64), atividade)[:n_avaliacoes]
+
+    popularidade = 1.0 / np.arange(1, movie_ids.size + 1) ** 0.8
+    popularidade = rng.permutation(popularidade / popularidade.sum())
+    filmes = rng.choice(movie_ids, size=user_ids.size, p=popularidade)
+
+    chaves = np.unique(user_ids * (int(movie_ids.max()) + 1) + filmes)
+    user_ids, filmes = np.divmod(chaves, int(movie_ids.max()) + 1)
+    notas = rng.choice(np.arange(0.5, 5.01, 0.5), size=user_ids.size,
+                       p=[.01, .03, .02, .07, .05, .2, .13, .27, .08, .14])
+    return pd.DataFrame({
+        'userId': user_ids,
+        'movieId': filmes,
+        'rating': notas,
+        'timestamp': rng.integers(946684800, 1700000000, size=user_ids.size),
+    })
+
+def gerar_modelo_cf(rng, avaliacoes, n_fatores=FATORES_CF):
+    """
+    SVD (surprise) com fatores aleatórios e um Trainset com os mapas de ids e a média global.
+    As listas de avaliações do Trainset ficam vazias (predict() funciona; novo fit() não).
+    """
+    from surprise import SVD
+    from surprise.trainset import Trainset
+
+    usuarios = np.unique(avaliacoes['userId'].to_numpy())
+    itens = np.unique(avaliacoes['movieId'].to_numpy())
+    trainset = Trainset(
+        ur={u: [] for u in range(usuarios.size)},
+        ir={i: [] for i in range(itens.size)},
+        n_users=usuarios.size,
+        n_items=itens.size,
+        n_ratings=len(avaliacoes),
+        rating_scale=(0.5, 5.0),
+        raw2inner_id_users=dict(zip(usuarios.tolist(), range(usuarios.size))),
+        raw2inner_id_items=dict(zip(itens.tolist(), range(itens.size))),
+    )
+    trainset._global_mean = float(avaliacoes['rating'].mean())
+
+    modelo = SVD(n_factors=n_fatores, random_state=42)
+    modelo.trainset = trainset
+    modelo.bu = rng.normal(0, 0.3, size=usuarios.size)
+    modelo.bi = rng.normal(0, 0.3, size=itens.size)
+    modelo.pu = rng.normal(0, 0.1, size=(usuarios.size, n_fatores))
+    modelo.qi = rng.normal(0, 0.1, size=(itens.size, n_fatores))
+    return modelo
+
+def gerar_modelo_pnl(rng, filmes, dimensoes=DIMENSOES_PNL, n_grupos=None):
+    """Matriz latente com grupos de filmes próximos, no formato salvo por pnl_modulo.py."""
+    n_filmes = len(filmes)
+    n_grupos = n_grupos or max(n_filmes // 50, 1)
+    centros = rng.normal(0, 1, size=(n_grupos, dimensoes))
+    latent_matrix = centros[rng.integers(0, n_grupos, size=n_filmes)] + rng.normal(0, 0.5, size=(n_filmes, dimensoes))
+    movie_indices = pd.Series(filmes.index, index=filmes['movieId']).drop_duplicates()
+    return {'latent_matrix': latent_matrix, 'movie_indices': movie_indices}
+
+def gerar_transformadores_pnl(rng, filmes, dimensoes=DIMENSOES_PNL, amostra=AMOSTRA_TRANSFORMADORES):
+    """
+    TF-IDF e SVD no formato de Modelos/pnl_transformadores.pkl, ajustados nos textos de uma
+    amostra dos filmes, para a busca por descrição. A matriz latente sintética não vem deles:
+    só o custo de projetar uma descrição é realista, não o resultado.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from Codigo_fonte import pnl_modulo
+
+    linhas = rng.choice(len(filmes), size=min(amostra, len(filmes)), replace=False)
+    textos = pnl_modulo.criar_features_de_texto(filmes.iloc[np.sort(linhas)].copy(), usar_cache=False)['feature_pnl']
+    tfidf = TfidfVectorizer(max_features=5000)
+    svd = TruncatedSVD(n_components=dimensoes, random_state=42).fit(tfidf.fit_transform(textos))
+    return {'tfidf': tfidf, 'svd': svd, 'usar_stemmer': pnl_modulo.USAR_STEMMER}
+
+def gerar_diretorio(destino, filmes, usuarios, avaliacoes, semente=42, vizinhos_pnl=0):
+    """
+    Gera Data/ e Modelos/ em 'destino'. Com vizinhos_pnl > 0 também grava a tabela de
+    vizinhos pré-calculada do PNL (custo quadrático no número de filmes).
+    Retorna um dicionário com o tamanho real dos dados.
+    """
+    rng = np.random.default_rng(semente)
+    os.makedirs(os.path.join(destino, "Data"), exist_ok=True)
+    os.makedirs(os.path.join(destino, "Modelos"), exist_ok=True)
+
+    print(f"Gerando {filmes} filmes...")
+    filmes_df = gerar_filmes(rng, filmes)
+    filmes_df.to_csv(os.path.join(destino, "Data", "filmes.csv"), index=False)
+
+    print(f"Gerando ~{avaliacoes} avaliações de {usuarios} usuários...")
+    avaliacoes_df = gerar_avaliacoes(rng, filmes_df['movieId'].to_numpy(), usuarios, avaliacoes)
+    avaliacoes_df.to_csv(os.path.join(destino, "Data", "usuarios.csv"), index=False)
+
+    print("Gerando artefatos dos modelos (CF, PNL e Fuzzy)...")
+    with open(os.path.join(destino, "Modelos", "modelo_colaborativo.pkl"), 'wb') as f:
+        pickle.dump(gerar_modelo_cf(rng, avaliacoes_df), f)
+    modelo_pnl = gerar_modelo_pnl(rng, filmes_df)
+    with open(os.path.join(destino, "Modelos", "pnl_similarity_model.pkl"), 'wb') as f:
+        pickle.dump(modelo_pnl, f)
+    with open(os.path.join(destino, "Modelos", "pnl_transformadores.pkl"), 'wb') as f:
+        pickle.dump(gerar_transformadores_pnl(rng, filmes_df), f)
+    pnl = pnl_vetorizado.preparar_pnl(modelo_pnl)
+    pnl_vetorizado.salvar_artefato_pnl(pnl, *(os.path.join(destino, "Modelos", nome) for nome in
+                                              ("pnl_modelo.json", "pnl_vetores.npy", "pnl_movie_ids.npy")))
+    if vizinhos_pnl:
+        tabela = pnl_vetorizado.construir_tabela_vizinhos(pnl, vizinhos_pnl)
+        pnl_vetorizado.salvar_tabela_vizinhos(pnl, tabela, os.path.join(destino, "Modelos", "pnl_vizinhos.npy"),
+                                              os.path.join(destino, "Modelos", "pnl_vizinhos_similaridades.npy"))
+
+    diretorio_atual = os.getcwd()
+    try:
+        os.chdir(destino) # fuzzy_modulo salva em Modelos/ relativo ao diretório atual
+        from Codigo_fonte import fuzzy_modulo
+        fuzzy_modulo.definir_e_salvar_sistema_fuzzy()
+    finally:
+        os.chdir(diretorio_atual)
+
+    return {'filmes': len(filmes_df), 'usuarios': int(avaliacoes_df['userId'].nunique()), 'avaliacoes': len(avaliacoes_df)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados e modelos sintéticos para o benchmark.")
+    parser.add_argument("destino", help="Diretório onde serão criadas as pastas Data/ e Modelos/")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default='pequena')
+    parser.add_argument("--filmes", type=int, help="Sobrescreve o número de filmes da escala")
+    parser.add_argument("--usuarios", type=int, help="Sobrescreve o número de usuários da escala")
+    parser.add_argument("--avaliacoes", type=int, help="Sobrescreve o número de avaliações da escala")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--vizinhos-pnl", type=int, default=0, help="Grava a tabela com os K vizinhos PNL de cada filme")
+    args = parser.parse_args()
+
+    tamanho = dict(ESCALAS[args.escala])
+    for chave in ('filmes', 'usuarios', 'avaliacoes'):
+        if getattr(args, chave):
+            tamanho[chave] = getattr(args, chave)
+    print(gerar_diretorio(args.destino, semente=args.semente, vizinhos_pnl=args.vizinhos_pnl, **tamanho))
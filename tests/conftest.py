@@ -0,0 +1,37 @@
+import os
+import sys
+import shutil
+import pytest
+
+# Os testes rodam sobre os dados sintéticos do benchmark (benchmarks/dados_sinteticos.py), em
+# escala mínima. Os módulos usam caminhos relativos (Data/, Modelos/), então cada teste recebe
+# uma cópia própria do diretório como diretório atual e o estado em memória zerado.
+
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if diretorio_projeto not in sys.path:
+    sys.path.insert(0, diretorio_projeto)
+
+TAMANHO_TESTES = {'filmes': 400, 'usuarios': 40, 'avaliacoes': 4000}
+
+@pytest.fixture(scope="session")
+def dados_sinteticos(tmp_path_factory):
+    from benchmarks import dados_sinteticos
+    destino = str(tmp_path_factory.mktemp("dados"))
+    dados_sinteticos.gerar_diretorio(destino, **TAMANHO_TESTES)
+    return destino
+
+@pytest.fixture
+def ambiente(dados_sinteticos, tmp_path, monkeypatch):
+    """Diretório de trabalho com uma cópia dos dados sintéticos e os caches do processo vazios."""
+    from Codigo_fonte import recursos, sobreposicao_cf, cache_recomendacoes, gerenciar_usuarios
+    destino = tmp_path / "ambiente"
+    shutil.copytree(dados_sinteticos, destino)
+    monkeypatch.chdir(destino)
+    for nome in list(recursos._REGISTRO):
+        recursos.descartar(nome)
+    sobreposicao_cf.limpar()
+    cache_recomendacoes.limpar()
+    monkeypatch.setattr(gerenciar_usuarios, 'USUARIOS_DF_GER', None)
+    monkeypatch.setattr(gerenciar_usuarios, 'FILMES_DF_GER', None)
+    monkeypatch.setattr(gerenciar_usuarios, 'INDICE_AVALIACOES_GER', None)
+    return destino
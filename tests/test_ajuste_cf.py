@@ -0,0 +1,56 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from Codigo_fonte import ajuste_cf
+
+# RMSE de validação (falso) de cada combinação em cada número de épocas
+CURVAS = {
+    1: {1: 0.80, 2: 0.85, 4: 0.70}, # Melhor na rodada 0, mas piora com mais épocas: para ali
+    2: {1: 0.90, 2: 0.86, 4: 0.84},
+    3: {1: 0.92, 2: 0.88, 4: 0.83},
+    4: {1: 0.95}, 5: {1: 0.96}, 6: {1: 0.97}, 7: {1: 0.98}, 8: {1: 0.99}, 9: {1: 1.00},
+}
+GRADE = {'n_factors': list(CURVAS), 'n_epochs': [4, 1, 2], 'random_state': [42]}
+
+def _avaliacoes(n=300):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'userId': rng.integers(1, 30, n), 'movieId': rng.integers(1, 50, n),
+                         'rating': rng.choice(np.arange(1, 11) / 2, n)})
+
+@pytest.fixture
+def avaliar_falso(monkeypatch):
+    avaliadas = []
+    def avaliar(parametros):
+        avaliadas.append((parametros['n_factors'], parametros['n_epochs']))
+        return [CURVAS[parametros['n_factors']][parametros['n_epochs']]] * 3, 0.0
+    monkeypatch.setattr(ajuste_cf, '_avaliar_tentativa', avaliar)
+    return avaliadas
+
+def test_halving_mantem_a_melhor_fracao_das_que_melhoraram(tmp_path, avaliar_falso):
+    caminho_log = str(tmp_path / "tentativas.jsonl")
+    melhores, melhor_rmse, tentativas = ajuste_cf.buscar_hiperparametros(_avaliacoes(), GRADE, n_processos=1,
+                                                                         caminho_log=caminho_log)
+    # Rodada 0: as 9 com 1 época; ficam as 3 melhores. Rodada 1: a combinação 1 piorou e sai,
+    # das outras fica 1/3 (arredondado para cima). Rodada 2: só a combinação 2.
+    assert avaliar_falso == [(f, 1) for f in range(1, 10)] + [(1, 2), (2, 2), (3, 2), (2, 4)]
+    assert [t['rodada'] for t in tentativas] == [0] * 9 + [1] * 3 + [2]
+    assert melhores == {'n_factors': 1, 'random_state': 42, 'n_epochs': 1} and melhor_rmse == pytest.approx(0.80)
+
+    with open(caminho_log, encoding='utf-8') as f:
+        registradas = [json.loads(linha) for linha in f]
+    assert registradas == json.loads(json.dumps(tentativas))
+
+def test_orcamento_de_tentativas_interrompe_a_busca(avaliar_falso):
+    _, _, tentativas = ajuste_cf.buscar_hiperparametros(_avaliacoes(), GRADE, n_processos=1, max_tentativas=5,
+                                                        caminho_log=None)
+    assert len(tentativas) == len(avaliar_falso) == 5
+
+def test_pool_com_memoria_compartilhada_igual_ao_serial():
+    grade = {'n_factors': [2, 5], 'n_epochs': [2, 4], 'lr_all': [0.005, 0.01], 'random_state': [0]}
+    serial = ajuste_cf.buscar_hiperparametros(_avaliacoes(), grade, n_processos=1, caminho_log=None)
+    em_pool = ajuste_cf.buscar_hiperparametros(_avaliacoes(), grade, n_processos=2, caminho_log=None)
+    assert em_pool[0] == serial[0] and em_pool[1] == pytest.approx(serial[1])
+    chave = lambda t: (t['rodada'], t['configuracao'])
+    assert ([(chave(t), t['rmse_dobras']) for t in sorted(em_pool[2], key=chave)]
+            == [(chave(t), t['rmse_dobras']) for t in sorted(serial[2], key=chave)])
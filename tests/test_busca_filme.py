@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from Codigo_fonte import busca_filme, pnl_modulo, recursos
+
+def test_descricao_usa_a_feature_do_treino(ambiente):
+    descricao = "Um robô no espaço, com um detetive e um dragão!"
+    filme = pd.DataFrame({'movieId': [1], 'sinopse': [descricao], 'generos': [''], 'diretor': [''], 'atores': ['']})
+    esperado = pnl_modulo.criar_features_de_texto(filme, usar_cache=False)['feature_pnl'].iloc[0]
+    assert pnl_modulo.feature_de_descricao(descricao) == esperado
+
+    busca_filme.limpar_cache_descricoes()
+    transformadores = recursos.obter('transformadores_pnl')
+    vetor = transformadores['svd'].transform(transformadores['tfidf'].transform([esperado]))[0]
+    np.testing.assert_allclose(busca_filme.vetor_da_descricao(descricao), vetor / np.linalg.norm(vetor))
+
+def test_sinopse_encontra_o_proprio_filme_apos_o_treino(ambiente):
+    pnl_modulo.treinar_e_salvar_modelo(vizinhos_precomputados=0)
+    busca_filme.limpar_cache_descricoes()
+    filmes = pd.read_csv(pnl_modulo.DATA_FILE)
+    acertos = sum(int(movie_id) in busca_filme.recomendar_por_descricao(sinopse, top_n=5)
+                  for movie_id, sinopse in zip(filmes['movieId'][:20], filmes['sinopse'][:20]))
+    assert acertos >= 18
+    assert busca_filme.recomendar_por_descricao("xyzw qwerty") == [] # Nenhuma palavra conhecida
+
+def test_similares_em_lote_iguais_as_chamadas_individuais(ambiente):
+    pnl = recursos.obter('pnl_vetorizado')
+    sementes = pnl['movie_ids'][[0, 5, 42]].tolist()
+    em_lote = busca_filme.recomendar_por_similaridade(sementes + [999999], top_n=8)
+    assert list(em_lote) == sementes + [999999] and em_lote[999999] == []
+    for semente in sementes:
+        similares = busca_filme.recomendar_por_similaridade(semente, top_n=8)
+        assert em_lote[semente] == similares and len(similares) == 8 and semente not in similares
+        linha = pnl['linha_por_movieid'][semente]
+        ordem = np.argsort(-(pnl['vetores'] @ pnl['vetores'][linha]), kind='stable')
+        assert similares == pnl['movie_ids'][ordem[ordem != linha][:8]].tolist()
@@ -0,0 +1,67 @@
+import builtins
+import pandas as pd
+from Codigo_fonte import cache_recomendacoes, gerenciar_usuarios, recomendar
+
+def _ranking(n):
+    return pd.DataFrame({'movieId': range(1, n + 1)})
+
+def test_repeticao_e_top_n_maior_vem_do_cache(ambiente):
+    antes = cache_recomendacoes.estatisticas()
+    primeira, execucao = recomendar.gerar_recomendacoes_hibridas(1, 120, 10, retornar_metricas=True)
+    assert execucao['cache'] == 'falha'
+
+    repetida, execucao = recomendar.gerar_recomendacoes_hibridas(1, 120, 10, retornar_metricas=True)
+    assert execucao['cache'] == 'acerto'
+    pd.testing.assert_frame_equal(repetida, primeira)
+
+    # top_n maior (até TOP_N_MINIMO) é uma fatia do mesmo ranking
+    maior, execucao = recomendar.gerar_recomendacoes_hibridas(1, 120, 30, retornar_metricas=True)
+    assert execucao['cache'] == 'acerto'
+    pd.testing.assert_frame_equal(maior.head(10), primeira)
+
+    depois = cache_recomendacoes.estatisticas()
+    assert depois['acertos'] - antes['acertos'] == 2 and depois['falhas'] - antes['falhas'] == 1
+    assert depois['entradas'] == 1
+
+def test_avaliacao_nova_invalida_as_recomendacoes_do_usuario(ambiente, monkeypatch):
+    primeira = recomendar.gerar_recomendacoes_hibridas(1, 120, 10)
+    recomendar.gerar_recomendacoes_hibridas(2, 120, 10)
+    assert cache_recomendacoes.estatisticas()['entradas'] == 2
+
+    # O usuário 1 dá nota baixa ao primeiro filme recomendado pelo fluxo do terminal
+    gerenciar_usuarios._garantir_dados_carregados()
+    filmes = gerenciar_usuarios.FILMES_DF_GER
+    movie_id = int(primeira['movieId'].iloc[0])
+    linha = filmes.index[filmes['movieId'] == movie_id][0]
+    respostas = iter([filmes.loc[linha, 'titulo'], str(linha + 1), "1.0", "fim"])
+    monkeypatch.setattr(builtins, 'input', lambda *args: next(respostas))
+    antes = cache_recomendacoes.estatisticas()['invalidacoes']
+    gerenciar_usuarios.adicionar_avaliacoes(1)
+    assert cache_recomendacoes.estatisticas()['invalidacoes'] == antes + 1
+    assert cache_recomendacoes.estatisticas()['entradas'] == 1 # A entrada do usuário 2 continua
+
+    nova, execucao = recomendar.gerar_recomendacoes_hibridas(1, 120, 10, retornar_metricas=True)
+    assert execucao['cache'] == 'falha'
+    assert movie_id not in nova['movieId'].tolist() # Filme já visto sai da lista
+
+def test_lru_e_ttl(monkeypatch):
+    cache_recomendacoes.limpar()
+    monkeypatch.setattr(cache_recomendacoes, 'MAX_ENTRADAS', 2)
+    antes = cache_recomendacoes.estatisticas()
+    for user_id in (1, 2):
+        cache_recomendacoes.guardar(user_id, 90, _ranking(60), completo=False)
+    assert cache_recomendacoes.obter(1, 90, 10) is not None # O usuário 1 passa a ser o mais recente
+    cache_recomendacoes.guardar(3, 90, _ranking(60), completo=False)
+    assert cache_recomendacoes.obter(2, 90, 10) is None
+    assert cache_recomendacoes.obter(1, 90, 10) is not None and cache_recomendacoes.obter(3, 90, 10) is not None
+
+    # Ranking incompleto não atende top_n maior que ele; um completo atende qualquer top_n
+    assert cache_recomendacoes.obter(1, 90, 61) is None
+    cache_recomendacoes.guardar(1, 90, _ranking(5), completo=True)
+    assert len(cache_recomendacoes.obter(1, 90, 100)) == 5
+
+    monkeypatch.setattr(cache_recomendacoes, 'TTL_SEGUNDOS', -1)
+    assert cache_recomendacoes.obter(3, 90, 10) is None
+    depois = cache_recomendacoes.estatisticas()
+    assert depois['remocoes'] - antes['remocoes'] == 1 and depois['expiracoes'] - antes['expiracoes'] == 1
+    cache_recomendacoes.limpar()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from Codigo_fonte import catalogo
+
+def _int_ou_none(valor):
+    # Regra do laço de ranqueamento antigo: int(duracao) dentro de um try/except
+    try:
+        return int(valor)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+def test_duracoes_como_o_int_do_laco_antigo():
+    for coluna in (pd.Series([120.0, 95.7, np.nan, 0.0, -3.2]),
+                   pd.Series(["120", "abc", None, "95", " 80 ", "1e3"], dtype=object)):
+        duracoes, validas = catalogo._limpar_duracoes(coluna)
+        esperado = [_int_ou_none(valor) for valor in coluna.tolist()]
+        assert validas.tolist() == [valor is not None for valor in esperado]
+        assert duracoes[validas].tolist() == [valor for valor in esperado if valor is not None]
+
+def test_linhas_e_titulos_como_o_loc_do_dataframe():
+    filmes = pd.DataFrame({
+        'movieId': [10, 3, 250, 3, 7],
+        'titulo': ["Toy Story (1995)", "Heat", None, "Heat (duplicado)", "Coração Valente"],
+        'duracao': [81, 170, np.nan, 100, 178],
+    })
+    cat = catalogo.construir_catalogo(filmes.set_index('movieId')) # 'movieId' como índice também serve
+    consulta = [3, 10, 7, 250, 4, 999, -1]
+    linhas = catalogo.linhas_dos_filmes(cat, consulta)
+    assert linhas.tolist() == [1, 0, 4, 2, -1, -1, -1] # Repetido: vale a primeira ocorrência
+
+    assert catalogo.titulos_das_linhas(cat, linhas[:4]) == ["Heat", "Toy Story (1995)", "Coração Valente", "Filme ID 250"]
+    assert catalogo.titulo_da_linha(cat, 4) == "Coração Valente"
+    assert cat['duracao'][linhas[:3]].tolist() == [170, 81, 178]
+    assert cat['duracao_valida'].tolist() == [True, True, False, True, True]
@@ -0,0 +1,133 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from surprise import SVD, Dataset, Reader
+from Codigo_fonte import cf_vetorizado
+
+def _avaliacoes_de_posto_baixo(usuarios=300, filmes=200, por_usuario=40, posto=4, semente=0):
+    # Notas com estrutura de usuários e filmes (fatores verdadeiros + vieses + ruído), na escala 0.5-5
+    rng = np.random.default_rng(semente)
+    p, q = rng.normal(0, 0.6, (usuarios, posto)), rng.normal(0, 0.6, (filmes, posto))
+    vies_u, vies_i = rng.normal(0, 0.4, usuarios), rng.normal(0, 0.4, filmes)
+    linhas = []
+    for u in range(usuarios):
+        for i in rng.choice(filmes, por_usuario, replace=False):
+            nota = 3.5 + vies_u[u] + vies_i[i] + p[u] @ q[i] + rng.normal(0, 0.7)
+            linhas.append((u + 1, i + 1, float(np.clip(np.round(nota * 2) / 2, 0.5, 5.0))))
+    return pd.DataFrame(linhas, columns=['userId', 'movieId', 'rating'])
+
+@pytest.fixture(scope="module")
+def modelo_sem_os_usuarios_de_teste():
+    avaliacoes = _avaliacoes_de_posto_baixo()
+    teste = avaliacoes['userId'] > 240 # Usuários que o modelo nunca viu
+    dados = Dataset.load_from_df(avaliacoes[~teste], Reader(rating_scale=(0.5, 5.0)))
+    modelo = SVD(n_factors=30, n_epochs=30, random_state=0)
+    modelo.fit(dados.build_full_trainset())
+    return cf_vetorizado.extrair_fatores_cf(modelo), avaliacoes[teste]
+
+def _rmse(previstas, reais):
+    return float(np.sqrt(np.mean((previstas - reais) ** 2)))
+
+@pytest.mark.parametrize("conhecidas", [3, 10, 30])
+def test_usuario_dobrado_preve_melhor_que_o_fallback(modelo_sem_os_usuarios_de_teste, conhecidas):
+    fatores, avaliacoes = modelo_sem_os_usuarios_de_teste
+    rng = np.random.default_rng(conhecidas)
+    erros_dobra, erros_fallback, reais = [], [], []
+    for user_id, do_usuario in avaliacoes.groupby('userId'):
+        ordem = rng.permutation(len(do_usuario))
+        dobra, avaliar = do_usuario.iloc[ordem[:conhecidas]], do_usuario.iloc[ordem[conhecidas:]]
+        pu, bu = cf_vetorizado.dobrar_usuario(fatores, dobra['movieId'].to_numpy(), dobra['rating'].to_numpy())
+        sobreposicao = {'user_ids': np.array([user_id]), 'pu': pu[None, :], 'bu': np.array([bu])}
+        filmes = avaliar['movieId'].to_numpy()
+        erros_dobra.append(cf_vetorizado.prever_notas_cf(fatores, user_id, filmes, sobreposicao))
+        erros_fallback.append(cf_vetorizado.prever_notas_cf(fatores, user_id, filmes)) # Usuário fora do treino
+        reais.append(avaliar['rating'].to_numpy())
+    reais = np.concatenate(reais)
+    assert _rmse(np.concatenate(erros_dobra), reais) <= _rmse(np.concatenate(erros_fallback), reais)
+
+def test_uma_avaliacao_deixa_o_usuario_perto_do_usuario_medio(modelo_sem_os_usuarios_de_teste):
+    fatores, _ = modelo_sem_os_usuarios_de_teste
+    filme = int(fatores['iids_ordenados'][0])
+    pu, bu = cf_vetorizado.dobrar_usuario(fatores, [filme], [5.0])
+    # Desvio da média dos usuários do treino bem menor que a dispersão deles (raiz do traço da covariância)
+    desvio = np.linalg.norm(np.r_[pu, bu] - fatores['priori_media'])
+    assert desvio < 0.5 * np.linalg.norm(fatores['priori_raiz'])
+
+def test_priori_gravada_no_artefato(modelo_sem_os_usuarios_de_teste, tmp_path):
+    fatores, _ = modelo_sem_os_usuarios_de_teste
+    cf_vetorizado.salvar_artefato_cf(fatores, str(tmp_path))
+    carregados = cf_vetorizado.carregar_artefato_cf(str(tmp_path), verificar_checksum=True)
+    np.testing.assert_allclose(carregados['priori_raiz'], fatores['priori_raiz'])
+
+    # Artefato anterior à priori: ela é calculada na carga a partir de pu e bu
+    caminho_cabecalho = os.path.join(str(tmp_path), cf_vetorizado.CABECALHO_ARTEFATO)
+    with open(caminho_cabecalho, encoding='utf-8') as f:
+        cabecalho = json.load(f)
+    for chave in cf_vetorizado.ARRAYS_PRIORI:
+        del cabecalho['arquivos'][chave]
+    with open(caminho_cabecalho, 'w', encoding='utf-8') as f:
+        json.dump(cabecalho, f)
+    antigo = cf_vetorizado.carregar_artefato_cf(str(tmp_path))
+    np.testing.assert_allclose(antigo['priori_media'], fatores['priori_media'], atol=1e-5)
+
+def _fatores_sinteticos(usuarios, filmes, k=4, semente=0):
+    rng = np.random.default_rng(semente)
+    pu, bu = rng.normal(size=(usuarios, k)), rng.normal(size=usuarios)
+    return {
+        'pu': pu, 'qi': rng.normal(size=(filmes, k)), 'bu': bu, 'bi': rng.normal(size=filmes),
+        'media_global': 3.5, 'escala': (0.5, 5.0), 'enviesado': True,
+        **cf_vetorizado.priori_dos_usuarios(pu, bu),
+        'uids_ordenados': np.arange(1, usuarios + 1), 'uids_internos': np.arange(usuarios),
+        'iids_ordenados': np.arange(1, filmes + 1), 'iids_internos': np.arange(filmes),
+    }
+
+def test_artefato_mapeado_sobrevive_a_novos_treinos(tmp_path):
+    diretorio = str(tmp_path)
+    cf_vetorizado.salvar_artefato_cf(_fatores_sinteticos(50, 80), diretorio)
+    antigo = cf_vetorizado.carregar_artefato_cf(diretorio, verificar_checksum=True)
+    copias = {chave: np.array(antigo[chave]) for chave in ('pu', 'qi', 'bi')}
+
+    # Dois treinos menores: os arquivos do primeiro são apagados, mas não reescritos
+    cf_vetorizado.salvar_artefato_cf(_fatores_sinteticos(30, 60, semente=1), diretorio)
+    cf_vetorizado.salvar_artefato_cf(_fatores_sinteticos(20, 40, semente=2), diretorio)
+    for chave, copia in copias.items():
+        assert np.array_equal(antigo[chave], copia)
+
+    novo = cf_vetorizado.carregar_artefato_cf(diretorio, verificar_checksum=True)
+    assert novo['pu'].shape == (20, 4) and novo['qi'].shape == (40, 4)
+    with open(os.path.join(diretorio, cf_vetorizado.CABECALHO_ARTEFATO), encoding='utf-8') as f:
+        for info in json.load(f)['arquivos'].values():
+            assert info['sha256'][:16] in info['nome']
+    # Só as duas últimas gerações ficam em disco
+    assert len([nome for nome in os.listdir(diretorio) if nome.startswith("pu.")]) == 2
+    assert not os.path.exists(os.path.join(diretorio, "pu.npy"))
+
+def test_artefato_preve_como_o_pickle(ambiente, tmp_path):
+    from Codigo_fonte import recursos
+    do_pickle = cf_vetorizado.extrair_fatores_cf(recursos.obter('modelo_cf'))
+    cf_vetorizado.salvar_artefato_cf(do_pickle, str(tmp_path))
+    do_artefato = cf_vetorizado.carregar_artefato_cf(str(tmp_path), verificar_checksum=True)
+    filmes = np.append(do_pickle['iids_ordenados'][:200], 10 ** 9) # Inclui um filme fora do modelo
+    for user_id in (1, 2, 3, 10 ** 9):
+        np.testing.assert_allclose(cf_vetorizado.prever_notas_cf(do_artefato, user_id, filmes),
+                                   cf_vetorizado.prever_notas_cf(do_pickle, user_id, filmes), atol=1e-5)
+
+@pytest.mark.parametrize("enviesado", [True, False])
+def test_previsao_vetorizada_igual_ao_predict_do_surprise(enviesado):
+    avaliacoes = _avaliacoes_de_posto_baixo(usuarios=60, filmes=80, por_usuario=20)
+    dados = Dataset.load_from_df(avaliacoes, Reader(rating_scale=(0.5, 5.0)))
+    modelo = SVD(n_factors=8, n_epochs=10, biased=enviesado, random_state=0)
+    modelo.fit(dados.build_full_trainset())
+    modelo.pu *= 50 # Fatores exagerados: parte das notas sai da escala e precisa ser cortada
+    fatores = cf_vetorizado.extrair_fatores_cf(modelo)
+
+    filmes = np.concatenate([np.arange(1, 81), [10 ** 6, 10 ** 6 + 1]]) # Dois filmes fora do modelo
+    usuarios = [1, 2, 30, 60, 10 ** 6] # O último é desconhecido
+    esperado = np.array([[modelo.predict(u, int(m)).est for m in filmes] for u in usuarios])
+    assert ((esperado == 0.5) | (esperado == 5.0)).any()
+
+    for linha, user_id in enumerate(usuarios):
+        np.testing.assert_allclose(cf_vetorizado.prever_notas_cf(fatores, user_id, filmes), esperado[linha], atol=1e-9)
+    np.testing.assert_allclose(cf_vetorizado.prever_notas_cf_bloco(fatores, usuarios, filmes), esperado, atol=1e-9)
@@ -0,0 +1,34 @@
+import numpy as np
+from skfuzzy import control as ctrl
+from Codigo_fonte import fuzzy_modulo, recursos
+
+TOLERANCIA = 1e-9
+
+def _sistema_do_treino(ambiente):
+    fuzzy_modulo.definir_e_salvar_sistema_fuzzy() # Regrava Modelos/fuzzy_control_system.pkl no ambiente
+    recursos.descartar('sistema_fuzzy')
+    return recursos.obter('sistema_fuzzy')
+
+def test_avaliador_vetorizado_igual_ao_skfuzzy(ambiente):
+    sistema = _sistema_do_treino(ambiente)
+    avaliador = fuzzy_modulo.compilar_avaliador_fuzzy(sistema)
+    notas = np.round(np.arange(0.5, 5.51, 0.25), 2) # Inclui notas fora do universo (corte nos limites)
+    for tempo in (10, 15, 45, 80, 100, 125, 200, 240, 300):
+        vetorizado = fuzzy_modulo.calcular_prioridades_lote(avaliador, notas, tempo)
+        for nota, valor in zip(notas, vetorizado):
+            simulacao = ctrl.ControlSystemSimulation(sistema)
+            simulacao.input['nota_prevista'] = nota
+            simulacao.input['tempo_disponivel'] = tempo
+            try:
+                simulacao.compute()
+                esperado = simulacao.output['prioridade_final']
+            except (ValueError, KeyError): # Área vazia: nenhuma saída no skfuzzy, NaN no vetorizado
+                esperado = np.nan
+            if np.isnan(esperado):
+                assert np.isnan(valor), (nota, tempo)
+            else:
+                assert abs(esperado - valor) <= TOLERANCIA, (nota, tempo)
+
+def test_verificacao_da_grade_completa(ambiente):
+    sistema = _sistema_do_treino(ambiente)
+    assert fuzzy_modulo.verificar_equivalencia_skfuzzy(sistema, tolerancia=TOLERANCIA) <= TOLERANCIA
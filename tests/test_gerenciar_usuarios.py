@@ -0,0 +1,26 @@
+import time
+import numpy as np
+import pandas as pd
+from Codigo_fonte import recursos, gerenciar_usuarios, indice_avaliacoes, indice_titulos
+
+def test_avaliacao_nova_atualiza_os_indices_sem_reler_o_csv(ambiente, monkeypatch):
+    indice_prefixos = recursos.obter('indice_prefixos') # Carrega usuarios_df e o índice CSR
+    gerenciar_usuarios._garantir_dados_carregados()
+    leituras = []
+    monkeypatch.setattr(pd, 'read_csv', lambda *args, **kwargs: leituras.append(args) or None)
+
+    user_id = int(indice_avaliacoes.usuarios_disponiveis(recursos.obter('indice_avaliacoes'))[0])
+    filmes = recursos.obter('filmes_df')['movieId'].to_numpy()[-3:]
+    novas = pd.DataFrame({'userId': user_id, 'movieId': filmes, 'rating': [5.0, 4.0, 3.0], 'timestamp': int(time.time())})
+    gerenciar_usuarios.USUARIOS_DF_GER = pd.concat([gerenciar_usuarios.USUARIOS_DF_GER, novas], ignore_index=True)
+    gerenciar_usuarios._salvar_usuarios_df(user_id)
+    assert leituras == [] and recursos.carregado('indice_prefixos')
+
+    # Mesmo resultado de reconstruir tudo a partir do DataFrame alterado
+    esperado = indice_avaliacoes.construir_indice_avaliacoes(gerenciar_usuarios.USUARIOS_DF_GER)
+    for indice in (gerenciar_usuarios.INDICE_AVALIACOES_GER, recursos.obter('indice_avaliacoes')):
+        for chave in esperado:
+            np.testing.assert_array_equal(indice[chave], esperado[chave])
+    popularidade = indice_titulos.construir_indice_prefixos(recursos.obter('titulos_map'), esperado)['popularidade']
+    np.testing.assert_array_equal(recursos.obter('indice_prefixos')['popularidade'], popularidade)
+    assert recursos.obter('indice_prefixos')['palavras'] is indice_prefixos['palavras']
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pandas as pd
+from Codigo_fonte import indice_ann, pnl_vetorizado
+
+def _pnl_agrupado(n_filmes=2000, dimensoes=16, grupos=40, semente=0):
+    """Vetores em grupos (como gêneros/temas), o caso em que o IVF é usado."""
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(grupos, dimensoes))
+    matriz = centros[rng.integers(grupos, size=n_filmes)] + 0.3 * rng.normal(size=(n_filmes, dimensoes))
+    return pnl_vetorizado.preparar_pnl({
+        'latent_matrix': matriz,
+        'movie_indices': pd.Series(np.arange(n_filmes), index=np.arange(1, n_filmes + 1)),
+    })
+
+def test_recall_em_relacao_a_busca_exata():
+    pnl = _pnl_agrupado()
+    indice = indice_ann.construir_indice_ivf(pnl)
+    linhas = np.arange(0, 2000, 7)
+    exatos, sim_exatas = pnl_vetorizado.vizinhos_mais_proximos(pnl, linhas, 10)
+
+    # Visitando todas as listas, a busca aproximada é a exata
+    todas = indice['centroides'].shape[0]
+    vizinhos, similaridades = indice_ann.buscar_ivf(pnl, indice, linhas, 10, n_sondas=todas)
+    np.testing.assert_array_equal(vizinhos, exatos)
+    np.testing.assert_allclose(similaridades, sim_exatas, rtol=1e-6)
+
+    # Com as sondas padrão, o recall fica alto e nunca cai ao aumentar as sondas
+    aproximados, _ = indice_ann.buscar_ivf(pnl, indice, linhas, 10)
+    recall = np.mean([np.intersect1d(e, a).size for e, a in zip(exatos, aproximados)]) / 10
+    assert recall >= 0.9
+    recalls = [indice_ann.medir_recall(pnl, indice, 10, n_sondas) for n_sondas in (1, 4, todas)]
+    assert recalls == sorted(recalls) and recalls[-1] == 1.0
+
+def test_n_sondas_chega_a_busca_de_similares(monkeypatch):
+    pnl = _pnl_agrupado(300, grupos=10)
+    indice = indice_ann.construir_indice_ivf(pnl)
+    usadas = []
+    original = indice_ann.buscar_ivf_por_vetores
+    def espiar(pnl, indice, consultas, top_n, n_sondas=None, excluir=None):
+        usadas.append(n_sondas)
+        return original(pnl, indice, consultas, top_n, n_sondas, excluir)
+    monkeypatch.setattr(indice_ann, 'buscar_ivf_por_vetores', espiar)
+
+    pnl_vetorizado.buscar_vizinhos(pnl, np.array([0, 1]), 5, indice_ann=indice, n_sondas=3)
+    pnl_vetorizado.buscar_por_vetor(pnl, pnl['vetores'][0], 5, indice_ann=indice, n_sondas=2)
+    pnl_vetorizado.pontuar_vizinhanca(pnl, np.array([0]), 5, indice_ann=indice, n_sondas=1)
+    assert usadas == [3, 2, 1]
+
+def test_indice_de_outro_treino_com_o_mesmo_tamanho_e_ignorado(tmp_path):
+    caminho = os.path.join(tmp_path, "pnl_ivf.npz")
+    pnl = _pnl_agrupado(300, grupos=10)
+    indice_ann.salvar_indice_ivf(pnl, indice_ann.construir_indice_ivf(pnl), caminho)
+    assert os.listdir(tmp_path) == ["pnl_ivf.npz"] # Sem temporário sobrando
+    assert indice_ann.carregar_indice_ivf(pnl, caminho) is not None
+
+    retreinado = _pnl_agrupado(300, grupos=10, semente=1)
+    assert indice_ann.carregar_indice_ivf(retreinado, caminho) is None
+
+    # Índice gravado antes da impressão existir: também é ignorado
+    with np.load(caminho) as dados:
+        np.savez(caminho, **{nome: dados[nome] for nome in ('centroides', 'offsets', 'linhas')})
+    assert indice_ann.carregar_indice_ivf(pnl, caminho) is None
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from Codigo_fonte import indice_avaliacoes
+
+def _avaliacoes(rng, n=300):
+    return pd.DataFrame({
+        'userId': rng.integers(1, 30, size=n) * 2, # Ids pares: sobram ids livres entre eles
+        'movieId': rng.integers(1, 50, size=n),    # Com filmes repetidos por usuário
+        'rating': rng.choice(np.arange(0.5, 5.01, 0.5), size=n),
+    })
+
+def _iguais(a, b):
+    for chave in ('user_ids', 'offsets', 'movie_ids', 'ratings'):
+        np.testing.assert_array_equal(a[chave], b[chave], err_msg=chave)
+
+def test_substituir_usuario_igual_a_reconstruir():
+    rng = np.random.default_rng(0)
+    df = _avaliacoes(rng)
+    usuarios = np.unique(df['userId'])
+    casos = [usuarios[0], usuarios[len(usuarios) // 2], usuarios[-1], # Existentes: início, meio, fim
+             1, usuarios[3] + 1, usuarios[-1] + 10]                   # Novos: antes, entre e depois
+    for user_id in casos:
+        for n in (0, 1, 7):
+            novas = pd.DataFrame({'userId': user_id, 'movieId': rng.integers(1, 50, size=n),
+                                  'rating': rng.choice([1.0, 4.5, 5.0], size=n)})
+            alterado = pd.concat([df[df['userId'] != user_id], novas], ignore_index=True)
+            antes = indice_avaliacoes.construir_indice_avaliacoes(df)
+            copia = {chave: valor.copy() for chave, valor in antes.items()}
+            _iguais(indice_avaliacoes.substituir_usuario(antes, user_id, novas['movieId'], novas['rating']),
+                    indice_avaliacoes.construir_indice_avaliacoes(alterado))
+            _iguais(antes, copia) # O índice original não muda
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from Codigo_fonte import busca_filme, indice_titulos, recursos
+
+TITULOS = pd.Series({
+    10: "Coração Valente (1995)",
+    20: "O Rei Leão (1994)",
+    30: "Toy Story (1995)",
+    40: "Toy Story 2 (1999)",
+    50: "Histórias Cruzadas (2011)",
+})
+
+def test_normalizacao_remove_acentos_caixa_e_ano():
+    assert indice_titulos.normalizar_titulo("Coração Valente (1995)") == "coracao valente"
+    assert indice_titulos.normalizar_titulo("  O REI LEÃO!  ") == "o rei leao"
+    assert indice_titulos.normalizar_titulo(float('nan')) == ""
+    assert indice_titulos.trigramas("toy") == {" to", "toy", "oy "}
+
+def test_pre_selecao_tolera_erros_de_digitacao():
+    indice = indice_titulos.construir_indice_titulos(TITULOS)
+    for consulta, esperado in [("corasao valnte", 10), ("Rei Lao", 20), ("HISTORIAS cruzads", 50)]:
+        linhas = indice_titulos.pre_selecionar(indice, consulta, 2)
+        assert indice['movie_ids'][linhas[0]] == esperado and linhas.size <= 2
+    assert indice_titulos.pre_selecionar(indice, "@@", 5).size == 0 # Nenhum trigrama em comum
+
+def test_busca_por_titulo_com_erro_encontra_o_filme(ambiente):
+    titulos = recursos.obter('titulos_map')
+    for movie_id in titulos.index[:30:3]:
+        titulo = titulos[movie_id]
+        com_erro = titulo[:2] + titulo[3] + titulo[2] + titulo[4:] # Duas letras trocadas
+        assert busca_filme.encontrar_movieid_por_titulo(com_erro) == movie_id
+        assert busca_filme.encontrar_movieid_por_titulo(com_erro.upper(), top_n=3)[0] == movie_id
+
+def _indice_avaliacoes(contagens):
+    return {'movie_ids': np.repeat(list(contagens), list(contagens.values()))}
+
+def test_autocompletar_por_prefixo_ordena_pela_popularidade():
+    indice = indice_titulos.construir_indice_prefixos(TITULOS, _indice_avaliacoes({30: 2, 40: 5, 10: 5, 20: 1}))
+    assert indice_titulos.autocompletar(indice, "toy") == [40, 30]
+    assert indice_titulos.autocompletar(indice, "TOY st 2") == [40]
+    assert indice_titulos.autocompletar(indice, "st toy") == [40, 30] # Ordem das palavras não importa
+    assert indice_titulos.autocompletar(indice, "cora") == [10]
+
+    # Empate na popularidade: menor movieId primeiro, inclusive no corte do top_n
+    empatados = indice_titulos.construir_indice_prefixos(TITULOS, _indice_avaliacoes({40: 3, 30: 3, 50: 3}))
+    assert indice_titulos.autocompletar(empatados, "toy") == [30, 40]
+    assert indice_titulos.autocompletar(empatados, "toy", top_n=1) == [30]
+    assert indice_titulos.autocompletar(indice, "") == [] and indice_titulos.autocompletar(indice, "xyz") == []
+    sem_avaliacoes = indice_titulos.construir_indice_prefixos(TITULOS)
+    assert indice_titulos.autocompletar(sem_avaliacoes, "toy story", top_n=1) == [30]
+
+def test_autocompletar_titulo_usa_o_numero_de_avaliacoes(ambiente):
+    titulos = recursos.obter('titulos_map')
+    contagens = recursos.obter('usuarios_df')['movieId'].value_counts()
+    palavra = indice_titulos.normalizar_titulo(titulos.iloc[0]).split()[0]
+    prefixo = palavra[:3]
+    encontrados = busca_filme.autocompletar_titulo(prefixo, top_n=5)
+
+    com_prefixo = [m for m, t in titulos.items()
+                   if any(p.startswith(prefixo) for p in indice_titulos.normalizar_titulo(t).split())]
+    esperado = sorted(com_prefixo, key=lambda m: (-contagens.get(m, 0), m))[:5]
+    assert encontrados == esperado and len(encontrados) == 5
@@ -0,0 +1,50 @@
+import json
+import logging
+from Codigo_fonte import cache_recomendacoes, metricas, recomendar
+
+ESTAGIOS = ['usuario', 'lista_a_cf', 'lista_b_pnl', 'pool_candidatos', 'filtros_metadados',
+            'pontuacao_cf', 'ranqueamento_fuzzy', 'top_n']
+
+def test_execucao_registra_todos_os_estagios_e_vai_para_os_sinks(ambiente, monkeypatch, capsys, caplog):
+    monkeypatch.setattr(metricas, 'VERBOSO', False)
+    histograma = metricas.novo_histograma()
+    def sink_com_erro(execucao):
+        raise RuntimeError("disco cheio")
+    sinks = [metricas.sink_jsonl("metricas.jsonl"), metricas.sink_histograma(histograma),
+             metricas.sink_logging(), sink_com_erro]
+    for sink in sinks:
+        metricas.adicionar_sink(sink)
+    try:
+        with caplog.at_level(logging.INFO, logger="recomenda_ai.metricas"):
+            recomendacoes, execucao = recomendar.gerar_recomendacoes_hibridas(1, 120, 10, retornar_metricas=True)
+            recomendar.gerar_recomendacoes_hibridas(2, 90, 5)
+    finally:
+        for sink in sinks:
+            metricas.remover_sink(sink)
+
+    assert [e['estagio'] for e in execucao['estagios']] == ESTAGIOS
+    assert all(e['segundos'] >= 0 for e in execucao['estagios'])
+    assert len(recomendacoes) == execucao['resultados'] == 10
+    assert execucao['estagios'][-1]['saida'] == cache_recomendacoes.TOP_N_MINIMO # Ranking guardado no cache
+    assert execucao['contadores']['sucesso'] == execucao['estagios'][ESTAGIOS.index('filtros_metadados')]['saida']
+    assert execucao['total_segundos'] >= sum(e['segundos'] for e in execucao['estagios'])
+
+    with open("metricas.jsonl", encoding='utf-8') as f:
+        linhas = [json.loads(linha) for linha in f]
+    assert [linha['parametros']['user_id'] for linha in linhas] == [1, 2]
+    assert linhas[0]['estagios'] == execucao['estagios']
+    assert len(caplog.records) == 2
+
+    resumo = metricas.resumo_histograma(histograma)
+    assert set(resumo) == set(ESTAGIOS) | {'total'}
+    assert resumo['total']['contagem'] == 2 and resumo['total']['p50'] <= resumo['total']['maximo']
+
+    # Sink com erro só gera um aviso; fora do modo verboso não há mais nenhuma saída
+    saida = capsys.readouterr().out.splitlines()
+    assert len(saida) == 2 and all(linha.startswith("AVISO: Falha no sink de métricas") for linha in saida)
+
+def test_modo_verboso_imprime_o_relatorio(ambiente, monkeypatch, capsys):
+    monkeypatch.setattr(metricas, 'VERBOSO', True)
+    recomendar.gerar_recomendacoes_hibridas(1, 120, 10)
+    saida = capsys.readouterr().out
+    assert "RELATÓRIO DE DIAGNÓSTICO" in saida and all(nome in saida for nome in ESTAGIOS)
@@ -0,0 +1,101 @@
+import os
+import json
+import pickle
+import numpy as np
+import pandas as pd
+from Codigo_fonte import pnl_modulo, pnl_vetorizado
+
+def _tornar_legado(caminho_cabecalho):
+    # Artefato como os gravados antes dos nomes versionados: pnl_vetores.npy / pnl_movie_ids.npy
+    diretorio = os.path.dirname(caminho_cabecalho)
+    with open(caminho_cabecalho, encoding='utf-8') as f:
+        cabecalho = json.load(f)
+    for chave, caminho in (('vetores', pnl_modulo.VETORES_FILE), ('movie_ids', pnl_modulo.MOVIE_IDS_FILE)):
+        os.replace(os.path.join(diretorio, cabecalho['arquivos'][chave]['nome']), caminho)
+        cabecalho['arquivos'][chave]['nome'] = os.path.basename(caminho)
+    with open(caminho_cabecalho, 'w', encoding='utf-8') as f:
+        json.dump(cabecalho, f)
+
+def test_treino_streaming_nao_reescreve_o_artefato_em_uso(ambiente):
+    _tornar_legado(pnl_modulo.CABECALHO_FILE)
+    em_uso = pnl_vetorizado.carregar_artefato_pnl(pnl_modulo.CABECALHO_FILE, verificar_checksum=True)
+    copia = np.array(em_uso['vetores'])
+
+    for _ in range(2):
+        pnl_modulo.treinar_e_salvar_modelo_streaming(tamanho_bloco=150, amostra_svd=200, n_componentes=16)
+    assert np.array_equal(em_uso['vetores'], copia)
+
+    novo = pnl_vetorizado.carregar_artefato_pnl(pnl_modulo.CABECALHO_FILE, verificar_checksum=True)
+    assert novo['vetores'].shape[1] == 16 and novo['movie_ids'].size == copia.shape[0]
+    assert not os.path.exists(pnl_modulo.VETORES_FILE)
+    assert not [nome for nome in os.listdir("Modelos") if nome.startswith("tmp")]
+
+class _FalhaNoMeio:
+    def __reduce__(self):
+        raise RuntimeError("disco cheio")
+
+def test_pickle_interrompido_nao_estraga_o_modelo_em_disco(ambiente):
+    pnl_modulo._gravar_pickle(pnl_modulo.TRANSFORMADORES_FILE, {'versao': 1})
+    try:
+        pnl_modulo._gravar_pickle(pnl_modulo.TRANSFORMADORES_FILE, {'versao': 2, 'meio': _FalhaNoMeio()})
+    except RuntimeError:
+        pass
+    with open(pnl_modulo.TRANSFORMADORES_FILE, 'rb') as f:
+        assert pickle.load(f) == {'versao': 1}
+
+def test_atualizacao_incremental_igual_a_projetar_o_csv_inteiro(ambiente):
+    pnl_modulo.treinar_e_salvar_modelo(vizinhos_precomputados=10)
+    filmes = pd.read_csv(pnl_modulo.DATA_FILE)
+    filmes.loc[:2, 'sinopse'] = ["Robo no planeta gelado", "Dragao e vampiro na escola", "Corrida no deserto"]
+    novos = filmes.iloc[:2].assign(movieId=filmes['movieId'].max() + np.arange(1, 3), sinopse=["Natal na ilha", "Tesouro do rei"])
+    filmes = pd.concat([filmes, novos], ignore_index=True)
+    filmes.to_csv(pnl_modulo.DATA_FILE, index=False)
+
+    pnl_modulo.atualizar_modelo_incremental(vizinhos_precomputados=10)
+    with open(pnl_modulo.MODEL_FILE, 'rb') as f:
+        modelo = pickle.load(f)
+    with open(pnl_modulo.TRANSFORMADORES_FILE, 'rb') as f:
+        transformadores = pickle.load(f)
+
+    # Cada linha (alterada, nova ou intocada) é a projeção do CSV atual pelos transformadores do treino
+    features = pnl_modulo.criar_features_de_texto(filmes, usar_cache=False)['feature_pnl']
+    esperado = transformadores['svd'].transform(transformadores['tfidf'].transform(features))
+    linhas = modelo['movie_indices'].loc[filmes['movieId']].to_numpy()
+    np.testing.assert_allclose(modelo['latent_matrix'][linhas], esperado, atol=1e-8)
+    assert modelo['latent_matrix'].shape[0] == len(filmes)
+
+    # A tabela de vizinhos atualizada é a mesma de uma construção do zero
+    pnl = pnl_vetorizado.carregar_artefato_pnl(pnl_modulo.CABECALHO_FILE)
+    tabela = pnl_vetorizado.carregar_tabela_vizinhos(pnl, pnl_modulo.VIZINHOS_FILE, pnl_modulo.SIMILARIDADES_FILE)
+    do_zero = pnl_vetorizado.construir_tabela_vizinhos(pnl, 10)
+    np.testing.assert_allclose(tabela['similaridades'], do_zero['similaridades'], atol=1e-6)
+    assert (tabela['vizinhos'] == do_zero['vizinhos']).mean() > 0.99 # Só empates podem trocar de ordem
+
+def test_limpeza_em_cache_so_refaz_as_sinopses_alteradas(ambiente, monkeypatch):
+    sinopses = pd.read_csv(pnl_modulo.DATA_FILE)['sinopse'].tolist()[:300]
+    sinopses[1] = float('nan')
+    sinopses[2] = "Ação, AMOR e 3 dragões: o herói volta!"
+    esperado = [pnl_modulo.limpar_texto(s) if isinstance(s, str) else "" for s in sinopses]
+
+    limpas = []
+    original = pnl_modulo.limpar_textos
+    monkeypatch.setattr(pnl_modulo, 'limpar_textos', lambda textos, usar_stemmer: limpas.extend(textos) or original(textos, usar_stemmer))
+    assert pnl_modulo.limpar_sinopses(sinopses, n_processos=1) == esperado
+    assert len(limpas) == len(set(sinopses[:1] + sinopses[2:])) + 1 # Sinopses repetidas são limpas uma vez
+
+    # Depois de editar duas sinopses, só elas passam pela limpeza de novo
+    limpas.clear()
+    sinopses[5], sinopses[7] = "Um robô perdido no espaço", "Detetive investiga o dragão"
+    resultado = pnl_modulo.limpar_sinopses(sinopses, n_processos=1)
+    assert sorted(limpas) == sorted([sinopses[5], sinopses[7]])
+    assert resultado == [pnl_modulo.limpar_texto(s) if isinstance(s, str) else "" for s in sinopses]
+
+    # Outra versão da limpeza ou o stemmer ligado não reaproveitam o cache
+    assert len(pnl_modulo._carregar_cache_textos((pnl_modulo.VERSAO_LIMPEZA, False))) == len(set(sinopses))
+    assert pnl_modulo._carregar_cache_textos((pnl_modulo.VERSAO_LIMPEZA, True)) == {}
+    assert pnl_modulo._carregar_cache_textos((pnl_modulo.VERSAO_LIMPEZA + 1, False)) == {}
+
+    # No pool de processos (vários blocos) o resultado é o mesmo do processo atual
+    monkeypatch.setattr(pnl_modulo, 'limpar_textos', original)
+    monkeypatch.setattr(pnl_modulo, 'TAMANHO_BLOCO_TEXTOS', 64)
+    assert pnl_modulo.limpar_sinopses(sinopses, n_processos=2, usar_cache=False) == resultado
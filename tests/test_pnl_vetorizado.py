@@ -0,0 +1,85 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from Codigo_fonte import pnl_vetorizado
+
+def _pnl(n_filmes, dimensoes=8, semente=0):
+    rng = np.random.default_rng(semente)
+    return pnl_vetorizado.preparar_pnl({
+        'latent_matrix': rng.normal(size=(n_filmes, dimensoes)),
+        'movie_indices': pd.Series(np.arange(n_filmes), index=np.arange(1, n_filmes + 1)),
+    })
+
+def _salvar(diretorio, pnl):
+    caminho_cabecalho = os.path.join(diretorio, "pnl_modelo.json")
+    pnl_vetorizado.salvar_artefato_pnl(pnl, caminho_cabecalho, os.path.join(diretorio, "pnl_vetores.npy"),
+                                       os.path.join(diretorio, "pnl_movie_ids.npy"))
+    return caminho_cabecalho
+
+def test_mapeamento_antigo_sobrevive_a_novos_treinos(tmp_path):
+    caminho_cabecalho = _salvar(str(tmp_path), _pnl(500))
+    antigo = pnl_vetorizado.carregar_artefato_pnl(caminho_cabecalho, verificar_checksum=True)
+    soma = float(antigo['vetores'].sum())
+
+    # Dois treinos menores: os arquivos do primeiro são apagados, mas não reescritos
+    _salvar(str(tmp_path), _pnl(100, semente=1))
+    _salvar(str(tmp_path), _pnl(50, semente=2))
+    assert float(antigo['vetores'].sum()) == soma
+
+    novo = pnl_vetorizado.carregar_artefato_pnl(caminho_cabecalho, verificar_checksum=True)
+    assert novo['vetores'].shape[0] == 50 and novo['movie_ids'].size == 50
+    # Só as duas últimas gerações ficam em disco
+    assert len([nome for nome in os.listdir(tmp_path) if nome.startswith("pnl_vetores.")]) == 2
+
+def test_cabecalho_aponta_para_arquivos_do_mesmo_treino(tmp_path):
+    caminho_cabecalho = _salvar(str(tmp_path), _pnl(30))
+    with open(caminho_cabecalho, encoding='utf-8') as f:
+        arquivos = json.load(f)['arquivos']
+    for info in arquivos.values():
+        assert info['sha256'][:16] in info['nome']
+    assert not os.path.exists(os.path.join(tmp_path, "pnl_vetores.npy"))
+
+def _salvar_tabela(diretorio, pnl, k=5):
+    caminhos = (os.path.join(diretorio, "pnl_vizinhos.npy"), os.path.join(diretorio, "pnl_vizinhos_similaridades.npy"))
+    pnl_vetorizado.salvar_tabela_vizinhos(pnl, pnl_vetorizado.construir_tabela_vizinhos(pnl, k), *caminhos)
+    return caminhos
+
+def test_tabela_de_outro_treino_com_o_mesmo_tamanho_e_ignorada(tmp_path):
+    pnl = _pnl(60)
+    artefato = pnl_vetorizado.carregar_artefato_pnl(_salvar(str(tmp_path), pnl))
+    assert pnl_vetorizado.impressao_pnl(artefato) == pnl_vetorizado.impressao_pnl(pnl)
+
+    caminhos = _salvar_tabela(str(tmp_path), pnl)
+    assert pnl_vetorizado.carregar_tabela_vizinhos(artefato, *caminhos) is not None
+
+    # Novo treino com o mesmo número de filmes: a tabela antiga não vale mais
+    retreinado = pnl_vetorizado.carregar_artefato_pnl(_salvar(str(tmp_path), _pnl(60, semente=3)))
+    assert pnl_vetorizado.carregar_tabela_vizinhos(retreinado, *caminhos) is None
+
+    os.remove(pnl_vetorizado.caminho_impressao_tabela(caminhos[0])) # Tabela sem impressão (pela metade)
+    assert pnl_vetorizado.carregar_tabela_vizinhos(artefato, *caminhos) is None
+
+def test_tabela_mapeada_sobrevive_a_nova_gravacao(tmp_path):
+    caminhos = _salvar_tabela(str(tmp_path), _pnl(80))
+    pnl = _pnl(80)
+    antiga = pnl_vetorizado.carregar_tabela_vizinhos(pnl, *caminhos)
+    copia = np.array(antiga['vizinhos'])
+
+    _salvar_tabela(str(tmp_path), _pnl(40, semente=4), k=3)
+    assert np.array_equal(antiga['vizinhos'], copia)
+    assert pnl_vetorizado.carregar_tabela_vizinhos(_pnl(40, semente=4), *caminhos)['vizinhos'].shape == (40, 3)
+
+def test_vizinhos_iguais_ao_cosseno_ordenado():
+    pnl = _pnl(300, semente=5)
+    pnl['vetores'][7] = pnl['vetores'][3] # Gêmeo da semente: empata com ela em similaridade 1
+    linhas = np.array([3, 0, 150, 299])
+    vizinhos, similaridades = pnl_vetorizado.vizinhos_mais_proximos(pnl, linhas, 10)
+
+    todas = pnl['vetores'][linhas] @ pnl['vetores'].T
+    for i, linha in enumerate(linhas):
+        esperado = sorted((j for j in range(300) if j != linha), key=lambda j: (-todas[i, j], j))[:10]
+        assert vizinhos[i].tolist() == esperado
+        np.testing.assert_allclose(similaridades[i], todas[i, esperado])
+    assert vizinhos[0, 0] == 7 and 3 not in vizinhos[0] # A semente sai pelo índice, não por ordenar primeiro
+    assert pnl_vetorizado.vizinhos_mais_proximos(pnl, [0], 1000)[0].shape == (1, 299)
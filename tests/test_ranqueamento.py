@@ -0,0 +1,24 @@
+import numpy as np
+from Codigo_fonte import ranqueamento, recomendar
+
+def test_ruido_da_prioridade_nao_decide_empates():
+    # Platô do fuzzy: 50 exato ou 50 - 1.4e-14, sem relação com a nota
+    notas = np.array([4.9, 4.8, 4.7, 4.6, 4.5, 4.4])
+    prioridades = np.array([50 - 1.4e-14, 50.0, 50 - 1.4e-14, 50.0, 50 - 1.4e-14, 50.0])
+    movie_ids = np.arange(10, 16)
+    selecionados = ranqueamento.selecionar_top_n(prioridades, notas, movie_ids, 4)
+    assert movie_ids[selecionados].tolist() == [10, 11, 12, 13]
+
+def test_prioridade_maior_continua_na_frente():
+    notas = np.array([4.9, 3.0])
+    prioridades = np.array([40.0, 60.0])
+    assert ranqueamento.selecionar_top_n(prioridades, notas, np.array([1, 2]), 2).tolist() == [1, 0]
+
+def test_recomendacoes_ordenadas_por_nota_dentro_da_mesma_prioridade(ambiente):
+    for user_id in (1, 2, 3):
+        recomendacoes = recomendar.gerar_recomendacoes_hibridas(user_id, 120, 20)
+        prioridades = np.round(recomendacoes['prioridade_fuzzy'].to_numpy(), ranqueamento.CASAS_PRIORIDADE)
+        notas = np.round(recomendacoes['nota_prevista_cf'].to_numpy(), ranqueamento.CASAS_NOTA)
+        assert np.all(np.diff(prioridades) <= 0)
+        mesma_prioridade = np.diff(prioridades) == 0
+        assert np.all(np.diff(notas)[mesma_prioridade] <= 0)
@@ -0,0 +1,27 @@
+import numpy as np
+from Codigo_fonte import recomendar, recursos, catalogo
+
+def test_filtro_de_duracao_roda_antes_da_previsao_cf(ambiente, monkeypatch):
+    pontuados = []
+    original = recomendar._pontuar_cf
+    def espiar(modelo_cf, user_id, movie_ids):
+        pontuados.append(np.array(movie_ids))
+        return original(modelo_cf, user_id, movie_ids)
+    monkeypatch.setattr(recomendar, '_pontuar_cf', espiar)
+
+    recomendacoes, execucao = recomendar.gerar_recomendacoes_hibridas(1, 60, 5, retornar_metricas=True)
+    assert len(recomendacoes) == 5 and (recomendacoes['duracao_min'] <= 60).all()
+
+    # A CF só viu filmes do catálogo com duração válida que cabem em 60 minutos
+    cat = recursos.obter('catalogo')
+    linhas = catalogo.linhas_dos_filmes(cat, pontuados[0])
+    assert len(pontuados) == 1 and (linhas >= 0).all()
+    assert cat['duracao_valida'][linhas].all() and (cat['duracao'][linhas] <= 60).all()
+
+    # Cada estágio recebe o que o anterior aprovou, e o filtro vem antes da CF
+    estagios = {e['estagio']: e for e in execucao['estagios']}
+    nomes = [e['estagio'] for e in execucao['estagios']]
+    assert nomes.index('filtros_metadados') < nomes.index('pontuacao_cf')
+    assert estagios['pool_candidatos']['saida'] == estagios['filtros_metadados']['entrada']
+    assert estagios['filtros_metadados']['saida'] == estagios['pontuacao_cf']['entrada'] == pontuados[0].size
+    assert pontuados[0].size < 0.5 * estagios['filtros_metadados']['entrada'] # Tempo curto descarta a maioria
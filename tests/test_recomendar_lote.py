@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from multiprocessing import shared_memory
+from Codigo_fonte import cf_vetorizado, recomendar, recomendar_lote, recursos
+
+PEDIDOS = [(1, 120, 10), (2, 90, 5), (3, 200, 15), (1, 60, 10), (4, 150, 20), (5, 45, 10)]
+
+@pytest.mark.parametrize("n_processos", [None, 2])
+def test_lote_igual_a_recomendacao_individual(ambiente, n_processos):
+    em_lote = recomendar.gerar_recomendacoes_em_lote(PEDIDOS, tamanho_bloco=2, n_processos=n_processos)
+    for pedido, df_lote in zip(PEDIDOS, em_lote):
+        individual = recomendar.gerar_recomendacoes_hibridas(*pedido)
+        assert 'similaridade_pnl' in df_lote.columns and df_lote['similaridade_pnl'].notna().any()
+        assert df_lote['movieId'].tolist() == individual['movieId'].tolist()
+        pd.testing.assert_frame_equal(df_lote, individual, check_dtype=False, rtol=1e-6)
+
+def test_bloco_cf_igual_a_previsao_por_usuario(ambiente):
+    fatores = recursos.obter('fatores_cf')
+    user_ids = [1, 2, 3, 999999] # O último o modelo não conhece: cai na média + viés do filme
+    movie_ids = np.concatenate([recursos.obter('catalogo')['movie_ids'][:50], [999999]])
+    bloco = cf_vetorizado.prever_notas_cf_bloco(fatores, user_ids, movie_ids)
+    assert bloco.shape == (len(user_ids), len(movie_ids))
+    for linha, user_id in zip(bloco, user_ids):
+        np.testing.assert_allclose(linha, cf_vetorizado.prever_notas_cf(fatores, user_id, movie_ids))
+
+def test_arrays_publicados_sao_os_mesmos_e_liberados(ambiente):
+    contexto = recomendar_lote.montar_contexto(recursos.obter('fatores_cf'), recursos.obter('catalogo'),
+                                               recursos.obter('indice_avaliacoes'), recursos.obter('avaliador_fuzzy'))
+    segmentos, descritores, extras = recomendar_lote._publicar_arrays(contexto)
+    try:
+        anexado, segmentos_processo = recomendar_lote._anexar_arrays(descritores, extras)
+        for grupo in ('fatores', 'catalogo', 'ranqueaveis'):
+            for chave, valor in contexto[grupo].items():
+                if isinstance(valor, np.ndarray):
+                    np.testing.assert_array_equal(anexado[grupo][chave], valor)
+        for segmento in segmentos_processo:
+            segmento.close()
+    finally:
+        recomendar_lote._liberar_segmentos(segmentos)
+    with pytest.raises(FileNotFoundError): # Nenhum segmento sobra depois do lote
+        shared_memory.SharedMemory(name=segmentos[0].name)
@@ -0,0 +1,72 @@
+import pytest
+from Codigo_fonte import recursos, metricas
+
+@pytest.fixture
+def registro_isolado(monkeypatch):
+    # Recursos de teste registrados em cópias do registro, descartadas no fim do teste
+    for nome in ('_REGISTRO', '_VALORES', '_TEMPOS', '_TRAVAS', '_FALHAS'):
+        monkeypatch.setattr(recursos, nome, dict(getattr(recursos, nome)))
+    monkeypatch.setattr(recursos, '_AUSENTES', set(recursos._AUSENTES))
+
+def _carregador_que_falha_uma_vez(chamadas):
+    def carregador():
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            raise FileNotFoundError("modelo ainda não gerado")
+        return "modelo"
+    return carregador
+
+def test_falha_nao_fica_guardada_para_sempre(registro_isolado, monkeypatch):
+    chamadas = []
+    recursos.registrar('teste_modelo', _carregador_que_falha_uma_vez(chamadas))
+    recursos.registrar('teste_derivado', lambda modelo: modelo + " derivado", ('teste_modelo',))
+
+    assert recursos.obter('teste_derivado') is None
+    assert recursos.obter('teste_derivado') is None # Dentro do intervalo: sem nova carga
+    assert len(chamadas) == 1 and not recursos.carregado('teste_modelo')
+
+    monkeypatch.setattr(recursos, 'INTERVALO_NOVA_TENTATIVA', 0.0)
+    assert recursos.obter('teste_derivado') == "modelo derivado"
+    assert len(chamadas) == 2 and recursos.carregado('teste_modelo')
+
+def test_descartar_libera_nova_tentativa_imediata(registro_isolado):
+    chamadas = []
+    recursos.registrar('teste_modelo', _carregador_que_falha_uma_vez(chamadas))
+    assert recursos.obter('teste_modelo') is None
+    recursos.descartar('teste_modelo')
+    assert recursos.obter('teste_modelo') == "modelo"
+
+def test_tabela_do_warmup_so_no_modo_verboso(registro_isolado, monkeypatch, capsys):
+    recursos.registrar('teste_modelo', lambda: "modelo")
+    monkeypatch.setattr(metricas, 'VERBOSO', False)
+    assert 'teste_modelo' in recursos.warmup(['teste_modelo'])
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setattr(metricas, 'VERBOSO', True)
+    recursos.warmup(['teste_modelo'])
+    assert "teste_modelo" in capsys.readouterr().out
+
+def test_artefato_opcional_ausente_nao_e_tentado_de_novo(registro_isolado, monkeypatch, capsys):
+    chamadas = []
+    def carregador():
+        chamadas.append(1)
+        raise recursos.ArtefatoAusente("Modelos/tabela.npy")
+    recursos.registrar('teste_opcional', carregador)
+    recursos.registrar('teste_derivado', lambda tabela: tabela, ('teste_opcional',))
+    monkeypatch.setattr(recursos, 'INTERVALO_NOVA_TENTATIVA', 0.0)
+
+    for _ in range(3):
+        assert recursos.obter('teste_derivado') is None
+    assert len(chamadas) == 1 and recursos.ausente('teste_opcional') and recursos.ausente('teste_derivado')
+    assert 'teste_opcional' not in recursos._FALHAS and capsys.readouterr().out == ""
+
+    recursos.descartar('teste_opcional') # Ex.: um novo modelo foi carregado
+    assert not recursos.ausente('teste_derivado')
+    assert recursos.obter('teste_opcional') is None and len(chamadas) == 2
+
+def test_estruturas_opcionais_do_pnl_sem_arquivo_ficam_ausentes(ambiente, capsys):
+    # Os dados sintéticos dos testes não têm tabela de vizinhos nem índice ANN
+    for nome in ('tabela_vizinhos_pnl', 'indice_ann_pnl'):
+        assert recursos.obter(nome) is None and recursos.ausente(nome)
+    assert "AVISO" not in capsys.readouterr().out
+    assert recursos.obter('pnl_vetorizado') is not None
@@ -0,0 +1,110 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from Codigo_fonte import recursos, sobreposicao_cf, recomendar, gerenciar_usuarios, indice_avaliacoes
+
+def _avaliar_novo_usuario(n_avaliacoes=8):
+    # Mesmo caminho de gerenciar_usuarios.adicionar_avaliacoes, sem o input() do terminal
+    gerenciar_usuarios._garantir_dados_carregados()
+    user_id = gerenciar_usuarios.obter_proximo_userid()
+    filmes = recursos.obter('filmes_df')['movieId'].to_numpy()[:n_avaliacoes]
+    novas = pd.DataFrame({'userId': user_id, 'movieId': filmes, 'rating': 5.0, 'timestamp': int(time.time())})
+    gerenciar_usuarios.USUARIOS_DF_GER = pd.concat([gerenciar_usuarios.USUARIOS_DF_GER, novas], ignore_index=True)
+    gerenciar_usuarios._salvar_usuarios_df(user_id)
+    gerenciar_usuarios._dobrar_usuario_no_cf(user_id)
+    return user_id
+
+def test_usuario_dobrado_recebe_recomendacoes_no_mesmo_processo(ambiente):
+    # O recomendar já carregou as avaliações antes do usuário novo existir
+    assert recomendar.gerar_recomendacoes_hibridas(1, 120, 5) is not None
+
+    user_id = _avaliar_novo_usuario()
+    assert sobreposicao_cf.tamanho() == 1
+
+    recomendacoes = recomendar.gerar_recomendacoes_hibridas(user_id, 120, 5)
+    assert recomendacoes is not None and len(recomendacoes) == 5
+    vistos, _ = indice_avaliacoes.avaliacoes_do_usuario(recursos.obter('indice_avaliacoes'), user_id)
+    assert vistos.size == 8
+    assert not np.isin(recomendacoes['movieId'], vistos).any()
+
+def test_sobreposicao_relida_quando_o_arquivo_muda(ambiente, monkeypatch):
+    monkeypatch.setattr(sobreposicao_cf, 'INTERVALO_VERIFICACAO', 0.0) # Confere o disco a cada acesso
+    assert sobreposicao_cf.instantaneo() is None # Processo "servidor" já leu o arquivo (vazio)
+
+    # Outro processo grava o arquivo com um usuário dobrado
+    k = recursos.obter('fatores_cf')['qi'].shape[1]
+    np.savez(sobreposicao_cf.SOBREPOSICAO_FILE, user_ids=np.array([999], dtype=np.int64),
+             pu=np.ones((1, k)), bu=np.array([0.5]))
+    estado = os.stat(sobreposicao_cf.SOBREPOSICAO_FILE)
+    os.utime(sobreposicao_cf.SOBREPOSICAO_FILE, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1_000_000))
+
+    instantaneo = sobreposicao_cf.instantaneo()
+    assert instantaneo is not None and instantaneo['user_ids'].tolist() == [999]
+
+def test_dobra_de_outro_processo_chega_pelo_log(ambiente, monkeypatch):
+    monkeypatch.setattr(sobreposicao_cf, 'INTERVALO_VERIFICACAO', 0.0)
+    assert sobreposicao_cf.instantaneo() is None
+    k = recursos.obter('fatores_cf')['qi'].shape[1]
+    segundo = sobreposicao_cf._registro(998, np.full(k, 2.0), 0.1)
+    with open(sobreposicao_cf.SOBREPOSICAO_LOG, 'ab') as f:
+        f.write(sobreposicao_cf._registro(999, np.ones(k), 0.5))
+        f.write(segundo[:20]) # Registro ainda sendo gravado
+    assert sobreposicao_cf.instantaneo()['user_ids'].tolist() == [999]
+
+    with open(sobreposicao_cf.SOBREPOSICAO_LOG, 'ab') as f:
+        f.write(segundo[20:])
+    instantaneo = sobreposicao_cf.instantaneo()
+    assert instantaneo['user_ids'].tolist() == [998, 999]
+    np.testing.assert_array_equal(instantaneo['pu'][0], np.full(k, 2.0))
+    assert instantaneo['bu'].tolist() == [0.1, 0.5]
+
+def test_dobra_so_acrescenta_ao_log_e_compacta_no_limite(ambiente, monkeypatch):
+    fatores = recursos.obter('fatores_cf')
+    movie_ids = recursos.obter('filmes_df')['movieId'].to_numpy()[:20]
+    notas = np.linspace(1, 5, movie_ids.size)
+    tamanho_registro = len(sobreposicao_cf._registro(1, np.zeros(fatores['qi'].shape[1])))
+    monkeypatch.setattr(sobreposicao_cf, 'LIMITE_BYTES_LOG', 3 * tamanho_registro)
+
+    sobreposicao_cf.atualizar_usuario(fatores, 1001, movie_ids, notas)
+    assert not os.path.exists(sobreposicao_cf.SOBREPOSICAO_FILE)
+    assert os.path.getsize(sobreposicao_cf.SOBREPOSICAO_LOG) == tamanho_registro
+    for user_id in range(1002, 1006):
+        sobreposicao_cf.atualizar_usuario(fatores, user_id, movie_ids, notas[::-1])
+    sobreposicao_cf.remover_usuario(1003)
+    assert os.path.exists(sobreposicao_cf.SOBREPOSICAO_FILE) # O log passou do limite e virou retrato
+    assert os.path.getsize(sobreposicao_cf.SOBREPOSICAO_LOG) < 3 * tamanho_registro
+
+    esperado = sobreposicao_cf.instantaneo()
+    monkeypatch.setattr(sobreposicao_cf, '_FATORES', None) # Como um processo novo, lendo só o disco
+    relido = sobreposicao_cf.instantaneo()
+    assert relido['user_ids'].tolist() == [1001, 1002, 1004, 1005]
+    np.testing.assert_array_equal(relido['pu'], esperado['pu'])
+    np.testing.assert_array_equal(relido['bu'], esperado['bu'])
+
+def test_dobra_inline_bem_abaixo_de_um_milissegundo(ambiente):
+    fatores = recursos.obter('fatores_cf')
+    movie_ids = recursos.obter('filmes_df')['movieId'].to_numpy()[:20]
+    notas = np.linspace(1, 5, movie_ids.size)
+    sobreposicao_cf.instantaneo()
+    tempos = []
+    for user_id in range(2000, 2050): # Dobra + gravação, como no salvamento de uma avaliação
+        inicio = time.perf_counter()
+        sobreposicao_cf.atualizar_usuario(fatores, user_id, movie_ids, notas)
+        tempos.append(time.perf_counter() - inicio)
+    assert np.median(tempos) < 1e-3
+
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        sobreposicao_cf.instantaneo() # Sem os.stat a cada recomendação
+    assert (time.perf_counter() - inicio) / 1000 < 1e-4
+
+def test_limpeza_por_outro_processo_esvazia_a_sobreposicao(ambiente, monkeypatch):
+    monkeypatch.setattr(sobreposicao_cf, 'INTERVALO_VERIFICACAO', 0.0)
+    fatores = recursos.obter('fatores_cf')
+    movie_ids = recursos.obter('filmes_df')['movieId'].to_numpy()[:5]
+    sobreposicao_cf.atualizar_usuario(fatores, 1001, movie_ids, np.full(movie_ids.size, 4.0))
+    assert sobreposicao_cf.tamanho() == 1
+
+    os.remove(sobreposicao_cf.SOBREPOSICAO_LOG) # machine.py treinou um modelo novo
+    assert sobreposicao_cf.instantaneo() is None